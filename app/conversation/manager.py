@@ -1,9 +1,17 @@
+import os
 import requests
-from typing import List, Optional
+from typing import List, Literal, Optional, Sequence, Tuple, TypeVar, cast, get_args
 from pydantic import BaseModel
 from uuid import uuid4
 import logging
 
+from observability import span
+
+MessagesMode = Literal['full', 'delta']
+CHAT_MESSAGES_MODE = os.getenv("CHAT_MESSAGES_MODE", "full")
+if CHAT_MESSAGES_MODE not in get_args(MessagesMode):
+    raise ValueError(f"CHAT_MESSAGES_MODE inválido: {CHAT_MESSAGES_MODE!r} (use 'full' ou 'delta')")
+
 class ChatMessage(BaseModel):
     role: str  # 'user' | 'assistant' | 'system'
     content: str
@@ -15,12 +23,17 @@ class ChatRequest(BaseModel):
     use_llm: bool = False     # liga LLM neste request (além do USE_OLLAMA global)
     history: Optional[List[ChatMessage]] = None  # modo stateless alternativo (frontend envia histórico)
     max_history: int = 8      # janela de mensagens a considerar no retrieval
+    # 'full': devolve a conversa inteira; 'delta': só as mensagens novas deste turno (user + assistant)
+    messages_mode: MessagesMode = cast(MessagesMode, CHAT_MESSAGES_MODE)
 
 class ChatResponse(BaseModel):
     answer: str
     citations: List[str]
     conversation_id: str
     messages: List[ChatMessage]
+    messages_mode: MessagesMode = 'full'
+    # no modo delta: cursor para buscar as mensagens anteriores em GET /conversation/{cid}
+    next_cursor: Optional[str] = None
 
 class Conversation(BaseModel):
     id: int
@@ -31,7 +44,34 @@ class Conversation(BaseModel):
     updated_at: str
 
 
-API_URL = "http://localhost:8080/api"
+API_URL = os.getenv("HISTORY_API_URL", "http://localhost:8080/api")  # serviço de histórico (Go/Postgres)
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def cursor_before(pos: int) -> Optional[str]:
+    """Cursor da página que termina (exclusiva) em `pos` de uma lista de mensagens; None no início."""
+    return str(pos) if pos > 0 else None
+
+
+def paginate(items: Sequence[T], limit: Optional[int], cursor: Optional[str] = None) -> Tuple[List[T], Optional[str]]:
+    """Paginação por cursor do fim para o começo (mais recentes primeiro, cada página em ordem
+    cronológica). O cursor é opaco para o cliente: a posição (exclusiva) onde a próxima página termina.
+    Retorna (página, cursor da página anterior ou None se não houver mais)."""
+    fim = len(items)
+    if cursor:
+        try:
+            fim = int(cursor)
+        except ValueError:
+            raise InvalidCursorError(f"Cursor inválido: {cursor!r}") from None
+        if not 0 <= fim <= len(items):
+            raise InvalidCursorError(f"Cursor fora da conversa: {cursor!r}")
+    inicio = max(0, fim - limit) if limit else 0
+    return list(items[inicio:fim]), cursor_before(inicio)
 
 class ConversationManagerAPI:
     """Gerencia histórico de conversas via API Go/Postgres."""
@@ -39,26 +79,32 @@ class ConversationManagerAPI:
         pass
     
     def get_all_conversations(self) -> List[Conversation]:
-        resp = requests.get(f"{API_URL}/conversations")
+        with span("history"):
+            resp = requests.get(f"{API_URL}/conversations")
         resp.raise_for_status()
         data = resp.json()
         return [Conversation(**conv) for conv in data]
 
     def get(self, cid: str) -> List[ChatMessage]:
-        resp = requests.get(f"{API_URL}/conversations/{cid}")
+        with span("history"):
+            resp = requests.get(f"{API_URL}/conversations/{cid}")
         resp.raise_for_status()
         data = resp.json()
         return [ChatMessage(**msg) for msg in data]
     
     def get_messages(self, cid: str) -> List[ChatMessage]:
-        resp = requests.get(f"{API_URL}/conversations/{cid}/messages")
+        """Mensagens da conversa em ordem cronológica: a lista que o /chat usa como histórico e que
+        GET /conversation/{cid} pagina (os cursores são posições nela)."""
+        with span("history"):
+            resp = requests.get(f"{API_URL}/conversations/{cid}/messages")
         resp.raise_for_status()
         data = resp.json()
         return [ChatMessage(**msg) for msg in data]
 
     def append(self, cid: str, msg: ChatMessage):
         payload = {"cid": cid, "content": msg.content, "user_id": 1, "role": msg.role}
-        resp = requests.post(f"{API_URL}/conversations/{cid}/messages", json=payload)
+        with span("history"):
+            resp = requests.post(f"{API_URL}/conversations/{cid}/messages", json=payload)
         resp.raise_for_status()
 
     def create(self) -> str:
@@ -68,11 +114,12 @@ class ConversationManagerAPI:
         
         try:
             headers = {"Content-Type": "application/json"}
-            resp = requests.post(
-                "http://localhost:8080/api/conversations/create",
-                json=payload,
-                headers=headers
-            )
+            with span("history"):
+                resp = requests.post(
+                    f"{API_URL}/conversations/create",
+                    json=payload,
+                    headers=headers
+                )
             resp.raise_for_status()
             data = resp.json()
 
@@ -87,5 +134,6 @@ class ConversationManagerAPI:
         pass
 
     def reset(self, cid: str):
-        resp = requests.post(f"{API_URL}/{cid}/reset")
+        with span("history"):
+            resp = requests.post(f"{API_URL}/{cid}/reset")
         resp.raise_for_status()
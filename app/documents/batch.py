@@ -0,0 +1,160 @@
+"""Geração de petições em lote.
+
+Registros com a mesma `consulta_caso` (após normalização) compartilham a recuperação e as
+seções geradas pelo LLM, calculadas uma única vez por grupo. A renderização dos .docx roda
+num pool de processos e o resultado é empacotado em um .zip. Na API o lote roda como job da
+fila de documentos (app/documents/jobs.py), nunca no thread da requisição.
+"""
+from __future__ import annotations
+import copy
+import csv
+import io
+import os
+import multiprocessing
+import re
+import threading
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.documents.generator import (
+    generate_case_sections,
+    render_peticao_inicial_cobranca,
+    secoes_faltantes,
+    PETICAO_AI_MODE,
+    SECOES_IA,
+)
+
+BATCH_RENDER_WORKERS = int(os.getenv("BATCH_RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+# Separador de itens de lista (pedidos/provas) em colunas CSV
+CSV_LIST_SEP = "|"
+
+_render_pools: Dict[int, ProcessPoolExecutor] = {}
+_render_pools_lock = threading.Lock()
+
+
+def render_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de renderização do processo (um por tamanho), criado na primeira vez e reaproveitado.
+
+    Usa `spawn`: a API já tem threads (slots de inferência, fila de jobs, consultas frequentes) e
+    um `fork` pode herdar no filho um lock tomado por uma delas e travar.
+    """
+    with _render_pools_lock:
+        pool = _render_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _render_pools[workers] = pool
+        return pool
+
+
+def normalize_consulta(text: str) -> str:
+    """Chave de agrupamento: sem acentos, minúsculas, sem pontuação e com espaços colapsados."""
+    t = unicodedata.normalize("NFKD", text or "")
+    t = "".join(ch for ch in t if not unicodedata.combining(ch)).lower()
+    t = re.sub(r"[^\w\s]", " ", t)
+    return " ".join(t.split())
+
+
+def read_csv_records(fp) -> List[Dict[str, Any]]:
+    """Lê registros de um CSV com cabeçalho.
+
+    Colunas: foro, autor_nome, autor_cpf, autor_endereco, reu_nome, reu_cnpj, reu_endereco,
+    valor_causa, fatos, pedidos, provas, consulta_caso. `pedidos`/`provas` usam '|' entre itens.
+    """
+    def lista(v: Optional[str]) -> Optional[List[str]]:
+        itens = [x.strip() for x in (v or "").split(CSV_LIST_SEP) if x.strip()]
+        return itens or None
+
+    records: List[Dict[str, Any]] = []
+    for row in csv.DictReader(fp):
+        row = {k: (v or "").strip() for k, v in row.items() if k}
+        records.append({
+            "data": {
+                "foro": row.get("foro", ""),
+                "autor": {"nome": row.get("autor_nome", ""), "cpf": row.get("autor_cpf") or None,
+                          "endereco": row.get("autor_endereco") or None},
+                "reu": {"nome": row.get("reu_nome", ""), "cnpj": row.get("reu_cnpj") or None,
+                        "endereco": row.get("reu_endereco") or None},
+                "valor_causa": float((row.get("valor_causa") or "0").replace(",", ".")),
+                "fatos": row.get("fatos") or None,
+                "pedidos": lista(row.get("pedidos")),
+                "provas": lista(row.get("provas")),
+            },
+            "consulta_caso": row.get("consulta_caso", ""),
+        })
+    return records
+
+
+def group_records(records: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Agrupa índices de registros pela `consulta_caso` normalizada (ordem de entrada preservada)."""
+    groups: Dict[str, List[int]] = {}
+    for i, rec in enumerate(records):
+        groups.setdefault(normalize_consulta(rec.get("consulta_caso", "")), []).append(i)
+    return groups
+
+
+def _doc_name(idx: int, data: Dict[str, Any]) -> str:
+    nome = normalize_consulta(data.get("reu", {}).get("nome", "")).replace(" ", "_")[:40] or "reu"
+    return f"{idx + 1:04d}_Peticao_Inicial_Cobranca_{nome}.docx"
+
+
+def generate_batch(
+    records: List[Dict[str, Any]],
+    use_ai: bool = True,
+    force: bool = False,
+    mode: str = PETICAO_AI_MODE,
+    k: int = 12,
+    workers: int = BATCH_RENDER_WORKERS,
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Tuple[bytes, Dict[str, Any]]:
+    """Gera as petições de `records` ([{"data": {...}, "consulta_caso": "..."}]).
+    Retorna (bytes do .zip, estatísticas). `on_stage` recebe "generation" e "render" ao entrar
+    em cada etapa (progresso do job).
+    """
+    t_inicio = time.perf_counter()
+    datas = [copy.deepcopy(rec["data"]) for rec in records]
+    groups = group_records(records)
+    stats: Dict[str, Any] = {"records": len(records), "groups": len(groups)}
+
+    # 1. Recuperação + LLM: uma vez por grupo
+    t0 = time.perf_counter()
+    if use_ai:
+        if on_stage:
+            on_stage("generation")
+        for idxs in groups.values():
+            secoes = [nome for nome in SECOES_IA
+                      if any(nome in secoes_faltantes(datas[i], force) for i in idxs)]
+            if not secoes:
+                continue
+            geradas = generate_case_sections(records[idxs[0]]["consulta_caso"], secoes, k=k, mode=mode)
+            for i in idxs:
+                for nome in secoes_faltantes(datas[i], force):
+                    datas[i][nome] = copy.deepcopy(geradas.get(nome))
+    stats["ai_s"] = round(time.perf_counter() - t0, 3)
+
+    # 2. Renderização em pool de processos
+    t0 = time.perf_counter()
+    if on_stage:
+        on_stage("render")
+    if workers > 1 and len(datas) > 1:
+        rendered = list(render_pool(workers).map(render_peticao_inicial_cobranca, datas,
+                                                 chunksize=max(1, len(datas) // (workers * 4))))
+    else:
+        rendered = [render_peticao_inicial_cobranca(d) for d in datas]
+    stats["render_s"] = round(time.perf_counter() - t0, 3)
+
+    # 3. Empacotamento (.docx já é comprimido)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i, (data, content) in enumerate(zip(datas, rendered)):
+            zf.writestr(_doc_name(i, data), content)
+
+    total = time.perf_counter() - t_inicio
+    stats["total_s"] = round(total, 3)
+    stats["records_per_s"] = round(len(records) / total, 2) if total > 0 else None
+    print(f"[LOTE] {stats['records']} registros em {stats['groups']} grupos: "
+          f"{stats['total_s']}s ({stats['records_per_s']} registros/s)")
+    return buf.getvalue(), stats
@@ -1,19 +1,32 @@
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from docx import Document
 from docxtpl import DocxTemplate
+import copy
 import datetime
+import io
+import json
 import os
+import re
+import threading
+import time
 
-# Dependências para geração assistida por IA (stack local)
-from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
+# Dependências para geração assistida por IA (stack local). Modelo de embeddings e client do
+# Qdrant são importados/criados no primeiro uso (o modelo é o mesmo do /chat, carregado uma vez)
+from inference_executor import run_inference
 from llm_ollama import generate_with_ollama
+from observability import CACHE_EVENTS, span
+from retrieval_local import _get_model as _get_embed_model, search_params
 from app.prompts.legal_prompting import preprocess_question, build_prompt
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "leis")
+# Modo de geração das seções: "json" (uma chamada estruturada) ou "parallel" (uma chamada por seção, concorrentes)
+PETICAO_AI_MODE = os.getenv("PETICAO_AI_MODE", "json")
 
 # Usa caminho absoluto baseado no próprio arquivo, garantindo acesso a
 # C:\projects\python\legal-assistant-mvp\app\documents\templates\
@@ -30,16 +43,42 @@ if not TEMPLATES_DIR.is_dir():
 OUTPUTS_DIR = Path(__file__).resolve().parents[2] / "outputs"
 OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
 
-def generate_peticao_inicial_cobranca(data: Dict) -> str:
-    """
-    Renderiza o template docx com os dados do JSON.
-    Retorna o caminho do arquivo gerado.
+# Persistência em disco (opcional) e política de retenção de outputs/
+OUTPUTS_PERSIST = os.getenv("OUTPUTS_PERSIST", "true").lower() in ("1", "true", "yes")
+OUTPUTS_MAX_FILES = int(os.getenv("OUTPUTS_MAX_FILES", "200"))        # 0 = sem limite
+OUTPUTS_MAX_AGE_HOURS = float(os.getenv("OUTPUTS_MAX_AGE_HOURS", "0"))  # 0 = sem expiração
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PETICAO_COBRANCA_TEMPLATE = "peticao_inicial_cobranca.docx"
+PETICAO_COBRANCA_PREFIX = "Peticao_Inicial_Cobranca"
+
+# Templates já parseados (python-docx), clonados a cada renderização
+_templates: Dict[str, Document] = {}
+_templates_lock = threading.Lock()
+
+
+def _get_template(name: str) -> DocxTemplate:
+    """Retorna um DocxTemplate pronto para render, clonado do template parseado em cache.
+    O render do docxtpl altera o documento em memória, por isso cada chamada recebe uma cópia.
     """
-    tpl_path = TEMPLATES_DIR / "peticao_inicial_cobranca.docx"
-    doc = DocxTemplate(str(tpl_path))
+    base = _templates.get(name)
+    if base is None:
+        with _templates_lock:
+            base = _templates.get(name)
+            if base is None:
+                base = Document(str(TEMPLATES_DIR / name))
+                _templates[name] = base
+        CACHE_EVENTS.inc(cache="template", result="miss")
+    else:
+        CACHE_EVENTS.inc(cache="template", result="hit")
+    tpl = DocxTemplate(str(TEMPLATES_DIR / name))
+    tpl.docx = copy.deepcopy(base)
+    return tpl
+
 
-    # Contexto para o template (placeholders)
-    ctx = {
+def _build_peticao_context(data: Dict) -> Dict[str, Any]:
+    """Contexto para o template (placeholders)."""
+    return {
         "foro": data.get("foro"),
         "autor_nome": data["autor"]["nome"],
         "autor_cpf": data["autor"].get("cpf", ""),
@@ -47,18 +86,69 @@ def generate_peticao_inicial_cobranca(data: Dict) -> str:
         "reu_nome": data["reu"]["nome"],
         "reu_cnpj": data["reu"].get("cnpj", ""),
         "reu_endereco": data["reu"].get("endereco", ""),
-        "fatos": data.get("fatos", ""),
+        "fatos": data.get("fatos") or "",
         "valor_causa": f"R$ {data.get('valor_causa', 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-        "pedidos": data.get("pedidos", []),
-        "provas": data.get("provas", []),
+        "pedidos": data.get("pedidos") or [],
+        "provas": data.get("provas") or [],
         "hoje": datetime.date.today().strftime("%d/%m/%Y"),
     }
 
-    doc.render(ctx)
-    out_path = OUTPUTS_DIR / f"Peticao_Inicial_Cobranca_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    doc.save(str(out_path))
+
+def render_peticao_inicial_cobranca(data: Dict) -> bytes:
+    """Renderiza o template docx em memória e retorna os bytes do arquivo."""
+    with span("render"):
+        doc = _get_template(PETICAO_COBRANCA_TEMPLATE)
+        doc.render(_build_peticao_context(data))
+        buf = io.BytesIO()
+        doc.save(buf)
+        return buf.getvalue()
+
+
+def output_filename(prefix: str = PETICAO_COBRANCA_PREFIX) -> str:
+    """Nome único para o documento (timestamp + sufixo aleatório evita colisão no mesmo segundo)."""
+    return f"{prefix}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:8]}.docx"
+
+
+def _evict_outputs() -> None:
+    """Aplica a política de retenção em outputs/: remove os expirados e os mais antigos acima do limite."""
+    if OUTPUTS_MAX_FILES <= 0 and OUTPUTS_MAX_AGE_HOURS <= 0:
+        return
+    files = []
+    for f in OUTPUTS_DIR.glob("*.docx"):
+        try:
+            files.append((f.stat().st_mtime, f))
+        except FileNotFoundError:
+            continue
+    files.sort(reverse=True)  # mais novos primeiro
+    expired = []
+    if OUTPUTS_MAX_AGE_HOURS > 0:
+        limite = time.time() - OUTPUTS_MAX_AGE_HOURS * 3600
+        expired = [f for mtime, f in files if mtime < limite]
+    if OUTPUTS_MAX_FILES > 0:
+        expired += [f for _, f in files[OUTPUTS_MAX_FILES:] if f not in expired]
+    for f in expired:
+        try:
+            f.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def save_output(content: bytes, prefix: str = PETICAO_COBRANCA_PREFIX) -> str:
+    """Grava o documento em outputs/ com nome único e aplica a retenção. Retorna o caminho."""
+    with span("save"):
+        out_path = OUTPUTS_DIR / output_filename(prefix)
+        out_path.write_bytes(content)
+        _evict_outputs()
     return str(out_path)
 
+
+def generate_peticao_inicial_cobranca(data: Dict) -> str:
+    """
+    Renderiza o template docx com os dados do JSON.
+    Retorna o caminho do arquivo gerado.
+    """
+    return save_output(render_peticao_inicial_cobranca(data))
+
 # ---------------- IA Assistida -----------------
 
 def _format_currency_br(value: float | int) -> str:
@@ -101,16 +191,38 @@ def _build_context_from_hits(hits: List) -> str:
     return "\n\n".join(parts)
 
 
+_qdrant = None
+
+
+def _get_qdrant():
+    global _qdrant
+    if _qdrant is None:
+        from qdrant_client import QdrantClient
+        _qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    return _qdrant
+
+
 def _retrieve_legal_context(query: str, k: int, collection: str) -> str:
-    model = SentenceTransformer(EMBED_MODEL)
-    qvec = model.encode([query], normalize_embeddings=True)[0].tolist()
-    client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
-    hits = client.search(collection_name=collection, query_vector=qvec, limit=k)
+    model = _get_embed_model()
+    qvec = run_inference("embed", model.encode, [query], normalize_embeddings=True)[0].tolist()
+    client = _get_qdrant()
+    with span("search"):
+        hits = client.search(collection_name=collection, query_vector=qvec, limit=k, search_params=search_params())
     if not hits:
         return "(Nenhum artigo encontrado para a consulta)"
     return _build_context_from_hits(hits)
 
 
+# Instrução de cada seção gerável e se ela vira lista de itens no template
+SECOES_IA: Dict[str, tuple[str, bool]] = {
+    "fatos": ("exposição clara e cronológica dos fatos relevantes", False),
+    "pedidos": ("lista dos pedidos principais (cada item separado)", True),
+    "provas": ("lista sucinta dos meios de prova pertinentes", True),
+}
+
+RE_JSON_OBJ = re.compile(r"\{.*\}", flags=re.DOTALL)
+
+
 def _generate_section(context: str, instrucao: str, pergunta_usuario: str) -> str:
     """Gera uma seção textual usando Ollama com regras jurídicas do prompt."""
     question = (
@@ -121,6 +233,168 @@ def _generate_section(context: str, instrucao: str, pergunta_usuario: str) -> st
     return generate_with_ollama(context, question) if hasattr(generate_with_ollama, '__call__') else "(LLM não disponível)"
 
 
+def _coerce_section(nome: str, valor: Any) -> Any:
+    """Converte o valor bruto de uma seção para o formato esperado pelo template."""
+    _, is_list = SECOES_IA[nome]
+    if is_list:
+        if isinstance(valor, list):
+            return [str(v).strip() for v in valor if str(v).strip()]
+        return _parse_list_sections(str(valor or ""))
+    if isinstance(valor, list):
+        return "\n".join(str(v).strip() for v in valor if str(v).strip())
+    return str(valor or "").strip()
+
+
+def _parse_sections_json(raw: str, secoes: List[str]) -> Dict[str, Any]:
+    """Extrai as seções de uma resposta JSON do LLM.
+    Seções ausentes ou vazias ficam de fora do resultado (serão geradas no fallback).
+    """
+    m = RE_JSON_OBJ.search(raw or "")
+    if not m:
+        return {}
+    try:
+        obj = json.loads(m.group(0))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    out: Dict[str, Any] = {}
+    for nome in secoes:
+        valor = _coerce_section(nome, obj.get(nome))
+        if valor:
+            out[nome] = valor
+    return out
+
+
+def _generate_sections_json(context: str, secoes: List[str], pergunta_usuario: str) -> Dict[str, Any]:
+    """Gera todas as seções pedidas numa única chamada estruturada (JSON) ao Ollama."""
+    campos = "; ".join(
+        f'"{nome}": {"lista de strings" if SECOES_IA[nome][1] else "string"} com {SECOES_IA[nome][0]}'
+        for nome in secoes
+    )
+    question = (
+        "Elabore as seções de uma petição inicial de cobrança. Baseie-se estritamente no CONTEXTO. "
+        "Caso falte base, diga que não há fundamento suficiente. "
+        f"Responda APENAS com um objeto JSON com as chaves: {campos}. "
+        f"Pergunta do usuário/caso: {pergunta_usuario}"
+    )
+    raw = generate_with_ollama(context, question, json_mode=True)
+    return _parse_sections_json(raw, secoes)
+
+
+def _generate_sections_parallel(context: str, secoes: List[str], pergunta_usuario: str) -> Dict[str, Any]:
+    """Gera cada seção numa chamada própria, disparando as chamadas de forma concorrente."""
+    if not secoes:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(secoes)) as pool:
+        futures = {
+            nome: pool.submit(_generate_section, context, SECOES_IA[nome][0], pergunta_usuario)
+            for nome in secoes
+        }
+        return {nome: _coerce_section(nome, fut.result()) for nome, fut in futures.items()}
+
+
+def generate_sections(
+    context: str,
+    secoes: List[str],
+    pergunta_usuario: str,
+    mode: str = PETICAO_AI_MODE,
+    timings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Gera as seções faltantes da petição.
+
+    mode="json": uma única chamada estruturada; o que não vier (JSON inválido/chave ausente)
+    é gerado no fallback concorrente. mode="parallel": chamadas por seção, concorrentes.
+    Se `timings` for fornecido, registra a latência (s) de cada etapa.
+    """
+    if mode not in ("json", "parallel"):
+        raise ValueError(f"Modo de geração inválido: {mode!r} (use 'json' ou 'parallel')")
+    timings = timings if timings is not None else {}
+    timings["mode"] = mode
+    result: Dict[str, Any] = {}
+
+    if mode == "json":
+        t0 = time.perf_counter()
+        try:
+            result = _generate_sections_json(context, secoes, pergunta_usuario)
+        except Exception as e:
+            print(f"[ERRO OLLAMA JSON] {e}")
+        timings["json_s"] = round(time.perf_counter() - t0, 3)
+
+    pendentes = [s for s in secoes if s not in result]
+    if pendentes:
+        if mode == "json":
+            print(f"[PETICAO IA] fallback concorrente para: {', '.join(pendentes)}")
+        t0 = time.perf_counter()
+        result.update(_generate_sections_parallel(context, pendentes, pergunta_usuario))
+        timings["parallel_s"] = round(time.perf_counter() - t0, 3)
+        timings["fallback"] = pendentes if mode == "json" else []
+    return result
+
+
+def secoes_faltantes(data: Dict, force: bool = False) -> List[str]:
+    """Seções (fatos/pedidos/provas) que precisam ser geradas para `data`."""
+    return [nome for nome in SECOES_IA if force or not data.get(nome)]
+
+
+def generate_case_sections(
+    consulta_caso: str,
+    secoes: List[str],
+    k: int = 12,
+    collection: Optional[str] = None,
+    mode: str = PETICAO_AI_MODE,
+    timings: Optional[Dict[str, Any]] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Recupera o contexto legal do caso e gera as `secoes` pedidas (sem tocar em nenhum registro).
+    `on_stage` é chamado ao iniciar cada etapa ("retrieval", "generation").
+    """
+    collection = collection or QDRANT_COLLECTION
+    timings = timings if timings is not None else {}
+    if not secoes:
+        return {}
+
+    # Sanitizar/perguntar
+    if on_stage:
+        on_stage("retrieval")
+    consulta_norm = preprocess_question(consulta_caso)
+    t0 = time.perf_counter()
+    contexto = _retrieve_legal_context(consulta_norm, k=k, collection=collection)
+    timings["retrieval_s"] = round(time.perf_counter() - t0, 3)
+
+    # Geração
+    if on_stage:
+        on_stage("generation")
+    with span("generation"):
+        result = generate_sections(contexto, secoes, consulta_caso, mode=mode, timings=timings)
+    print(f"[PETICAO IA] modo={timings.get('mode')} secoes={','.join(secoes)}")
+    return result
+
+
+def complete_peticao_ai(
+    data: Dict,
+    consulta_caso: str,
+    k: int = 12,
+    collection: Optional[str] = None,
+    force: bool = False,
+    mode: str = PETICAO_AI_MODE,
+    timings: Optional[Dict[str, Any]] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """Preenche (em `data`) as seções faltantes via recuperação + LLM, sem renderizar.
+    Retorna o próprio `data`. Ver `generate_peticao_inicial_cobranca_ai` para os parâmetros;
+    `timings["total_s"]` cobre recuperação + geração (quem renderiza depois pode sobrescrever).
+    """
+    timings = timings if timings is not None else {}
+    t_inicio = time.perf_counter()
+    faltantes = secoes_faltantes(data, force)
+    data.update(generate_case_sections(
+        consulta_caso, faltantes, k=k, collection=collection, mode=mode, timings=timings, on_stage=on_stage
+    ))
+    timings["total_s"] = round(time.perf_counter() - t_inicio, 3)
+    return data
+
+
 def generate_peticao_inicial_cobranca_ai(
     data: Dict,
     consulta_caso: str,
@@ -128,6 +402,8 @@ def generate_peticao_inicial_cobranca_ai(
     n_context: int = 6,
     collection: Optional[str] = None,
     force: bool = False,
+    mode: str = PETICAO_AI_MODE,
+    timings: Optional[Dict[str, Any]] = None,
 ) -> str:
     """Gera petição inicial com auxílio de IA.
 
@@ -142,41 +418,12 @@ def generate_peticao_inicial_cobranca_ai(
       n_context: alias mantido (usado se quiser futura fusão com rerank; aqui não aplicamos).
       collection: nome da collection Qdrant (default ambiente).
       force: sobrescreve seções mesmo se já existir conteúdo.
+      mode: "json" (uma chamada estruturada, com fallback concorrente) ou "parallel".
+      timings: dict opcional preenchido com as latências (s) de cada etapa e total.
     """
-    collection = collection or QDRANT_COLLECTION
-
-    # Sanitizar/perguntar
-    consulta_norm = preprocess_question(consulta_caso)
-    contexto = _retrieve_legal_context(consulta_norm, k=k, collection=collection)
-
-    # Seções a gerar
-    faltantes = []
-    if force or not data.get("fatos"):
-        faltantes.append("fatos")
-    if force or not data.get("pedidos"):
-        faltantes.append("pedidos")
-    if force or not data.get("provas"):
-        faltantes.append("provas")
-
-    if not faltantes:
-        # Nada a gerar; delega à função padrão
-        return generate_peticao_inicial_cobranca(data)
-
-    # Geração
-    if "fatos" in faltantes:
-        texto_fatos = _generate_section(contexto, "exposição clara e cronológica dos fatos relevantes", consulta_caso)
-        data["fatos"] = texto_fatos.strip()
-    if "pedidos" in faltantes:
-        texto_pedidos = _generate_section(contexto, "lista dos pedidos principais (cada item separado)", consulta_caso)
-        data["pedidos"] = _parse_list_sections(texto_pedidos)
-    if "provas" in faltantes:
-        texto_provas = _generate_section(contexto, "lista sucinta dos meios de prova pertinentes", consulta_caso)
-        data["provas"] = _parse_list_sections(texto_provas)
-
-    # Garantir formato de valor da causa se numérico
-    if isinstance(data.get("valor_causa"), (int, float)):
-        # será formatado na função principal
-        pass
-
-    return generate_peticao_inicial_cobranca(data)
-
+    timings = timings if timings is not None else {}
+    t_inicio = time.perf_counter()
+    complete_peticao_ai(data, consulta_caso, k=k, collection=collection, force=force, mode=mode, timings=timings)
+    out_path = generate_peticao_inicial_cobranca(data)
+    timings["total_s"] = round(time.perf_counter() - t_inicio, 3)
+    return out_path
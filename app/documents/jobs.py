@@ -0,0 +1,256 @@
+"""Fila de geração de documentos em background.
+
+Um pool limitado de workers (separado do threadpool das requisições HTTP) executa a
+geração de petições, avulsas (`kind` "peticao", um .docx) ou em lote (`kind` "lote", um .zip,
+ver app/documents/batch.py); o endpoint só enfileira e devolve o id do job. Jobs com entrada
+idêntica são deduplicados enquanto o original não falhar ou expirar.
+
+O resultado (.docx/.zip) de um job concluído não fica em memória: vai para um arquivo em
+DOCUMENT_JOBS_DIR (um subdiretório por processo, apagado na saída) e é removido no primeiro
+download ou quando o job sai da retenção (DOCUMENT_JOBS_KEEP).
+"""
+from __future__ import annotations
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from app.documents.batch import generate_batch
+from app.documents.generator import (
+    complete_peticao_ai,
+    render_peticao_inicial_cobranca,
+    save_output,
+    PETICAO_AI_MODE,
+)
+from observability import Counter, Gauge, Histogram
+
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+DOCUMENT_QUEUE_MAX = int(os.getenv("DOCUMENT_QUEUE_MAX", "50"))     # jobs pendentes (fila + em execução)
+DOCUMENT_JOBS_KEEP = int(os.getenv("DOCUMENT_JOBS_KEEP", "500"))    # jobs finalizados mantidos para consulta
+DOCUMENT_JOBS_DIR = os.getenv("DOCUMENT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "direito-doc-jobs"))
+
+# Etapas na ordem em que acontecem
+STAGES = ["queued", "retrieval", "generation", "render", "done"]
+
+JOBS_TOTAL = Counter("direito_document_jobs_total", "Jobs de documento por desfecho", ["result"])
+JOBS_PENDING = Gauge("direito_document_jobs_pending", "Jobs de documento na fila/em execução", ["status"])
+JOB_QUEUE_WAIT = Histogram("direito_document_job_queue_wait_seconds", "Espera na fila até um worker iniciar o job")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class DocumentJobStatus(BaseModel):
+    job_id: str
+    kind: str = "peticao"  # 'peticao' (.docx) | 'lote' (.zip)
+    status: str  # 'queued' | 'running' | 'done' | 'failed'
+    stage: str
+    progress: float  # 0..1, pela posição da etapa em STAGES
+    stages: Dict[str, float] = {}  # etapa -> duração (s) das concluídas
+    ai_used: bool = False
+    doc_path: Optional[str] = None
+    content_available: bool = False  # resultado ainda disponível para download (sai no 1º download)
+    error: Optional[str] = None
+    stats: Dict[str, Any] = {}  # lote: registros, grupos, registros/s (ver generate_batch)
+    created_at: float
+    finished_at: Optional[float] = None
+
+
+class _Job:
+    def __init__(self, job_id: str, key: str, payload: Dict[str, Any]):
+        self.id = job_id
+        self.key = key
+        self.payload = payload
+        self.status = "queued"
+        self.stage = "queued"
+        self.stages: Dict[str, float] = {}
+        self.content_path: Optional[str] = None  # resultado em disco (ver DOCUMENT_JOBS_DIR)
+        self.doc_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.stats: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._stage_t0 = time.perf_counter()
+
+    def enter(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages[self.stage] = round(now - self._stage_t0, 3)
+        self.stage = stage
+        self._stage_t0 = now
+
+    def to_status(self) -> DocumentJobStatus:
+        return DocumentJobStatus(
+            job_id=self.id,
+            kind=self.payload.get("kind", "peticao"),
+            status=self.status,
+            stage=self.stage,
+            progress=STAGES.index(self.stage) / (len(STAGES) - 1),
+            stages=dict(self.stages),
+            ai_used=bool(self.payload.get("use_ai")),
+            doc_path=self.doc_path,
+            content_available=self.content_path is not None,
+            error=self.error,
+            stats=dict(self.stats),
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+        )
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def job_key(payload: Dict[str, Any]) -> str:
+    """Chave de deduplicação: hash do JSON canônico da entrada."""
+    canon = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+class DocumentJobQueue:
+    """Fila em memória (por processo) com pool limitado de workers."""
+
+    def __init__(self, workers: int = DOCUMENT_WORKERS, max_pending: int = DOCUMENT_QUEUE_MAX, keep: int = DOCUMENT_JOBS_KEEP):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doc-job")
+        self._max_pending = max_pending
+        self._keep = keep
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dir: Optional[str] = None
+        JOBS_PENDING.set_function(self._pending_by_status)
+
+    def submit(self, payload: Dict[str, Any]) -> Tuple[DocumentJobStatus, bool]:
+        """Enfileira um job. Retorna (status, deduplicado)."""
+        key = job_key(payload)
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key, ""))
+            # reaproveita o job em andamento ou concluído com o resultado ainda disponível
+            if existing is not None and existing.status != "failed" and (
+                    existing.status != "done" or existing.content_path is not None):
+                JOBS_TOTAL.inc(result="deduplicated")
+                return existing.to_status(), True
+            if self._pending() >= self._max_pending:
+                JOBS_TOTAL.inc(result="rejected")
+                raise QueueFullError(f"Fila de documentos cheia ({self._max_pending} jobs pendentes).")
+            job = _Job(uuid4().hex, key, payload)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self._evict()
+        JOBS_TOTAL.inc(result="submitted")
+        self._pool.submit(self._run, job)
+        return job.to_status(), False
+
+    def get(self, job_id: str) -> Optional[DocumentJobStatus]:
+        job = self._jobs.get(job_id)
+        return job.to_status() if job else None
+
+    def take_content(self, job_id: str) -> Optional[bytes]:
+        """Resultado do job (None se não há) e libera o arquivo: cada resultado é baixado uma vez."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            path = job.content_path if job else None
+            if path is None:
+                return None
+            job.content_path = None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            _remove(path)
+
+    def _store(self, job: _Job, content: bytes) -> None:
+        """Grava o resultado em disco (escrita atômica) e guarda só o caminho no job."""
+        with self._lock:
+            if self._dir is None:
+                os.makedirs(DOCUMENT_JOBS_DIR, exist_ok=True)
+                self._dir = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=DOCUMENT_JOBS_DIR)
+                atexit.register(shutil.rmtree, self._dir, True)
+        ext = ".zip" if job.payload.get("kind") == "lote" else ".docx"
+        path = os.path.join(self._dir, f"{job.id}{ext}")
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+        job.content_path = path
+
+    def list(self) -> List[DocumentJobStatus]:
+        with self._lock:
+            return [j.to_status() for j in self._jobs.values()]
+
+    def _pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+
+    def _pending_by_status(self) -> Dict[Tuple[str, ...], float]:
+        jobs = list(self._jobs.values())
+        return {(s,): float(sum(1 for j in jobs if j.status == s)) for s in ("queued", "running")}
+
+    def _evict(self) -> None:
+        """Remove os jobs finalizados mais antigos acima do limite `keep`."""
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job in finished[: max(0, len(finished) - self._keep)]:
+            if job.content_path:
+                _remove(job.content_path)
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    def _run(self, job: _Job) -> None:
+        job.status = "running"
+        JOB_QUEUE_WAIT.observe(time.time() - job.created_at)
+        p = job.payload
+        try:
+            if p.get("kind") == "lote":
+                self._run_batch(job)
+                return
+            data = dict(p["data"])
+            if p.get("use_ai"):
+                complete_peticao_ai(
+                    data,
+                    consulta_caso=p["consulta_caso"],
+                    k=p.get("k", 12),
+                    force=p.get("force", False),
+                    mode=p.get("ai_mode") or PETICAO_AI_MODE,
+                    on_stage=job.enter,
+                )
+            job.enter("render")
+            content = render_peticao_inicial_cobranca(data)
+            if p.get("persist", True):
+                job.doc_path = save_output(content)
+            self._store(job, content)
+            job.enter("done")
+            job.status = "done"
+            JOBS_TOTAL.inc(result="done")
+        except Exception as e:
+            print(f"[ERRO JOB DOCUMENTO] {job.id}: {e}")
+            job.error = str(e)
+            job.status = "failed"
+            JOBS_TOTAL.inc(result="failed")
+        finally:
+            job.finished_at = time.time()
+
+    def _run_batch(self, job: _Job) -> None:
+        p = job.payload
+        content, job.stats = generate_batch(
+            p["items"],
+            use_ai=p.get("use_ai", False),
+            force=p.get("force", False),
+            mode=p.get("ai_mode") or PETICAO_AI_MODE,
+            on_stage=job.enter,
+        )
+        self._store(job, content)
+        job.enter("done")
+        job.status = "done"
+        JOBS_TOTAL.inc(result="done")
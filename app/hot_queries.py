@@ -0,0 +1,161 @@
+"""Consultas frequentes: log compacto das perguntas do /chat e resultados pré-calculados.
+
+1. O /chat grava em QUERY_LOG_PATH cada pergunta isolada (primeiro turno, ou janela de histórico
+   de uma mensagem) com os espaços colapsados, uma por linha: `<epoch>\t<consulta>`. Nada além do
+   texto da consulta (sem id de conversa, usuário ou resposta); consultas longas não são gravadas.
+2. `python -m scripts.hot_queries` conta o log por consulta normalizada e grava as N mais frequentes
+   em HOT_QUERIES_PATH, cada uma com o texto original mais comum entre as suas variantes.
+3. Na subida (etapa `hot_queries` do aquecimento), cada worker roda o mesmo pipeline do /chat
+   (preprocess -> busca -> rerank) sobre esse texto original e guarda o resultado em memória; um
+   /chat com a mesma consulta normalizada (só a chave do cache) pula a recuperação inteira.
+4. Uma thread confere a versão da collection a cada HOT_QUERIES_CHECK_S: o alvo do alias mais a
+   marca de revisão que o indexador troca a cada execução que altera pontos (inclusive `--sync`
+   no lugar), ver scripts/collection_versions.py. Se mudou, descarta os resultados e recalcula.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from observability import CACHE_EVENTS, Gauge
+
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "data/query_log/queries.log")
+QUERY_LOG_MAX_CHARS = int(os.getenv("QUERY_LOG_MAX_CHARS", "300"))
+HOT_QUERIES_ENABLED = os.getenv("HOT_QUERIES_ENABLED", "true").lower() in ("1", "true", "yes")
+HOT_QUERIES_PATH = os.getenv("HOT_QUERIES_PATH", "data/hot_queries.json")
+HOT_QUERIES_K = int(os.getenv("HOT_QUERIES_K", "12"))  # recall do /chat (ChatRequest.k padrão)
+HOT_QUERIES_CHECK_S = float(os.getenv("HOT_QUERIES_CHECK_S", "30"))
+
+HOT_QUERIES_CACHED = Gauge("direito_hot_queries_cached", "Consultas frequentes com resultado pré-calculado")
+
+
+def normalize_query(text: str) -> str:
+    """Forma canônica da consulta (chave do log e do cache): NFKC, minúsculas, espaços colapsados,
+    sem pontuação final."""
+    t = " ".join(unicodedata.normalize("NFKC", text or "").lower().split())
+    return t.rstrip("?!. ")
+
+
+class QueryLog:
+    """Append de uma linha por consulta; vários workers podem gravar no mesmo arquivo (O_APPEND)."""
+
+    def __init__(self, path: str = QUERY_LOG_PATH, enabled: bool = QUERY_LOG_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._f = None
+        self._lock = threading.Lock()
+
+    def append(self, query: str) -> None:
+        # texto original (o que o pipeline vê), numa linha; a normalização fica para quem lê o log
+        q = " ".join((query or "").split())
+        if not self.enabled or not normalize_query(q) or len(q) > QUERY_LOG_MAX_CHARS:
+            return
+        try:
+            with self._lock:
+                if self._f is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._f.write(f"{int(time.time())}\t{q}\n")
+        except OSError as e:
+            print(f"[ERRO QUERY LOG] {e}")
+            self.enabled = False
+
+
+def load_hot_queries(path: str = HOT_QUERIES_PATH) -> List[Tuple[str, str]]:
+    """Pares (chave normalizada, texto original) de HOT_QUERIES_PATH (gerado por scripts.hot_queries),
+    na ordem do arquivo e sem chaves repetidas; [] se não existir."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    vistas: Dict[str, str] = {}
+    for q in data.get("queries", []):
+        texto = " ".join((q["query"] if isinstance(q, dict) else q).split())
+        n = normalize_query(texto)
+        if n:
+            vistas.setdefault(n, texto)
+    return list(vistas.items())
+
+
+class HotQueryCache:
+    """Resultados pré-calculados (passagens após o rerank) das consultas frequentes, por worker.
+
+    `compute(consultas, k)` roda o pipeline do /chat em lote sobre os textos originais; o resultado
+    fica sob a consulta normalizada. `version()` identifica a versão da collection em uso.
+    """
+
+    def __init__(self, compute: Callable[[List[str], int], List[List[Dict[str, Any]]]], version: Callable[[], str],
+                 path: str = HOT_QUERIES_PATH, k: int = HOT_QUERIES_K, batch: int = 16):
+        self.compute = compute
+        self.version_fn = version
+        self.path = path
+        self.k = k
+        self.batch = batch
+        self.version: Optional[str] = None
+        self.refreshed_at: Optional[float] = None
+        self._results: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        HOT_QUERIES_CACHED.set_function(lambda: {(): len(self._results)})
+
+    def get(self, query: str, k: int) -> Optional[List[Dict[str, Any]]]:
+        if k != self.k or not self._results:
+            return None
+        r = self._results.get(normalize_query(query))
+        CACHE_EVENTS.inc(cache="hot_query", result="hit" if r is not None else "miss")
+        return r
+
+    def refresh(self) -> int:
+        """Recalcula todas as consultas de `path` na versão atual da collection. Retorna quantas."""
+        with self._refresh_lock:
+            versao = self.version_fn()
+            consultas = load_hot_queries(self.path)
+            novos: Dict[str, List[Dict[str, Any]]] = {}
+            for i in range(0, len(consultas), self.batch):
+                chaves, textos = zip(*consultas[i:i + self.batch])
+                novos.update(zip(chaves, self.compute(list(textos), self.k)))
+            with self._lock:
+                self._results, self.version, self.refreshed_at = novos, versao, time.time()
+            return len(novos)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._results, self.version = {}, None
+
+    def check(self) -> bool:
+        """Confere a versão da collection; se mudou, descarta os resultados e recalcula. Retorna se
+        recalculou."""
+        versao = self.version_fn()
+        if versao == self.version:
+            return False
+        print(f"[HOT QUERIES] collection mudou ({self.version} -> {versao}); recalculando")
+        self.invalidate()  # nada da versão antiga é servido enquanto recalcula
+        self.refresh()
+        return True
+
+    def _watch(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.check()
+            except Exception as e:  # Qdrant fora: mantém o que tem e tenta de novo no próximo ciclo
+                print(f"[ERRO HOT QUERIES] {e}")
+
+    def start_watch(self, interval: float = HOT_QUERIES_CHECK_S) -> Optional[threading.Thread]:
+        if interval <= 0:
+            return None
+        t = threading.Thread(target=self._watch, args=(interval,), name="hot-queries", daemon=True)
+        t.start()
+        return t
+
+
+def collection_version(client_fn: Callable[[], Any], collection: str) -> str:
+    """Versão da collection consultada: alvo do alias (blue/green) + marca de revisão gravada pelo
+    indexador. Um único `get_aliases`, sem ler pontos; "-" enquanto não houver marca."""
+    from scripts.collection_versions import collection_revision
+    alvo, rev = collection_revision(client_fn(), collection)
+    return f"{alvo}:{rev or '-'}"
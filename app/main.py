@@ -1,24 +1,90 @@
-from fastapi import FastAPI, Body, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Body, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from app.documents.generator import generate_peticao_inicial_cobranca_ai, generate_peticao_inicial_cobranca
+from typing import List, Optional, Dict, Any, Literal
+from app.documents.generator import (
+    complete_peticao_ai,
+    render_peticao_inicial_cobranca,
+    save_output,
+    output_filename,
+    DOCX_MEDIA_TYPE,
+    OUTPUTS_PERSIST,
+    PETICAO_AI_MODE,
+)
+from app.documents.jobs import DocumentJobQueue, DocumentJobStatus, QueueFullError
 import os
+import time
+from pathlib import Path
 from retrieval_local import RetrieverLocal
-from scripts.rerank_local import rerank
+from scripts.rerank_local import rerank, rerank_many
 from pydantic import BaseModel
 from typing import List
 from app.prompts.legal_prompting import preprocess_question, build_prompt
 from uuid import uuid4
 from llm_ollama import generate_with_ollama
-from app.conversation.manager import Conversation, ConversationManagerAPI, ChatMessage, ChatRequest, ChatResponse
+from observability import (
+    PROFILE_ALLOWED,
+    REQUEST_SECONDS,
+    SamplingProfiler,
+    render_metrics,
+    server_timing,
+    span,
+    start_trace,
+)
+from app.conversation.manager import (
+    ChatMessage,
+    ChatRequest,
+    ChatResponse,
+    Conversation,
+    ConversationManagerAPI,
+    InvalidCursorError,
+    cursor_before,
+    paginate,
+)
+from app.hot_queries import HOT_QUERIES_ENABLED, HotQueryCache, QueryLog, collection_version
+from app.readiness import Readiness, dependency_probes, start_warmup
 
 # (opcional) só se for usar LLM local:
 USE_OLLAMA = os.getenv("USE_OLLAMA", "false").lower() in ("1","true","yes")
     
 retriever = RetrieverLocal()
+readiness = Readiness()
+probes = dependency_probes(retriever.host, retriever.port, retriever.collection)
+
+
+def _recuperar_lote(consultas: List[str], k: int) -> List[List[Dict[str, Any]]]:
+    """Mesmo pipeline do /chat (primeiro turno) para várias consultas, com rerank em lote."""
+    raws = [retriever.search(preprocess_question(q), k=k) for q in consultas]
+    return rerank_many(consultas, raws, top_n=5)
+
+
+query_log = QueryLog()
+hot_queries = HotQueryCache(_recuperar_lote, lambda: collection_version(lambda: retriever.client, retriever.collection))
 
-app = FastAPI(title="Legal Assistant MVP")
+
+def _aquecer_hot_queries() -> None:
+    try:
+        n = hot_queries.refresh()
+    finally:
+        hot_queries.start_watch()  # se falhou (ex. Qdrant fora), a thread tenta de novo
+    print(f"[WARMUP] {n} consultas frequentes pré-calculadas (collection {hot_queries.version})")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # aquece modelos + busca em background: a porta abre na hora e /readyz diz quando está pronto
+    start_warmup(readiness, {
+        "embed": lambda: retriever.embed("aquecimento"),
+        "rerank": lambda: rerank("aquecimento", [{"texto": "aquecimento"}], top_n=1),
+        "search": lambda: retriever.search("aquecimento", k=1),
+        **({"hot_queries": _aquecer_hot_queries} if HOT_QUERIES_ENABLED else {}),
+    })
+    yield
+
+
+app = FastAPI(title="Legal Assistant MVP", lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -26,15 +92,71 @@ app.add_middleware(
     allow_origins=["*"],  # Permite todas as origens, ajuste conforme necessário
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # paginação de /conversation/{cid} e /conversations
 )
 
 conversation_manager = ConversationManagerAPI()
 
+
+@app.middleware("http")
+async def instrumentacao(request: Request, call_next):
+    """Mede a requisição e as etapas (spans): histogramas em /metrics e header Server-Timing.
+    Com PROFILE_ALLOWED=1, o header `X-Profile: 1` liga o profiler amostral só nesta requisição
+    (pilhas gravadas em PROFILE_DIR; caminho no header X-Profile-Path).
+    """
+    trace = start_trace()
+    if PROFILE_ALLOWED and request.headers.get("x-profile") == "1":
+        trace.profiler = SamplingProfiler().start()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        total = time.perf_counter() - t0
+        route = getattr(request.scope.get("route"), "path", "desconhecida")  # template, não o path com ids
+        REQUEST_SECONDS.observe(total, method=request.method, route=route, status=str(status))
+        if trace.profiler is not None:
+            trace.profiler.stop()
+    response.headers["Server-Timing"] = server_timing(trace, total)
+    if trace.profiler is not None:
+        response.headers["X-Profile-Path"] = trace.profiler.dump(route)
+    return response
+
+
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness: o processo está de pé (não olha modelos nem dependências)."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Readiness: 200 quando o aquecimento (e o que mais estiver em READY_REQUIRE) concluiu; senão 503."""
+    rep = readiness.report(probes)
+    return JSONResponse(rep, status_code=200 if rep["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _pagina(items: List[Any], limit: Optional[int], cursor: Optional[str], response: Response) -> List[Any]:
+    """Aplica `paginate` e devolve o cursor da página anterior no header X-Next-Cursor."""
+    try:
+        page, next_cursor = paginate(items, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
 @app.get("/conversations", response_model=List[Conversation])
-def get_conversations():
+def get_conversations(response: Response, limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None):
     print("Fetching all conversations...")
-    return conversation_manager.get_all_conversations()
+    return _pagina(conversation_manager.get_all_conversations(), limit, cursor, response)
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -59,24 +181,42 @@ def chat(req: ChatRequest):
 
     # # 1️⃣ Construir contexto de histórico (janela)
     history = conversation_manager.get_messages(cid)
+
+    def mensagens(assistant_msg: ChatMessage, completas) -> Dict[str, Any]:
+        """Campos de mensagens do ChatResponse; no modo delta não busca a conversa de novo."""
+        if req.messages_mode == 'delta':
+            # posição da mensagem do usuário deste turno em get_messages(cid), a mesma lista que
+            # GET /conversation/{cid} pagina
+            return {"messages": [user_message, assistant_msg], "messages_mode": "delta",
+                    "next_cursor": cursor_before(len(history) - 1)}
+        return {"messages": completas()}
     # Seleciona últimas mensagens do usuário para compor consulta
     user_history_texts = [m.content for m in history if m.role == 'user'][-req.max_history:]
-    combined_query = " \n".join(user_history_texts)
-    question = preprocess_question(combined_query)
+    # Pergunta isolada (sem histórico na janela): vai para o log de consultas e pode estar pré-calculada
+    isolada = len(user_history_texts) == 1
+    if isolada:
+        query_log.append(req.message)
+    ranked = hot_queries.get(req.message, max(8, req.k)) if isolada else None
 
-    # 2️⃣ Recuperar passagens
-    try:
-        raw = retriever.search(question, k=max(8, req.k))
-    except ConnectionError as ce:
-        return ChatResponse(
-            answer=f"Erro: Não foi possível acessar o Qdrant. {str(ce)}",
-            citations=[],
-            conversation_id=cid,
-            messages=history + [ChatMessage(role='assistant', content='Falha de conexão com base de vetores.')]
-        )
+    if ranked is None:
+        combined_query = " \n".join(user_history_texts)
+        with span("preprocess"):
+            question = preprocess_question(combined_query)
+
+        # 2️⃣ Recuperar passagens
+        try:
+            raw = retriever.search(question, k=max(8, req.k))
+        except ConnectionError as ce:
+            falha = ChatMessage(role='assistant', content='Falha de conexão com base de vetores.')
+            return ChatResponse(
+                answer=f"Erro: Não foi possível acessar o Qdrant. {str(ce)}",
+                citations=[],
+                conversation_id=cid,
+                **mensagens(falha, lambda: history + [falha])
+            )
 
-    # 3️⃣ Rerank local
-    ranked = rerank(req.message, raw, top_n=5)  # usa mensagem atual para rerank
+        # 3️⃣ Rerank local
+        ranked = rerank(req.message, raw, top_n=5)  # usa mensagem atual para rerank
 
     if not ranked:
         assistant_answer = "Não encontrei base suficiente nos materiais indexados para responder com segurança."
@@ -86,7 +226,7 @@ def chat(req: ChatRequest):
             answer=assistant_answer,
             citations=[],
             conversation_id=cid,
-            messages=conversation_manager.get(cid)
+            **mensagens(assistant_msg, lambda: conversation_manager.get_messages(cid))
         )
 
     # 4️⃣ Montar contexto formatado
@@ -125,12 +265,15 @@ def chat(req: ChatRequest):
         answer=answer,
         citations=citations,
         conversation_id=cid,
-        messages=conversation_manager.get_messages(cid)
+        **mensagens(assistant_msg, lambda: conversation_manager.get_messages(cid))
     )
 
 @app.get("/conversation/{cid}", response_model=List[ChatMessage])
-def get_conversation(cid: str):
-    return conversation_manager.get(cid)
+def get_conversation(cid: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=500),
+                     cursor: Optional[str] = None):
+    """Sem `limit`, a conversa inteira. Com `limit`, as últimas `limit` mensagens antes de `cursor`
+    (em ordem cronológica); X-Next-Cursor traz o cursor da página anterior, se houver."""
+    return _pagina(conversation_manager.get_messages(cid), limit, cursor, response)
 
 @app.post("/conversation/{cid}/reset")
 def reset_conversation(cid: str):
@@ -160,22 +303,114 @@ class PeticaoRequest(BaseModel):
     consulta_caso: str
     use_ai: bool = False
     force: bool = False
+    ai_mode: Optional[Literal["json", "parallel"]] = None  # "json" (uma chamada) ou "parallel"; default PETICAO_AI_MODE
+    download: bool = False  # devolve o .docx direto na resposta (sem depender de outputs/)
+    persist: bool = OUTPUTS_PERSIST  # grava em outputs/ (obrigatório se download=False)
 
 @app.post('/documents/peticao-inicial-cobranca')
 def gerar_peticao(req: PeticaoRequest):
+    if not req.download and not req.persist:
+        raise HTTPException(status_code=400, detail="Use download=true ou persist=true.")
+    timings: Dict[str, Any] = {}
+    t_inicio = time.perf_counter()
+    data = req.data.model_dump()
     if req.use_ai:
-        path = generate_peticao_inicial_cobranca_ai(
-            req.data.model_dump(),
+        complete_peticao_ai(
+            data,
             consulta_caso=req.consulta_caso,
             k=12,
-            force=req.force
+            force=req.force,
+            mode=req.ai_mode or PETICAO_AI_MODE,
+            timings=timings,
         )
         ai_used = True
     else:
-        path = generate_peticao_inicial_cobranca(req.data.model_dump())
         ai_used = False
+    t0 = time.perf_counter()
+    content = render_peticao_inicial_cobranca(data)
+    path = save_output(content) if req.persist else None
+    timings["render_s"] = round(time.perf_counter() - t0, 3)
+    timings["total_s"] = round(time.perf_counter() - t_inicio, 3)  # ponta a ponta: IA + render + gravação
+
+    if req.download:
+        headers = {"Content-Disposition": f'attachment; filename="{Path(path).name if path else output_filename()}"'}
+        if path:
+            headers["X-Doc-Path"] = path
+        return Response(content=content, media_type=DOCX_MEDIA_TYPE, headers=headers)
     return {
         "doc_path": path,
         "ai_used": ai_used,
-        "data": req.data.model_dump()
+        "timings": timings,
+        "data": data
     }
+
+
+# ===== Jobs de documentos (assíncrono) =====
+
+document_jobs = DocumentJobQueue()
+
+@app.post('/documents/jobs/peticao-inicial-cobranca', status_code=202)
+def enfileirar_peticao(req: PeticaoRequest):
+    """Enfileira a geração e retorna o id do job imediatamente (deduplica entradas idênticas)."""
+    payload = req.model_dump(exclude={"download"})
+    try:
+        job, dedup = document_jobs.submit(payload)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job.job_id, "status": job.status, "stage": job.stage, "deduplicated": dedup}
+
+@app.get('/documents/jobs/{job_id}', response_model=DocumentJobStatus)
+def status_job(job_id: str):
+    job = document_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job
+
+@app.get('/documents/jobs/{job_id}/download')
+def download_job(job_id: str):
+    job = document_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status={job.status}, etapa={job.stage}).")
+    if job.kind == "lote":
+        filename, media_type = f"peticoes_cobranca_{job_id}.zip", "application/zip"
+    else:
+        filename, media_type = (Path(job.doc_path).name if job.doc_path else f"{job_id}.docx"), DOCX_MEDIA_TYPE
+    content = document_jobs.take_content(job_id)
+    if content is None:
+        detail = "Resultado já baixado ou expirado."
+        if job.doc_path:
+            detail += f" O documento foi gravado em {job.doc_path}."
+        raise HTTPException(status_code=410, detail=detail)
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ===== Lote =====
+
+class PeticaoBatchItem(BaseModel):
+    data: PeticaoData
+    consulta_caso: str = ""
+
+class PeticaoBatchRequest(BaseModel):
+    items: List[PeticaoBatchItem]
+    use_ai: bool = False
+    force: bool = False
+    ai_mode: Optional[Literal["json", "parallel"]] = None
+
+@app.post('/documents/batch/peticao-inicial-cobranca', status_code=202)
+def gerar_peticoes_lote(req: PeticaoBatchRequest):
+    """Enfileira o lote na fila de documentos e retorna o id do job; o .zip sai em
+    /documents/jobs/{job_id}/download e as estatísticas (registros/s) em `stats` do status."""
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Lista de itens vazia.")
+    payload = {"kind": "lote", **req.model_dump()}
+    try:
+        job, dedup = document_jobs.submit(payload)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job.job_id, "status": job.status, "stage": job.stage, "deduplicated": dedup}
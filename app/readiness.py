@@ -0,0 +1,143 @@
+"""Aquecimento em background e prontidão da API (/healthz, /readyz).
+
+Na subida, uma thread carrega os modelos e faz um embed, um rerank e uma busca de mentira
+(a primeira inferência paga a inicialização do torch). Enquanto isso o processo já responde:
+/healthz indica só que está vivo; /readyz responde 200 quando as etapas de READY_REQUIRE
+terminaram (default: embed, rerank e search). A busca de aquecimento é "melhor esforço": conta
+como concluída mesmo se o Qdrant falhar (o client já foi importado e criado). Dependências externas (Qdrant, histórico, Ollama) são
+sondadas a cada /readyz (resultado em cache por READY_PROBE_TTL) e só bloqueiam a prontidão se
+estiverem em READY_REQUIRE: uma dependência compartilhada fora do ar não deve tirar todas as
+réplicas do balanceador.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from app.conversation.manager import API_URL as HISTORY_API_URL
+from llm_ollama import OLLAMA_HOST
+from observability import Gauge
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+READY_REQUIRE = [c.strip() for c in os.getenv("READY_REQUIRE", "embed,rerank,search").split(",") if c.strip()]
+READY_PROBE_TIMEOUT = float(os.getenv("READY_PROBE_TIMEOUT", "1.0"))
+READY_PROBE_TTL = float(os.getenv("READY_PROBE_TTL", "5"))
+
+# Etapas do aquecimento, na ordem; as de melhor esforço contam como concluídas mesmo com erro.
+# hot_queries (pré-cálculo das consultas frequentes, app/hot_queries.py) fica fora de READY_REQUIRE:
+# enquanto não termina, essas consultas só passam pelo pipeline normal.
+WARMUP_STEPS = ["embed", "rerank", "search", "hot_queries"]
+WARMUP_BEST_EFFORT = {"search", "hot_queries"}
+
+STARTUP_READY_SECONDS = Gauge("direito_startup_ready_seconds", "Segundos do import da API até ficar pronta")
+
+
+class Readiness:
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.warmup: Dict[str, Dict[str, Any]] = {s: {"status": "pending"} for s in WARMUP_STEPS}
+        self._deps: Dict[str, Dict[str, Any]] = {}
+        self._deps_at = 0.0
+        self._lock = threading.Lock()
+
+    def set_step(self, name: str, status: str, seconds: Optional[float] = None, error: Optional[str] = None) -> None:
+        info: Dict[str, Any] = {"status": status}
+        if seconds is not None:
+            info["seconds"] = round(seconds, 3)
+        if error:
+            info["error"] = error
+        with self._lock:
+            self.warmup[name] = info
+
+    def dependencies(self, probes: Dict[str, Callable[[], None]]) -> Dict[str, Dict[str, Any]]:
+        """Estado das dependências externas (sondadas em paralelo, com cache de READY_PROBE_TTL)."""
+        with self._lock:
+            if self._deps and time.time() - self._deps_at < READY_PROBE_TTL:
+                return self._deps
+        with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+            futures = {nome: pool.submit(_timed, fn) for nome, fn in probes.items()}
+            deps = {nome: fut.result() for nome, fut in futures.items()}
+        with self._lock:
+            self._deps, self._deps_at = deps, time.time()
+        return deps
+
+    def report(self, probes: Dict[str, Callable[[], None]]) -> Dict[str, Any]:
+        deps = self.dependencies(probes) if probes else dict(self._deps)
+        with self._lock:
+            etapas = {**self.warmup, **deps}
+            pronto = all(_satisfeita(c, etapas.get(c, {})) for c in READY_REQUIRE)
+            if pronto and self.ready_at is None:
+                self.ready_at = time.time()
+                STARTUP_READY_SECONDS.set(self.ready_at - self.started_at)
+            return {
+                "ready": pronto,
+                "require": READY_REQUIRE,
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "ready_after_s": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+                "warmup": dict(self.warmup),
+                "dependencies": deps,
+            }
+
+
+def _satisfeita(nome: str, info: Dict[str, Any]) -> bool:
+    st = info.get("status")
+    return st in ("ok", "skipped") or (st == "error" and nome in WARMUP_BEST_EFFORT)
+
+
+def _timed(fn: Callable[[], None]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        fn()
+        return {"status": "ok", "seconds": round(time.perf_counter() - t0, 3)}
+    except Exception as e:
+        return {"status": "error", "seconds": round(time.perf_counter() - t0, 3), "error": str(e)[:200]}
+
+
+def dependency_probes(qdrant_host: str, qdrant_port: int, collection: str) -> Dict[str, Callable[[], None]]:
+    """Sondagens HTTP baratas de cada dependência externa (levantam exceção se indisponível)."""
+    def qdrant():
+        r = requests.get(f"http://{qdrant_host}:{qdrant_port}/collections/{collection}", timeout=READY_PROBE_TIMEOUT)
+        r.raise_for_status()
+
+    def history():
+        r = requests.get(HISTORY_API_URL, timeout=READY_PROBE_TIMEOUT)
+        if r.status_code >= 500:  # qualquer resposta < 500 = serviço no ar
+            r.raise_for_status()
+
+    def ollama():
+        r = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=READY_PROBE_TIMEOUT)
+        r.raise_for_status()
+
+    return {"qdrant": qdrant, "history": history, "ollama": ollama}
+
+
+def warmup(state: Readiness, steps: Dict[str, Callable[[], Any]]) -> None:
+    """Executa cada etapa de aquecimento; a falha de uma não impede as seguintes."""
+    for nome in WARMUP_STEPS:
+        fn = steps.get(nome)
+        if fn is None:
+            state.set_step(nome, "skipped")
+            continue
+        state.set_step(nome, "running")
+        r = _timed(fn)
+        state.set_step(nome, r["status"], r["seconds"], r.get("error"))
+        if r["status"] == "ok":
+            print(f"[WARMUP] {nome} ok em {r['seconds']:.2f}s")
+        else:
+            print(f"[ERRO WARMUP] {nome}: {r.get('error')}")
+    state.report({})  # registra o instante de prontidão sem esperar o primeiro /readyz
+
+
+def start_warmup(state: Readiness, steps: Dict[str, Callable[[], Any]]) -> Optional[threading.Thread]:
+    if not WARMUP_ENABLED:
+        for nome in WARMUP_STEPS:
+            state.set_step(nome, "skipped")  # modelos carregam na primeira requisição
+        return None
+    t = threading.Thread(target=warmup, args=(state, steps), name="warmup", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,172 @@
+# inference_client.py
+"""Client do sidecar de inferência (scripts/inference_server.py) via Unix socket.
+
+Com INFERENCE_SOCKET definido, `retrieval_local._get_model()` e `rerank_local._get_model()`
+devolvem os proxies daqui em vez de carregar os modelos no processo: cada worker do uvicorn
+fica sem torch e o sidecar (dono dos modelos) agrupa em lotes as chamadas de todos os workers.
+Os proxies têm a mesma interface usada no código (`encode(...)` / `predict(...)`).
+
+Protocolo (uma conexão por thread, requisição/resposta em sequência): cada mensagem é
+  >II (tamanho do cabeçalho JSON, tamanho do payload) + cabeçalho + payload
+Requisições: {"op": "embed", "texts": [...], "normalize": true} | {"op": "rerank", "pairs": [[q, d], ...]}
+| {"op": "ping"}. Respostas: {"ok": true, "shape": [...]} + float32 crus, ou {"ok": false, "error": "..."}.
+"""
+from __future__ import annotations
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")  # vazio = modelos no próprio processo
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "60"))  # espera o sidecar subir
+
+_HEAD = struct.Struct(">II")
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Conexão com o sidecar de inferência fechada")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_msg(sock: socket.socket, header: Dict[str, Any], payload: bytes = b"") -> None:
+    h = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEAD.pack(len(h), len(payload)) + h + payload)
+
+
+def recv_msg(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    n_h, n_p = _HEAD.unpack(_recv_exact(sock, _HEAD.size))
+    header = json.loads(_recv_exact(sock, n_h))
+    return header, _recv_exact(sock, n_p) if n_p else b""
+
+
+class InferenceClient:
+    """Uma conexão por thread (o threadpool do FastAPI chama em paralelo); reconecta uma vez se a
+    conexão reaproveitada caiu antes do envio."""
+
+    def __init__(self, path: str = INFERENCE_SOCKET, timeout: float = INFERENCE_TIMEOUT,
+                 connect_timeout: float = INFERENCE_CONNECT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connect(self) -> socket.socket:
+        t0 = time.monotonic()
+        while True:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                sock.close()
+                if time.monotonic() - t0 > self.connect_timeout:
+                    raise ConnectionError(f"Sidecar de inferência indisponível em {self.path}: {e}") from e
+                time.sleep(0.2)
+
+    def _drop(self, sock: socket.socket) -> None:
+        sock.close()
+        self._local.sock = None
+
+    def _call(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        """Envia a requisição e espera a resposta. Só reenvia se o envio falhou numa conexão
+        reaproveitada (sidecar reiniciado desde a última chamada): depois de enviada, a requisição
+        pode estar num lote do sidecar e reenviá-la dobraria o trabalho na fila. Timeout ou queda
+        durante a resposta viram erro na hora."""
+        for tentativa in (1, 2):
+            sock = getattr(self._local, "sock", None)
+            reaproveitada = sock is not None
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                send_msg(sock, header)
+            except TimeoutError:  # sidecar não está lendo (sobrecarga): não insiste
+                self._drop(sock)
+                raise
+            except OSError:
+                self._drop(sock)
+                if reaproveitada and tentativa == 1:
+                    continue
+                raise
+            try:
+                resp, payload = recv_msg(sock)
+            except OSError:
+                self._drop(sock)  # a resposta atrasada não pode ser lida pela próxima chamada
+                raise
+            break
+        if not resp.get("ok"):
+            raise InferenceError(resp.get("error") or "erro no sidecar de inferência")
+        return resp, payload
+
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info = self._call({"op": "ping"})[0]
+        return self._info
+
+    def embed(self, texts: Sequence[str], normalize: bool = True) -> np.ndarray:
+        resp, payload = self._call({"op": "embed", "texts": list(texts), "normalize": normalize})
+        return np.frombuffer(payload, dtype=np.float32).reshape(resp["shape"])
+
+    def rerank(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        resp, payload = self._call({"op": "rerank", "pairs": [list(p) for p in pairs]})
+        return np.frombuffer(payload, dtype=np.float32).reshape(resp["shape"])
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> InferenceClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient()
+    return _client
+
+
+class RemoteEncoder:
+    """Substituto de SentenceTransformer (só o que o código usa) servido pelo sidecar."""
+
+    def __init__(self, model_name: str, client: Optional[InferenceClient] = None):
+        self.client = client or get_client()
+        remoto = self.client.info().get("embed_model")
+        if remoto != model_name:
+            raise InferenceError(f"Sidecar serve embeddings de {remoto!r}, esperado {model_name!r}")
+        self.model_name = model_name
+
+    def encode(self, sentences: Sequence[str], normalize_embeddings: bool = False, **_: Any) -> np.ndarray:
+        return self.client.embed(sentences, normalize=normalize_embeddings)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.client.info()["embed_dim"])
+
+
+class RemoteCrossEncoder:
+    """Substituto de CrossEncoder (só `predict`) servido pelo sidecar."""
+
+    def __init__(self, model_name: str, client: Optional[InferenceClient] = None):
+        self.client = client or get_client()
+        remoto = self.client.info().get("rerank_model")
+        if remoto != model_name:
+            raise InferenceError(f"Sidecar serve rerank de {remoto!r}, esperado {model_name!r}")
+        self.model_name = model_name
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], **_: Any) -> np.ndarray:
+        return self.client.rerank(pairs)
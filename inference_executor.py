@@ -0,0 +1,114 @@
+# inference_executor.py
+"""Executor de inferência (embeddings e rerank) dentro da API.
+
+Os endpoints síncronos rodam no threadpool do FastAPI (~40 threads) e cada `encode`/`predict`
+deixa o torch usar todos os núcleos: requisições simultâneas disputam a CPU e o p99 dispara.
+Aqui há um número fixo de slots (threads dedicadas) e uma fila na frente; o handler submete a
+chamada e espera o resultado. Todos os slots aplicam o mesmo `torch.set_num_threads`
+(INFERENCE_THREADS), que na prática vale para o processo inteiro (pool intra-op compartilhado do
+torch): cada forward usa até INFERENCE_THREADS núcleos e, com os slots ocupados, o total fica em
+slots × threads. A espera na fila aparece
+como etapa `inference_queue` no Server-Timing e em `direito_inference_queue_wait_seconds`.
+
+INFERENCE_SLOTS=0 desliga (chamada no próprio thread da requisição, como antes). Com o sidecar de
+inferência (INFERENCE_SOCKET) a fila local também é ignorada: quem dosa a CPU é o sidecar.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from inference_client import INFERENCE_SOCKET
+from observability import Gauge, Histogram, record, span
+
+INFERENCE_SLOTS = int(os.getenv("INFERENCE_SLOTS", "2"))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))  # threads do torch (iguais em todos os slots); 0 = núcleos / slots
+
+QUEUE_WAIT = Histogram("direito_inference_queue_wait_seconds", "Espera na fila até um slot de inferência", ["op"])
+QUEUE_DEPTH = Gauge("direito_inference_queue_depth", "Chamadas de inferência aguardando ou em execução", ["state"])
+
+T = TypeVar("T")
+
+
+class InferenceExecutor:
+    def __init__(self, slots: int = INFERENCE_SLOTS, threads: int = INFERENCE_THREADS):
+        self.slots = slots
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(1, slots))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        QUEUE_DEPTH.set_function(self._depth)
+
+    def _depth(self) -> Dict[Tuple[str, ...], float]:
+        return {("waiting",): self._waiting, ("running",): self._running}
+
+    def _init_slot(self) -> None:
+        # Todos os slots aplicam o mesmo valor: o pool intra-op do torch é do processo, então não há
+        # orçamento separado por slot (total = slots × threads)
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(self.threads)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inferencia",
+                                                    initializer=self._init_slot)
+        return self._pool
+
+    def run(self, op: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Executa `fn` num slot e bloqueia até o resultado. `op` é o nome da etapa (span) medida só
+        durante a execução; a espera fica em `inference_queue`."""
+        if self.slots <= 0 or INFERENCE_SOCKET:
+            with span(op):
+                return fn(*args, **kwargs)
+        ctx = contextvars.copy_context()  # spans dentro do slot continuam no trace da requisição
+        t0 = time.perf_counter()
+
+        def _slot() -> T:
+            espera = time.perf_counter() - t0
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+            try:
+                QUEUE_WAIT.observe(espera, op=op)
+                record("inference_queue", espera)
+                with span(op):
+                    return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            fut = self._get_pool().submit(ctx.run, _slot)
+        except BaseException:  # ex.: pool encerrado no shutdown; a chamada nunca entrou na fila
+            with self._lock:
+                self._waiting -= 1
+            raise
+        return fut.result()
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> InferenceExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor()
+    return _executor
+
+
+def run_inference(op: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return get_executor().run(op, fn, *args, **kwargs)
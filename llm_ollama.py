@@ -1,5 +1,7 @@
 import os, requests
 
+from observability import span
+
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT_SEC", "180"))
@@ -9,13 +11,18 @@ SYSTEM = (
     "Se faltar base, diga que não encontrou. Sempre cite a lei e o artigo, quando possível."
 )
 
-def generate_with_ollama(context: str, question: str) -> str:
+def generate_with_ollama(context: str, question: str, json_mode: bool = False) -> str:
     prompt = f"SISTEMA:\n{SYSTEM}\n\nCONTEXTO:\n{context}\n\nPERGUNTA:\n{question}\n\nRESPOSTA:"
-    resp = requests.post(
-        f"{OLLAMA_HOST}/api/generate",
-        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
-        timeout=TIMEOUT,
-    )
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
+    if json_mode:
+        # Ollama restringe a saída a um objeto JSON válido
+        payload["format"] = "json"
+    with span("llm"):
+        resp = requests.post(
+            f"{OLLAMA_HOST}/api/generate",
+            json=payload,
+            timeout=TIMEOUT,
+        )
     try:
         resp.raise_for_status()
     except requests.HTTPError as e:
@@ -0,0 +1,255 @@
+# observability.py
+"""Instrumentação leve (sem dependências): spans por etapa, métricas Prometheus e profiler amostral.
+
+- `span("embed")`: mede a etapa, alimenta o histograma `direito_stage_seconds{stage=...}` e, dentro
+  de uma requisição (ver `start_trace`), acumula a duração para o header Server-Timing.
+- Counter/Gauge/Histogram num registro único por processo, exportado em texto Prometheus por
+  `render_metrics()` (GET /metrics). Com vários workers do uvicorn, cada processo tem o seu.
+- `SamplingProfiler`: amostra as pilhas das threads que abriram spans da requisição e grava no
+  formato "folded" (flamegraph.pl / speedscope). Ligado por requisição (header X-Profile: 1) e só
+  se PROFILE_ALLOWED=1.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+PROFILE_ALLOWED = os.getenv("PROFILE_ALLOWED", "false").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; `set_function` lê o valor na hora da coleta (ex.: tamanho de fila)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        self._fn = fn
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._fn is not None:
+            values.update(self._fn())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}  # contagens por bucket + [soma, total]
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = self._key(labels)
+        with self._lock:
+            v = self._values.get(k)
+            if v is None:
+                v = self._values[k] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    v[i] += 1
+                    break
+            v[-2] += value
+            v[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out: List[str] = []
+        for k, v in items:
+            acc = 0.0
+            for b, c in zip(self.buckets, v):
+                acc += c
+                le = f'le="{b}"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {acc}")
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {v[-1]}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {v[-2]}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {v[-1]}")
+        return out
+
+
+REGISTRY: List[_Metric] = []
+
+STAGE_SECONDS = Histogram("direito_stage_seconds", "Duração de cada etapa (history, embed, search, rerank, llm, ...)", ["stage"])
+REQUEST_SECONDS = Histogram("direito_http_request_seconds", "Duração das requisições HTTP", ["method", "route", "status"])
+MODEL_LOADS = Counter("direito_model_loads_total", "Carregamentos de modelo (embeddings/rerank)", ["model"])
+CACHE_EVENTS = Counter("direito_cache_total", "Consultas a caches em memória", ["cache", "result"])
+
+
+def render_metrics() -> str:
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+# ===== Spans / Server-Timing =====
+
+class _Trace:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.profiler: Optional["SamplingProfiler"] = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+_current: contextvars.ContextVar[Optional[_Trace]] = contextvars.ContextVar("direito_trace", default=None)
+
+
+def start_trace() -> _Trace:
+    """Abre o trace da requisição atual (propaga para o threadpool dos endpoints síncronos)."""
+    tr = _Trace()
+    _current.set(tr)
+    return tr
+
+
+def record(stage: str, seconds: float) -> None:
+    """Registra uma etapa já medida por outro meio."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    tr = _current.get()
+    if tr is not None:
+        tr.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    tr = _current.get()
+    if tr is not None and tr.profiler is not None:
+        tr.profiler.attach()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+def server_timing(tr: _Trace, total: Optional[float] = None) -> str:
+    """Valor do header Server-Timing (durações em ms; etapas repetidas são somadas)."""
+    parts = [f"{nome};dur={s * 1000:.1f}" for nome, s in tr.stages.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ===== Profiler amostral =====
+
+class SamplingProfiler:
+    """Amostra periodicamente as pilhas das threads anexadas (as que abriram spans na requisição)."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._threads: set = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def attach(self, ident: Optional[int] = None) -> None:
+        self._threads.add(ident or threading.get_ident())
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                pilha = []
+                while frame is not None:
+                    co = frame.f_code
+                    pilha.append(f"{co.co_name} ({os.path.basename(co.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                chave = ";".join(reversed(pilha))
+                self.stacks[chave] = self.stacks.get(chave, 0) + 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, name: str, root: str = PROFILE_DIR) -> str:
+        """Grava as pilhas no formato folded ("f1;f2;f3 N" por linha) e retorna o caminho."""
+        os.makedirs(root, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", name).strip("_") or "req"
+        path = os.path.join(root, f"{time.strftime('%Y%m%d%H%M%S')}_{name}_{uuid4().hex[:8]}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for chave, n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+                f.write(f"{chave} {n}\n")
+        return path
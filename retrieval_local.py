@@ -1,28 +1,71 @@
 # app/retrieval_local.py
 from __future__ import annotations
 import os
+import re
+import threading
+import time
 import unicodedata
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence, Tuple
 
-from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from inference_client import INFERENCE_SOCKET
+from inference_executor import run_inference
+from observability import MODEL_LOADS, span
+
+if TYPE_CHECKING:  # imports pesados (torch, grpc) só quando usados: o import da API fica rápido
+    from qdrant_client import QdrantClient
+    from sentence_transformers import SentenceTransformer
 
 DEFAULT_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")  # 768 dims
+# Pode ser um alias (reindexação blue/green, ver scripts/collection_versions.py): o Qdrant resolve
+# o alias em cada busca, então a troca de versão não exige reiniciar a API.
 DEFAULT_COLLECTION = os.getenv("QDRANT_COLLECTION", "leis")
 DEFAULT_HOST = os.getenv("QDRANT_HOST", "localhost")
 DEFAULT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+# Parâmetros de busca: ef do HNSW (0 = padrão do Qdrant) e, em collections quantizadas (int8),
+# rescore nos vetores originais com oversampling
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "0"))
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "1") == "1"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+# Pós-processamento dos candidatos antes do rerank: junta chunks vizinhos do mesmo artigo e
+# escolhe os k por MMR entre k * RETRIEVAL_FETCH_FACTOR resultados (lambda 1.0 = só relevância)
+RETRIEVAL_DIVERSIFY = os.getenv("RETRIEVAL_DIVERSIFY", "1") == "1"
+RETRIEVAL_FETCH_FACTOR = float(os.getenv("RETRIEVAL_FETCH_FACTOR", "2"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
 
-# Carregamento lazy (evita custar no import)
+# Carregamento lazy (evita custar no import); o lock evita carregar duas vezes quando o
+# aquecimento em background e a primeira requisição chegam juntos. Com INFERENCE_SOCKET, o
+# modelo fica no sidecar (scripts/inference_server.py) e aqui só há um proxy com o mesmo `encode`.
 _model: Optional[SentenceTransformer] = None
+_model_lock = threading.Lock()
 
 
 def _get_model() -> SentenceTransformer:
     global _model
     if _model is None:
-        _model = SentenceTransformer(DEFAULT_MODEL)  # CPU ok
+        with _model_lock:
+            if _model is None:
+                if INFERENCE_SOCKET:
+                    from inference_client import RemoteEncoder
+                    _model = RemoteEncoder(DEFAULT_MODEL)
+                    return _model
+                from sentence_transformers import SentenceTransformer
+                with span("model_load"):
+                    _model = SentenceTransformer(DEFAULT_MODEL)  # CPU ok
+                MODEL_LOADS.inc(model=DEFAULT_MODEL)
     return _model
 
 
+def search_params(hnsw_ef: int = QDRANT_SEARCH_EF, rescore: bool = QDRANT_RESCORE, oversampling: float = QDRANT_OVERSAMPLING):
+    """SearchParams do Qdrant; a parte de quantização é ignorada em collections sem quantização."""
+    from qdrant_client.http import models as qm
+    return qm.SearchParams(
+        hnsw_ef=hnsw_ef or None,
+        quantization=qm.QuantizationSearchParams(rescore=rescore, oversampling=oversampling),
+    )
+
+
 def _normalize(text: str) -> str:
     """
     Normaliza minimamente a consulta (opcional).
@@ -38,6 +81,112 @@ def _normalize(text: str) -> str:
     return t
 
 
+def _merge_texts(a: str, b: str, max_overlap: int = 4000) -> str:
+    """Concatena chunks vizinhos sem repetir a sobreposição do ingest (o fim de um é o início do outro)."""
+    cauda = a[-16:]
+    melhor = 0  # maior sobreposição (texto repetitivo pode casar em mais de um ponto)
+    pos = b.find(cauda, 0, max_overlap) if cauda else -1
+    while pos != -1:
+        fim = pos + len(cauda)
+        if a.endswith(b[:fim]):
+            melhor = fim
+        pos = b.find(cauda, pos + 1, max_overlap)
+    return a + b[melhor:] if melhor else a + "\n" + b
+
+
+Candidate = Tuple[Dict[str, Any], float, Optional[np.ndarray]]  # (item, score vetorial, vetor)
+
+RE_CHUNK_SUFFIX = re.compile(r"-ch-\d+$")
+
+
+def chunk_parent(record_id: Optional[str]) -> Optional[str]:
+    """Id da sequência de chunks (o id do ingest sem o "-ch-N"). Cada ocorrência do artigo
+    ("...-art-6" x "...-art-6-v2") e cada unidade ("...-art-6-par-1") tem a sua, todas começando em 1."""
+    if not record_id or not RE_CHUNK_SUFFIX.search(record_id):
+        return None
+    return RE_CHUNK_SUFFIX.sub("", record_id)
+
+
+def _sem_contexto(item: Dict[str, Any]) -> str:
+    """Texto do chunk sem o prefixo de contexto dos ancestrais (repetido em todos os chunks da unidade)."""
+    texto, ctx = item.get("texto") or "", item.get("contexto")
+    return texto[len(ctx) + 1:] if ctx and texto.startswith(f"{ctx}\n") else texto
+
+
+def merge_adjacent_chunks(cands: Sequence[Candidate]) -> List[Candidate]:
+    """Junta candidatos com chunk_seq consecutivos da mesma sequência (mesmo id sem "-ch-N") num
+    só: texto sem a sobreposição (e sem repetir o contexto), maior score, vetor médio (normalizado).
+    O resultado fica na posição do melhor pedaço; `chunk_seqs` lista os pedaços juntados.
+    Candidatos sem id do ingest não são juntados."""
+    grupos: Dict[str, List[int]] = {}
+    for i, (item, _, _) in enumerate(cands):
+        pai = chunk_parent(item.get("id"))
+        if pai is not None and isinstance(item.get("chunk_seq"), int):
+            grupos.setdefault(pai, []).append(i)
+
+    juntar: Dict[int, List[int]] = {}  # índice do melhor pedaço -> índices da sequência
+    for idxs in grupos.values():
+        if len(idxs) < 2:
+            continue
+        idxs = sorted(idxs, key=lambda i: cands[i][0]["chunk_seq"])
+        run = [idxs[0]]
+        for i in idxs[1:] + [None]:
+            if i is not None and cands[i][0]["chunk_seq"] == cands[run[-1]][0]["chunk_seq"] + 1:
+                run.append(i)
+                continue
+            if len(run) > 1:
+                juntar[max(run, key=lambda j: cands[j][1])] = run
+            if i is not None:
+                run = [i]
+
+    absorvidos = {j for run in juntar.values() for j in run}
+    out: List[Candidate] = []
+    for i, cand in enumerate(cands):
+        if i in juntar:
+            run = juntar[i]
+            item = dict(cands[run[0]][0])
+            for j in run[1:]:
+                item["texto"] = _merge_texts(item.get("texto") or "", _sem_contexto(cands[j][0]))
+            item["chunk_seqs"] = [cands[j][0]["chunk_seq"] for j in run]
+            score = max(cands[j][1] for j in run)
+            if "score_vec" in item:
+                item["score_vec"] = score
+            vec = None
+            if all(cands[j][2] is not None for j in run):
+                vec = np.mean([cands[j][2] for j in run], axis=0)
+                vec = vec / (np.linalg.norm(vec) or 1.0)
+            out.append((item, score, vec))
+        elif i not in absorvidos:
+            out.append(cand)
+    return out
+
+
+def mmr(query_vec: Sequence[float], vectors: Sequence[np.ndarray], k: int, lambda_mult: float = RETRIEVAL_MMR_LAMBDA) -> List[int]:
+    """Maximal marginal relevance: a cada passo, o candidato com maior
+    lambda * sim(consulta) - (1 - lambda) * maior sim(já escolhidos). Vetores normalizados (cosseno)."""
+    if not len(vectors):
+        return []
+    V = np.asarray(vectors, dtype=np.float32)
+    rel = V @ np.asarray(query_vec, dtype=np.float32)
+    sim_max = np.full(len(V), -np.inf, dtype=np.float32)
+    livres = np.ones(len(V), dtype=bool)
+    escolhidos: List[int] = []
+    for _ in range(min(k, len(V))):
+        nota = rel if not escolhidos else lambda_mult * rel - (1 - lambda_mult) * sim_max
+        i = int(np.argmax(np.where(livres, nota, -np.inf)))
+        escolhidos.append(i)
+        livres[i] = False
+        sim_max = np.maximum(sim_max, V @ V[i])
+    return escolhidos
+
+
+def _hit_vector(h) -> Optional[np.ndarray]:
+    v = getattr(h, "vector", None)
+    if isinstance(v, dict):  # vetores nomeados: o padrão ("") ou o primeiro
+        v = v.get("", next(iter(v.values()), None))
+    return None if v is None else np.asarray(v, dtype=np.float32)
+
+
 class RetrieverLocal:
     """
     Busca vetorial com embeddings locais (SentenceTransformers) + Qdrant.
@@ -52,19 +201,39 @@ class RetrieverLocal:
         model_name: str = DEFAULT_MODEL,
         include_scores: bool = True,
     ) -> None:
-        self.client = QdrantClient(host=host, port=port)
+        self.host = host
+        self.port = port
+        self._client: Optional[QdrantClient] = None
         self.collection = collection
         self.model_name = model_name
         self.include_scores = include_scores
+        self._search_params = None
+
+    @property
+    def client(self) -> QdrantClient:
+        if self._client is None:
+            from qdrant_client import QdrantClient
+            self._client = QdrantClient(host=self.host, port=self.port)
+        return self._client
+
+    @property
+    def search_params(self):
+        if self._search_params is None:
+            self._search_params = search_params()
+        return self._search_params
 
     def embed(self, text: str) -> List[float]:
         model = _get_model()
-        vec = model.encode([_normalize(text)], normalize_embeddings=True)[0]
+        vec = run_inference("embed", model.encode, [_normalize(text)], normalize_embeddings=True)[0]
         return vec.tolist()
 
-    def search(self, query: str, k: int = 12) -> List[Dict[str, Any]]:
+    def search(self, query: str, k: int = 12, timings: Optional[Dict[str, float]] = None,
+               diversify: Optional[bool] = None) -> List[Dict[str, Any]]:
         """
         Executa busca vetorial simples no Qdrant.
+        Se `timings` for passado, registra nele a duração (s) de "embed" e "search" (e "diversify").
+        Com `diversify` (default RETRIEVAL_DIVERSIFY), busca k * RETRIEVAL_FETCH_FACTOR resultados
+        com vetores, junta chunks vizinhos do mesmo artigo e devolve os k escolhidos por MMR.
         Saída: lista de dicts no padrão que os próximos passos esperam:
         {
           "texto": "...",
@@ -78,34 +247,60 @@ class RetrieverLocal:
         if not query or not query.strip():
             return []
 
+        diversify = RETRIEVAL_DIVERSIFY if diversify is None else diversify
+        limit = max(int(k), round(k * RETRIEVAL_FETCH_FACTOR)) if diversify else int(k)
+        t0 = time.perf_counter()
         qvec = self.embed(query)
+        t1 = time.perf_counter()
         try:
-            hits = self.client.search(
-                collection_name=self.collection,
-                query_vector=qvec,
-                limit=int(k),
-            )
+            with span("search"):
+                hits = self.client.search(
+                    collection_name=self.collection,
+                    query_vector=qvec,
+                    limit=limit,
+                    search_params=self.search_params,
+                    with_vectors=diversify,
+                )
         except Exception as e:
             from qdrant_client.http.exceptions import ResponseHandlingException
             if isinstance(e, ResponseHandlingException) or "ConnectError" in str(e):
                 raise ConnectionError("Não foi possível conectar ao Qdrant. Verifique se o serviço está rodando e a configuração de host/porta.") from e
             raise
+        t2 = time.perf_counter()
+        if timings is not None:
+            timings["embed"] = t1 - t0
+            timings["search"] = t2 - t1
 
         results: List[Dict[str, Any]] = []
         for h in hits:
             p = h.payload or {}
             item = {
+                "id": p.get("id"),
                 "texto": p.get("texto", ""),
                 "lei": p.get("lei"),
                 "artigo": p.get("artigo"),
                 "url": p.get("url_oficial"),
                 "chunk_seq": p.get("chunk_seq"),
             }
+            if p.get("contexto"):  # chunks por parágrafo/inciso: prefixo já incluído em "texto"
+                item["contexto"] = p["contexto"]
             if self.include_scores:
                 item["score_vec"] = float(h.score)
             results.append(item)
+        if diversify:
+            with span("diversify"):
+                results = self._diversify(qvec, results, hits, int(k))
+            if timings is not None:
+                timings["diversify"] = time.perf_counter() - t2
         return results
 
+    @staticmethod
+    def _diversify(qvec: List[float], results: List[Dict[str, Any]], hits, k: int) -> List[Dict[str, Any]]:
+        cands = merge_adjacent_chunks([(r, float(h.score), _hit_vector(h)) for r, h in zip(results, hits)])
+        if any(v is None for _, _, v in cands):  # sem vetores (ex. with_vectors ignorado): só a ordem por score
+            return [item for item, _, _ in cands[:k]]
+        return [cands[i][0] for i in mmr(qvec, [v for _, _, v in cands], k)]
+
     def search_with_filter(
         self,
         query: str,
@@ -131,23 +326,28 @@ class RetrieverLocal:
 
         flt = qm.Filter(must=must) if must else None
 
-        hits = self.client.search(
-            collection_name=self.collection,
-            query_vector=qvec,
-            query_filter=flt,
-            limit=int(k),
-        )
+        with span("search"):
+            hits = self.client.search(
+                collection_name=self.collection,
+                query_vector=qvec,
+                query_filter=flt,
+                limit=int(k),
+                search_params=self.search_params,
+            )
 
         results: List[Dict[str, Any]] = []
         for h in hits:
             p = h.payload or {}
             item = {
+                "id": p.get("id"),
                 "texto": p.get("texto", ""),
                 "lei": p.get("lei"),
                 "artigo": p.get("artigo"),
                 "url": p.get("url_oficial"),
                 "chunk_seq": p.get("chunk_seq"),
             }
+            if p.get("contexto"):  # chunks por parágrafo/inciso: prefixo já incluído em "texto"
+                item["contexto"] = p["contexto"]
             if self.include_scores:
                 item["score_vec"] = float(h.score)
             results.append(item)
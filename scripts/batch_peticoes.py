@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Gera petições iniciais de cobrança em lote a partir de JSON ou CSV e grava um .zip.
+Registros com a mesma consulta_caso (normalizada) compartilham recuperação e seções do LLM.
+
+Uso:
+  python -m scripts.batch_peticoes --input lote.json --output lote.zip --ai
+  python -m scripts.batch_peticoes --input lote.csv --output lote.zip --ai --workers 4
+
+JSON: lista de {"data": {...mesma estrutura do endpoint...}, "consulta_caso": "..."}
+CSV: ver colunas em app.documents.batch.read_csv_records (pedidos/provas separados por '|')
+"""
+from __future__ import annotations
+import argparse, json, pathlib, sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app.documents.batch import generate_batch, read_csv_records, BATCH_RENDER_WORKERS
+from app.documents.generator import PETICAO_AI_MODE
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, help="Arquivo .json (lista) ou .csv")
+    ap.add_argument("--output", required=True, help="Arquivo .zip de saída")
+    ap.add_argument("--ai", action="store_true", help="Gera fatos/pedidos/provas faltantes com IA")
+    ap.add_argument("--force", action="store_true", help="Sobrescreve seções já preenchidas")
+    ap.add_argument("--mode", default=PETICAO_AI_MODE, choices=["json", "parallel"])
+    ap.add_argument("--k", type=int, default=12)
+    ap.add_argument("--workers", type=int, default=BATCH_RENDER_WORKERS, help="Processos de renderização")
+    args = ap.parse_args()
+
+    with open(args.input, "r", encoding="utf-8", newline="") as f:
+        if args.input.lower().endswith(".csv"):
+            records = read_csv_records(f)
+        else:
+            records = json.load(f)
+
+    content, stats = generate_batch(
+        records, use_ai=args.ai, force=args.force, mode=args.mode, k=args.k, workers=args.workers
+    )
+    pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "wb") as out:
+        out.write(content)
+    print(json.dumps(stats, ensure_ascii=False))
+    print(f"OK: {stats['records']} petições em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""Comparativo de layouts de collection no Qdrant: recall e latência de cada configuração.
+
+Indexa o mesmo JSONL em collections temporárias (uma por layout: HNSW padrão, HNSW enxuto,
+int8, int8 + vetores em disco) e roda as mesmas consultas em cada uma. O recall@k é medido
+contra a busca exata (sem HNSW, float32) na collection base; a latência é por consulta.
+Requer Qdrant servidor (o modo local do client não tem HNSW nem quantização).
+
+Uso:
+  python -m scripts.bench_collection_layout --jsonl data/processed/lei_11101_2005.jsonl --k 10
+  python -m scripts.bench_collection_layout --jsonl ... --queries perguntas.txt --json layout.json
+Sem --queries, usa o início de --n-queries chunks sorteados do próprio JSONL como consultas.
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, random, statistics, sys, time
+from typing import Any, Dict, List
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import OptimizersConfigDiff, QuantizationSearchParams, SearchParams
+from sentence_transformers import SentenceTransformer
+
+from scripts.embed_cache import EMBED_CACHE_DIR, EmbeddingCache
+from scripts.index_qdrant_local import MODEL_NAME, collection_layout, ensure_collection, index_pipeline, iter_jsonl
+
+# nome -> (layout da collection, parâmetros de busca). Variantes de busca reaproveitam a collection
+# do layout de mesmo prefixo (antes de ":").
+CONFIGS: Dict[str, Dict[str, Any]] = {
+    "base": {"layout": {}, "search": {}},
+    "hnsw_m8": {"layout": {"hnsw_m": 8, "hnsw_ef_construct": 64}, "search": {}},
+    "int8": {"layout": {"quantization": "int8"}, "search": {"rescore": True, "oversampling": 2.0}},
+    "int8:sem_rescore": {"layout": {"quantization": "int8"}, "search": {"rescore": False}},
+    "int8_disk": {"layout": {"quantization": "int8", "on_disk": True}, "search": {"rescore": True, "oversampling": 2.0}},
+}
+
+
+def _params(search: Dict[str, Any]) -> SearchParams:
+    quant = None
+    if "rescore" in search:
+        quant = QuantizationSearchParams(rescore=search["rescore"], oversampling=search.get("oversampling"))
+    return SearchParams(hnsw_ef=search.get("hnsw_ef"), quantization=quant)
+
+
+def _wait_green(client: QdrantClient, name: str, timeout: float = 600) -> None:
+    """Espera o otimizador terminar de construir o índice (status green)."""
+    t0 = time.perf_counter()
+    while client.get_collection(name).status.value != "green":
+        if time.perf_counter() - t0 > timeout:
+            raise SystemExit(f"Collection {name} não ficou pronta em {timeout}s")
+        time.sleep(0.5)
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+
+def _ram_mb(n: int, dim: int, layout: Dict[str, Any]) -> float:
+    """Estimativa de RAM dos vetores: float32 (se não estiverem em disco) + int8 (se quantizado)."""
+    ram = 0 if layout.get("on_disk") else n * dim * 4
+    if layout.get("quantization") == "int8":
+        ram += n * dim
+    return round(ram / 1e6, 2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jsonl", required=True)
+    ap.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    ap.add_argument("--configs", default=",".join(CONFIGS), help=f"Subconjunto de: {', '.join(CONFIGS)}")
+    ap.add_argument("--queries", default="", help="Arquivo com uma consulta por linha")
+    ap.add_argument("--n-queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--prefix", default="bench_layout", help="Prefixo das collections temporárias")
+    ap.add_argument("--keep", action="store_true", help="Não apaga as collections ao final")
+    ap.add_argument("--json", default="", help="Onde gravar o relatório em JSON (opcional)")
+    args = ap.parse_args()
+
+    nomes = [c.strip() for c in args.configs.split(",") if c.strip()]
+    desconhecidos = [c for c in nomes if c not in CONFIGS]
+    if desconhecidos:
+        raise SystemExit(f"Configurações desconhecidas: {desconhecidos}")
+    if "base" not in nomes:
+        nomes.insert(0, "base")  # referência da busca exata
+
+    recs = list(iter_jsonl(args.jsonl))
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [ln.strip() for ln in f if ln.strip()]
+    else:
+        rnd = random.Random(42)
+        queries = [r["texto"][:200] for r in rnd.sample(recs, min(args.n_queries, len(recs)))]
+
+    model = SentenceTransformer(MODEL_NAME)
+    dim = model.get_sentence_embedding_dimension()
+    cache = EmbeddingCache(MODEL_NAME, dim, root=EMBED_CACHE_DIR)
+    qvecs = model.encode(queries, normalize_embeddings=True).tolist()
+    client = QdrantClient(host=args.host, port=args.port)
+
+    # 1. Uma collection por layout
+    colecoes: Dict[str, str] = {}
+    for nome in nomes:
+        base = nome.split(":")[0]
+        if base in colecoes:
+            continue
+        col = f"{args.prefix}_{base}"
+        ensure_collection(client, col, dim, recreate=True, layout=collection_layout(**CONFIGS[nome]["layout"]))
+        # força a construção do HNSW mesmo em corpus pequeno (abaixo do limiar padrão o Qdrant faz busca plana)
+        client.update_collection(collection_name=col, optimizers_config=OptimizersConfigDiff(indexing_threshold=1))
+        t0 = time.perf_counter()
+        index_pipeline(client, model, col, recs, cache=cache, progress_every=0)
+        _wait_green(client, col)
+        colecoes[base] = col
+        print(f"[LAYOUT] {col}: {len(recs)} pontos em {time.perf_counter() - t0:.1f}s")
+
+    # 2. Referência: busca exata na collection base
+    exato = [
+        {str(h.id) for h in client.search(collection_name=colecoes["base"], query_vector=q, limit=args.k,
+                                          search_params=SearchParams(exact=True))}
+        for q in qvecs
+    ]
+
+    # 3. Recall e latência por configuração
+    relatorio: Dict[str, Any] = {"jsonl": args.jsonl, "pontos": len(recs), "dim": dim, "consultas": len(queries),
+                                 "k": args.k, "configs": {}}
+    for nome in nomes:
+        cfg = CONFIGS[nome]
+        params = _params(cfg["search"])
+        lat, recall = [], []
+        for q, ref in zip(qvecs, exato):
+            t0 = time.perf_counter()
+            hits = client.search(collection_name=colecoes[nome.split(":")[0]], query_vector=q, limit=args.k,
+                                 search_params=params)
+            lat.append((time.perf_counter() - t0) * 1000)
+            recall.append(len({str(h.id) for h in hits} & ref) / max(1, len(ref)))
+        relatorio["configs"][nome] = {
+            "layout": cfg["layout"],
+            "search": cfg["search"],
+            f"recall@{args.k}": round(statistics.mean(recall), 4),
+            "p50_ms": round(_pct(lat, 0.50), 2),
+            "p95_ms": round(_pct(lat, 0.95), 2),
+            "ram_vetores_mb_estimado": _ram_mb(len(recs), dim, cfg["layout"]),
+        }
+
+    print(f"\n{'config':20s} {'recall@' + str(args.k):>10s} {'p50 ms':>8s} {'p95 ms':>8s} {'RAM MB':>8s}")
+    for nome, r in relatorio["configs"].items():
+        print(f"{nome:20s} {r[f'recall@{args.k}']:>10.4f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['ram_vetores_mb_estimado']:>8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    if not args.keep:
+        for col in colecoes.values():
+            client.delete_collection(col)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Benchmark do parser estrutural (Art./§/inciso/alínea).
+
+Compara o split antigo (RE_ART sobre o texto + RE_PAR/RE_INCISO em cada bloco: três passadas)
+com o tokenizador único de `split_by_artigos`, e resume os chunks de cada granularidade.
+
+Uso:
+  python -m scripts.bench_ingest --input data/raw/lei_11101_2005.html --repeat 20
+  python -m scripts.bench_ingest --input data/raw/lei_11101_2005.html --json bench.json
+"""
+from __future__ import annotations
+import argparse, json, pathlib, re, statistics, sys, time
+from typing import Any, Callable, Dict, List
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scripts.ingest import GRANULARIDADES, iter_records
+from scripts.ingest_common import EMBED_MAX_TOKENS, RE_INCISO, RE_PAR, html_to_text, normalize_text, split_by_artigos
+
+# RE_ART anterior ao parser estrutural (sem distinção de caixa; aceita "art." de remissões)
+RE_ART_LEGADO = re.compile(r'(?:^|\n)\s*Art\.\s*(\d+[ºo]?(?:-[A-Z]{1,2}\b)?)\s*[-–—:.]?\s*', flags=re.IGNORECASE)
+
+
+def split_legado(txt: str) -> List[Dict]:
+    """Split antigo: uma passada para artigos e mais duas (§ e incisos) por artigo."""
+    parts: List[Dict] = []
+    matches = list(RE_ART_LEGADO.finditer(txt))
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(txt)
+        bloco = txt[m.end():end].strip()
+        parts.append({
+            "artigo": m.group(1).replace('º', '').replace('o', ''),
+            "texto": bloco,
+            "subsections": {"paragrafos": [p.group(1) for p in RE_PAR.finditer(bloco)],
+                            "incisos": [x.group(1) for x in RE_INCISO.finditer(bloco)]},
+        })
+    return parts
+
+
+def _tempo(fn: Callable[[str], Any], txt: str, repeat: int) -> Dict[str, float]:
+    amostras = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(txt)
+        amostras.append(time.perf_counter() - t0)
+    return {"media_ms": round(statistics.mean(amostras) * 1000, 2), "min_ms": round(min(amostras) * 1000, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default="data/raw/lei_11101_2005.html", help="HTML ou TXT da lei")
+    ap.add_argument("--repeat", type=int, default=20, help="Repetições de cada split")
+    ap.add_argument("--max-chars", type=int, default=5000)
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="0 = chunks por caracteres")
+    ap.add_argument("--json", default="", help="Onde gravar o resultado em JSON (opcional)")
+    args = ap.parse_args()
+
+    raw = pathlib.Path(args.input).read_text(encoding="utf-8", errors="ignore")
+    txt = html_to_text(raw) if args.input.lower().endswith((".html", ".htm")) else normalize_text(raw)
+
+    legado, novo = split_legado(txt), split_by_artigos(txt)
+    result: Dict[str, Any] = {
+        "input": args.input,
+        "chars": len(txt),
+        "repeat": args.repeat,
+        "split": {
+            "legado": {"artigos": len(legado), **_tempo(split_legado, txt, args.repeat)},
+            "estrutural": {"artigos": len(novo), **_tempo(split_by_artigos, txt, args.repeat)},
+        },
+        "granularidades": {},
+    }
+    for g in GRANULARIDADES:
+        t0 = time.perf_counter()
+        recs = list(iter_records(novo, "bench", "bench", max_chars=args.max_chars, granularity=g, max_tokens=args.max_tokens))
+        tamanhos = [len(r["texto"]) for r in recs]
+        tokens = [r["n_tokens"] for r in recs]
+        result["granularidades"][g] = {
+            "chunks": len(tamanhos),
+            "chars_media": round(statistics.mean(tamanhos), 1) if tamanhos else 0,
+            "chars_max": max(tamanhos, default=0),
+            "tokens_media": round(statistics.mean(tokens), 1) if tokens else 0,
+            "tokens_max": max(tokens, default=0),
+            "ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Compara os modos de geração das seções da petição (PETICAO_AI_MODE): "json" (uma chamada
+estruturada, com fallback concorrente) x "parallel" (uma chamada por seção, concorrentes).
+
+Recupera o contexto legal uma vez (mesmo caminho do endpoint) e, para cada repetição, gera
+fatos/pedidos/provas nos dois modos, alternando a ordem para não favorecer quem roda depois com
+o modelo já quente. Mede a geração (`generate_sections`) e o total por modo (p50/p95), quantas
+vezes o modo json caiu no fallback e o tamanho do texto gerado por seção.
+
+Uso:
+  python -m scripts.bench_peticao_ai --repeticoes 5 --json peticao_ai.json
+  python -m scripts.bench_peticao_ai --consulta "Cobrança de duplicatas vencidas ..." --k 12
+  python -m scripts.bench_peticao_ai --contexto contexto.txt      # sem Qdrant/embeddings
+  python -m scripts.bench_peticao_ai --stub --ollama-latency-ms 800   # só valida o script (dublê)
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, statistics, sys, time
+from typing import Any, Dict, List
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+MODOS = ("json", "parallel")
+CONSULTA_PADRAO = ("Empresa credora forneceu mercadorias e emitiu duplicatas que venceram sem pagamento; "
+                   "o devedor está em recuperação judicial e a credora quer cobrar o crédito.")
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))] if xs else 0.0
+
+
+def _tamanho(valor: Any) -> int:
+    if isinstance(valor, list):
+        return sum(len(str(v)) for v in valor)
+    return len(str(valor or ""))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--consulta", default=CONSULTA_PADRAO, help="consulta_caso usada na recuperação e no prompt")
+    ap.add_argument("--contexto", default="", help="Arquivo com o contexto legal pronto (pula a recuperação)")
+    ap.add_argument("--k", type=int, default=12)
+    ap.add_argument("--repeticoes", type=int, default=5, help="Gerações por modo")
+    ap.add_argument("--stub", action="store_true", help="Usa o dublê do Ollama de scripts.loadtest_stubs")
+    ap.add_argument("--ollama-latency-ms", type=float, default=500.0, help="Latência do dublê (com --stub)")
+    ap.add_argument("--json", default="", help="Onde gravar o resultado em JSON (opcional)")
+    args = ap.parse_args()
+
+    stubs = None
+    if args.stub:
+        from scripts.loadtest_stubs import StubConfig, Stubs
+        stubs = Stubs({"ollama": StubConfig(latency_ms=args.ollama_latency_ms,
+                                            jitter_ms=args.ollama_latency_ms / 5)}).start()
+        os.environ["OLLAMA_HOST"] = stubs.env()["OLLAMA_HOST"]  # antes de importar llm_ollama
+
+    from app.documents.generator import SECOES_IA, _retrieve_legal_context, generate_sections
+    from app.prompts.legal_prompting import preprocess_question
+    from llm_ollama import OLLAMA_HOST, OLLAMA_MODEL
+
+    secoes = list(SECOES_IA)
+    t0 = time.perf_counter()
+    if args.contexto:
+        contexto = pathlib.Path(args.contexto).read_text(encoding="utf-8")
+    else:
+        contexto = _retrieve_legal_context(preprocess_question(args.consulta), k=args.k,
+                                           collection=os.getenv("QDRANT_COLLECTION", "leis"))
+    retrieval_s = time.perf_counter() - t0
+    print(f"Contexto: {len(contexto)} caracteres ({retrieval_s:.2f}s); Ollama {OLLAMA_HOST} modelo {OLLAMA_MODEL}")
+
+    # aquece o modelo no Ollama fora da medição
+    generate_sections(contexto, secoes[:1], args.consulta, mode="parallel")
+
+    medidas: Dict[str, List[Dict[str, Any]]] = {m: [] for m in MODOS}
+    for rep in range(args.repeticoes):
+        for modo in (MODOS if rep % 2 == 0 else MODOS[::-1]):
+            timings: Dict[str, Any] = {}
+            t0 = time.perf_counter()
+            out = generate_sections(contexto, secoes, args.consulta, mode=modo, timings=timings)
+            timings["generation_s"] = round(time.perf_counter() - t0, 3)
+            timings["chars"] = {nome: _tamanho(out.get(nome)) for nome in secoes}
+            medidas[modo].append(timings)
+            print(f"  [{rep + 1}/{args.repeticoes}] {modo:8s} {timings['generation_s']:.2f}s"
+                  f"{'  fallback=' + ','.join(timings['fallback']) if timings.get('fallback') else ''}")
+    if stubs is not None:
+        stubs.stop()
+
+    resumo: Dict[str, Any] = {}
+    for modo, ms in medidas.items():
+        xs = [m["generation_s"] for m in ms]
+        resumo[modo] = {
+            "generation_s": {"p50": round(_pct(xs, 0.50), 3), "p95": round(_pct(xs, 0.95), 3),
+                             "media": round(statistics.mean(xs), 3)},
+            "total_s_p50": round(retrieval_s + _pct(xs, 0.50), 3),
+            "fallbacks": sum(1 for m in ms if m.get("fallback")),
+            "chars_media": {nome: round(statistics.mean(m["chars"][nome] for m in ms)) for nome in secoes},
+        }
+    print(f"Geração de {', '.join(secoes)} ({args.repeticoes} repetições por modo; recuperação {retrieval_s:.2f}s à parte)")
+    for modo, r in resumo.items():
+        g = r["generation_s"]
+        print(f"  {modo:8s} p50={g['p50']:.2f}s  p95={g['p95']:.2f}s  total p50={r['total_s_p50']:.2f}s  "
+              f"fallbacks={r['fallbacks']}  chars={r['chars_media']}")
+    if resumo["json"]["generation_s"]["p50"] > 0:
+        print(f"  parallel/json (p50): {resumo['parallel']['generation_s']['p50'] / resumo['json']['generation_s']['p50']:.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"consulta": args.consulta, "ollama": OLLAMA_HOST, "modelo": OLLAMA_MODEL, "stub": args.stub,
+                       "repeticoes": args.repeticoes, "retrieval_s": round(retrieval_s, 3),
+                       "resumo": resumo, "medidas": medidas}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""Benchmark de qualidade e latência da recuperação (mesmo caminho do /chat).
+
+Lê um conjunto versionado de perguntas rotuladas (data/eval/*.json: relevância por artigo,
+grau 2 = responde diretamente, 1 = relacionado), executa preprocess_question ->
+RetrieverLocal.search -> rerank e calcula, com e sem rerank:
+  - recall@k: fração dos artigos relevantes presentes no top-k
+  - MRR: inverso da posição do primeiro resultado relevante
+  - nDCG@k: ganho = grau do artigo (cada artigo conta uma vez, na primeira posição em que aparece)
+e a latência p50/p95 de cada etapa (embed, search, diversify, rerank, total).
+
+Uso:
+  python -m scripts.bench_retrieval --questions data/eval/retrieval_lei_11101_2005.v1.json --k 12 --n 5
+  python -m scripts.bench_retrieval --questions ... --no-rerank --json retrieval.json
+  python -m scripts.bench_retrieval --no-diversify   # sem junção de chunks/MMR antes do rerank
+"""
+from __future__ import annotations
+import argparse, hashlib, json, math, os, pathlib, statistics, sys, time
+from typing import Any, Dict, List, Sequence
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from retrieval_local import RetrieverLocal
+from app.prompts.legal_prompting import preprocess_question
+
+DEFAULT_QUESTIONS = "data/eval/retrieval_lei_11101_2005.v1.json"
+
+
+def _artigos(hits: Sequence[Dict[str, Any]], lei: str) -> List[str]:
+    """Artigo de cada hit (None se for de outra lei), na ordem do ranking."""
+    return [h.get("artigo") if h.get("lei") == lei else None for h in hits]
+
+
+def recall_at(ranking: List[str], graus: Dict[str, int], k: int) -> float:
+    return len(set(ranking[:k]) & set(graus)) / len(graus) if graus else 0.0
+
+
+def mrr(ranking: List[str], graus: Dict[str, int]) -> float:
+    for i, art in enumerate(ranking, start=1):
+        if art in graus:
+            return 1.0 / i
+    return 0.0
+
+
+def ndcg_at(ranking: List[str], graus: Dict[str, int], k: int) -> float:
+    vistos = set()
+    dcg = 0.0
+    for i, art in enumerate(ranking[:k], start=1):
+        if art in graus and art not in vistos:
+            vistos.add(art)
+            dcg += graus[art] / math.log2(i + 1)
+    ideal = sorted(graus.values(), reverse=True)[:k]
+    idcg = sum(g / math.log2(i + 1) for i, g in enumerate(ideal, start=1))
+    return dcg / idcg if idcg else 0.0
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))] if xs else 0.0
+
+
+def _resumo(por_pergunta: List[Dict[str, Any]], chave: str, ks: List[int]) -> Dict[str, float]:
+    out = {f"recall@{k}": statistics.mean(q[chave][f"recall@{k}"] for q in por_pergunta) for k in ks}
+    out.update({f"ndcg@{k}": statistics.mean(q[chave][f"ndcg@{k}"] for q in por_pergunta) for k in ks})
+    out["mrr"] = statistics.mean(q[chave]["mrr"] for q in por_pergunta)
+    return {m: round(v, 4) for m, v in out.items()}
+
+
+def _metricas(ranking: List[str], graus: Dict[str, int], ks: List[int]) -> Dict[str, float]:
+    m = {f"recall@{k}": recall_at(ranking, graus, k) for k in ks}
+    m.update({f"ndcg@{k}": ndcg_at(ranking, graus, k) for k in ks})
+    m["mrr"] = mrr(ranking, graus)
+    return m
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", default=DEFAULT_QUESTIONS, help="Conjunto rotulado (JSON versionado)")
+    ap.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION", "leis"))
+    ap.add_argument("--k", type=int, default=12, help="Resultados da busca vetorial (como no /chat)")
+    ap.add_argument("--n", type=int, default=5, help="Top-N após o rerank (como no /chat)")
+    ap.add_argument("--ks", default="1,3,5,10", help="Cortes para recall/nDCG")
+    ap.add_argument("--no-rerank", action="store_true", help="Avalia só a busca vetorial")
+    ap.add_argument("--no-diversify", action="store_true", help="Sem junção de chunks vizinhos e MMR")
+    ap.add_argument("--json", default="", help="Onde gravar o resultado em JSON (opcional)")
+    args = ap.parse_args()
+
+    with open(args.questions, "rb") as f:
+        raw = f.read()
+    conjunto = json.loads(raw)
+    lei = conjunto["lei"]
+    ks = [int(k) for k in args.ks.split(",") if k.strip()]
+    usar_rerank = not args.no_rerank
+    if usar_rerank:
+        from scripts.rerank_local import rerank
+
+    retriever = RetrieverLocal(collection=args.collection)
+    # aquece os modelos fora da medição
+    retriever.search("aquecimento", k=1)
+    if usar_rerank:
+        rerank("aquecimento", [{"texto": "aquecimento"}], top_n=1)
+
+    diversify = not args.no_diversify
+    lat: Dict[str, List[float]] = {"embed": [], "search": [], "diversify": [], "rerank": [], "total": []}
+    por_pergunta: List[Dict[str, Any]] = []
+    for q in conjunto["perguntas"]:
+        graus = {r["artigo"]: int(r.get("grau", 1)) for r in q["relevantes"]}
+        t0 = time.perf_counter()
+        timings: Dict[str, float] = {}
+        hits = retriever.search(preprocess_question(q["pergunta"]), k=max(8, args.k), timings=timings,
+                                diversify=diversify)
+        for etapa in ("embed", "search", "diversify"):
+            if etapa in timings:
+                lat[etapa].append(timings[etapa] * 1000)
+        item: Dict[str, Any] = {"id": q["id"], "pergunta": q["pergunta"], "relevantes": graus,
+                                "vetorial": _metricas(_artigos(hits, lei), graus, ks),
+                                "top_vetorial": _artigos(hits, lei)[:args.n]}
+        if usar_rerank:
+            t1 = time.perf_counter()
+            ranked = rerank(q["pergunta"], hits, top_n=args.n)
+            lat["rerank"].append((time.perf_counter() - t1) * 1000)
+            item["rerank"] = _metricas(_artigos(ranked, lei), graus, ks)
+            item["top_rerank"] = _artigos(ranked, lei)
+        lat["total"].append((time.perf_counter() - t0) * 1000)
+        por_pergunta.append(item)
+
+    resultado: Dict[str, Any] = {
+        "conjunto": args.questions,
+        "versao": conjunto.get("versao"),
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "perguntas": len(por_pergunta),
+        "collection": args.collection,
+        "k": args.k,
+        "n": args.n,
+        "diversify": diversify,
+        "metricas": {"vetorial": _resumo(por_pergunta, "vetorial", ks)},
+        "latencia_ms": {etapa: {"p50": round(_pct(xs, 0.50), 2), "p95": round(_pct(xs, 0.95), 2)}
+                        for etapa, xs in lat.items() if xs},
+        "por_pergunta": por_pergunta,
+    }
+    if usar_rerank:
+        # com rerank só há `n` resultados: cortes maiores que n equivalem a n
+        resultado["metricas"]["rerank"] = _resumo(por_pergunta, "rerank", ks)
+
+    print(f"Conjunto {args.questions} (versão {resultado['versao']}, {len(por_pergunta)} perguntas)")
+    for modo, m in resultado["metricas"].items():
+        print(f"  {modo:9s} " + "  ".join(f"{nome}={v:.3f}" for nome, v in m.items()))
+    for etapa, v in resultado["latencia_ms"].items():
+        print(f"  {etapa:9s} p50={v['p50']:.1f}ms  p95={v['p95']:.1f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
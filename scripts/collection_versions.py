@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Collections versionadas (blue/green) atrás de um alias do Qdrant.
+
+A API e o gerador de documentos consultam QDRANT_COLLECTION ("leis"), que passa a ser um alias
+apontando para uma versão concreta ("leis_v20250101120000"). O indexador
+(`index_qdrant_local --blue-green`) constrói a nova versão ao lado da atual, valida e troca o
+alias numa única operação atômica; versões antigas ficam para rollback.
+
+Toda execução do indexador que altera pontos (inclusive `--sync` no lugar, que mantém ids e
+contagem) grava também uma marca de revisão da collection escrita: um alias
+"<collection>__rev<ns>" trocado a cada execução. Quem guarda resultados derivados do conteúdo
+(consultas frequentes da API) compara alvo do alias + marca com um único `get_aliases`.
+
+Uso:
+  python -m scripts.collection_versions --alias leis --list
+  python -m scripts.collection_versions --alias leis --rollback        # volta para a versão anterior
+  python -m scripts.collection_versions --alias leis --switch leis_v20250101120000
+  python -m scripts.collection_versions --alias leis --prune 3         # mantém as 3 mais novas + a ativa
+"""
+from __future__ import annotations
+import argparse, os, time
+from typing import List, Optional, Sequence, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation, FieldCondition, Filter, MatchAny,
+    PointStruct,
+)
+
+KEEP_VERSIONS = int(os.getenv("QDRANT_KEEP_VERSIONS", "3"))
+REVISION_SEP = "__rev"
+
+
+class ValidationError(RuntimeError):
+    pass
+
+
+def new_version_name(alias: str) -> str:
+    return f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def list_versions(client: QdrantClient, alias: str) -> List[str]:
+    """Versões existentes do alias, da mais antiga para a mais nova."""
+    prefixo = f"{alias}_v"
+    return sorted(c.name for c in client.get_collections().collections if c.name.startswith(prefixo))
+
+
+def alias_target(client: QdrantClient, alias: str) -> Optional[str]:
+    """Collection para onde o alias aponta (None se o alias não existe)."""
+    for a in client.get_aliases().aliases:
+        if a.alias_name == alias:
+            return a.collection_name
+    return None
+
+
+def collection_revision(client: QdrantClient, alias: str) -> Tuple[str, Optional[str]]:
+    """(collection concreta consultada por `alias`, marca de revisão dela ou None se o indexador
+    ainda não gravou nenhuma), com um só `get_aliases`."""
+    aliases = client.get_aliases().aliases
+    alvo = next((a.collection_name for a in aliases if a.alias_name == alias), alias)
+    prefixo = f"{alvo}{REVISION_SEP}"
+    revs = sorted(a.alias_name[len(prefixo):] for a in aliases
+                  if a.collection_name == alvo and a.alias_name.startswith(prefixo))
+    return alvo, (revs[-1] if revs else None)
+
+
+def bump_revision(client: QdrantClient, collection: str) -> str:
+    """Troca a marca de revisão de `collection` (concreta) numa única operação: remove os aliases
+    "<collection>__rev*" e cria um novo. Retorna a marca nova."""
+    prefixo = f"{collection}{REVISION_SEP}"
+    rev = str(time.time_ns())
+    ops = [DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=a.alias_name))
+           for a in client.get_aliases().aliases if a.alias_name.startswith(prefixo)]
+    ops.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=f"{prefixo}{rev}")))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    return rev
+
+
+def switch_alias(client: QdrantClient, alias: str, collection: str, replace_collection: bool = False) -> Optional[str]:
+    """Aponta `alias` para `collection` numa única operação (remove + cria no mesmo request).
+    Retorna a collection anterior.
+
+    Se existir uma collection concreta com o nome do alias (instalação anterior ao versionamento),
+    ela só é apagada com `replace_collection` — único momento com uma janela curta sem o nome.
+    """
+    anterior = alias_target(client, alias)
+    ops = []
+    if anterior is not None:
+        ops.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        if not replace_collection:
+            raise SystemExit(
+                f"Já existe a collection concreta '{alias}'; rode com --replace-collection para apagá-la e "
+                f"criar o alias (a busca fica indisponível só durante essa troca)."
+            )
+        client.delete_collection(alias)
+    ops.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    return anterior
+
+
+def copy_points(client: QdrantClient, src: str, dst: str, exclude_leis: Sequence[str] = (), batch: int = 256) -> int:
+    """Copia pontos (vetor + payload) de `src` para `dst`, exceto os das `exclude_leis`.
+    Usado para levar à nova versão as leis que não estão sendo reindexadas."""
+    flt = Filter(must_not=[FieldCondition(key="lei", match=MatchAny(any=list(exclude_leis)))]) if exclude_leis else None
+    copiados = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=src, scroll_filter=flt, limit=batch, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(collection_name=dst, wait=True,
+                          points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points])
+            copiados += len(points)
+        if offset is None:
+            return copiados
+
+
+def validate_collection(client: QdrantClient, name: str, expected: int, smoke_vector: Optional[List[float]] = None,
+                        timeout: float = 600) -> None:
+    """Espera o índice ficar pronto e confere a contagem de pontos e uma consulta de fumaça."""
+    t0 = time.perf_counter()
+    while client.get_collection(name).status.value != "green":
+        if time.perf_counter() - t0 > timeout:
+            raise ValidationError(f"{name}: índice não ficou pronto em {timeout}s")
+        time.sleep(0.5)
+    total = client.count(collection_name=name, exact=True).count
+    if total != expected:
+        raise ValidationError(f"{name}: {total} pontos, esperado {expected}")
+    if smoke_vector is not None and expected and not client.search(collection_name=name, query_vector=smoke_vector, limit=1):
+        raise ValidationError(f"{name}: consulta de validação sem resultados")
+
+
+def prune_versions(client: QdrantClient, alias: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """Apaga as versões mais antigas, mantendo as `keep` mais novas e sempre a ativa."""
+    ativa = alias_target(client, alias)
+    antigas = [v for v in list_versions(client, alias) if v != ativa]
+    apagar = antigas[:max(0, len(antigas) - keep)]
+    for nome in apagar:
+        client.delete_collection(nome)
+    return apagar
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--alias", default=os.getenv("QDRANT_COLLECTION", "leis"))
+    ap.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    grp = ap.add_mutually_exclusive_group(required=True)
+    grp.add_argument("--list", action="store_true", help="Lista as versões e a ativa")
+    grp.add_argument("--rollback", action="store_true", help="Aponta o alias para a versão anterior à ativa")
+    grp.add_argument("--switch", metavar="COLLECTION", help="Aponta o alias para uma versão específica")
+    grp.add_argument("--prune", type=int, metavar="N", help="Mantém só as N versões mais novas (além da ativa)")
+    args = ap.parse_args()
+
+    client = QdrantClient(host=args.host, port=args.port)
+    versoes = list_versions(client, args.alias)
+    ativa = alias_target(client, args.alias)
+
+    if args.list:
+        for v in versoes:
+            pontos = client.count(collection_name=v, exact=True).count
+            print(f"{'*' if v == ativa else ' '} {v}  ({pontos} pontos)")
+        if not versoes:
+            print(f"Nenhuma versão de '{args.alias}'.")
+    elif args.rollback:
+        anteriores = [v for v in versoes if ativa is None or v < ativa]
+        if not anteriores:
+            raise SystemExit("Não há versão anterior para rollback.")
+        switch_alias(client, args.alias, anteriores[-1])
+        print(f"OK: '{args.alias}' -> {anteriores[-1]} (antes: {ativa})")
+    elif args.switch:
+        if args.switch not in versoes:
+            raise SystemExit(f"Versão inexistente: {args.switch} (disponíveis: {', '.join(versoes) or '-'})")
+        switch_alias(client, args.alias, args.switch)
+        print(f"OK: '{args.alias}' -> {args.switch} (antes: {ativa})")
+    else:
+        apagadas = prune_versions(client, args.alias, keep=args.prune)
+        print(f"OK: {len(apagadas)} versões apagadas: {', '.join(apagadas) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
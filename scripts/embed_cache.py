@@ -0,0 +1,152 @@
+"""Cache persistente de embeddings em disco (memory-mapped).
+
+Chave: (modelo, sha256 do texto exato enviado ao encoder). Cada modelo tem seu diretório:
+  <EMBED_CACHE_DIR>/<modelo>/meta.json     {"model", "dim", "dtype"}
+  <EMBED_CACHE_DIR>/<modelo>/vectors.f32   matriz float32 (linhas de `dim`), só cresce
+  <EMBED_CACHE_DIR>/<modelo>/keys.txt      um hash por linha; linha i = vetor i
+
+Os vetores são gravados antes das chaves, então uma escrita interrompida deixa no máximo
+linhas órfãs no fim de vectors.f32 (ignoradas e sobrescritas na próxima abertura).
+Um único processo escritor por diretório (indexadores rodam um por vez).
+
+Uso:
+  cache = EmbeddingCache(MODEL_NAME, dim)
+  vecs = encode_cached(model, texts, cache)   # só os textos ausentes passam pelo modelo
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "data/embed_cache")
+
+
+def text_key(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def cache_dir(model_name: str, root: str = EMBED_CACHE_DIR) -> str:
+    return os.path.join(root, re.sub(r"[^\w.-]+", "__", model_name))
+
+
+def cached_dim(model_name: str, root: str = EMBED_CACHE_DIR) -> Optional[int]:
+    """Dimensão gravada no meta.json do cache do modelo (None se ainda não há cache): permite abrir
+    o cache sem carregar o modelo."""
+    meta_path = os.path.join(cache_dir(model_name, root), "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("dim")
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, root: str = EMBED_CACHE_DIR):
+        self.model_name = model_name
+        self.dim = dim
+        self.dir = cache_dir(model_name, root)
+        os.makedirs(self.dir, exist_ok=True)
+        self._vec_path = os.path.join(self.dir, "vectors.f32")
+        self._keys_path = os.path.join(self.dir, "keys.txt")
+        self._check_meta()
+        self._index: Dict[str, int] = {}
+        self._mm: Optional[np.memmap] = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _check_meta(self) -> None:
+        meta_path = os.path.join(self.dir, "meta.json")
+        meta = {"model": self.model_name, "dim": self.dim, "dtype": "float32"}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                old = json.load(f)
+            if old.get("dim") != self.dim:
+                raise ValueError(f"Cache em {self.dir} tem dim={old.get('dim')}, modelo gera {self.dim}")
+            return
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def _load(self) -> None:
+        keys: List[str] = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "r", encoding="ascii") as f:
+                keys = [ln.strip() for ln in f if ln.strip()]
+        row_bytes = self.dim * 4
+        rows = os.path.getsize(self._vec_path) // row_bytes if os.path.exists(self._vec_path) else 0
+        if rows < len(keys):  # chaves sem vetor (não deveria ocorrer): descarta as excedentes
+            keys = keys[:rows]
+            with open(self._keys_path, "w", encoding="ascii") as f:
+                f.writelines(k + "\n" for k in keys)
+        if rows > len(keys):  # vetores órfãos de uma escrita interrompida
+            with open(self._vec_path, "r+b") as f:
+                f.truncate(len(keys) * row_bytes)
+        self._index = {k: i for i, k in enumerate(keys)}
+        self._mm = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _matrix(self) -> np.memmap:
+        if self._mm is None or self._mm.shape[0] < len(self._index):
+            self._mm = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(len(self._index), self.dim))
+        return self._mm
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Vetor de cada texto (cópia) ou None se ausente."""
+        rows = [self._index.get(text_key(t)) for t in texts]
+        found = [r for r in rows if r is not None]
+        self.hits += len(found)
+        self.misses += len(rows) - len(found)
+        if not found:
+            return [None] * len(rows)
+        mat = self._matrix()
+        return [None if r is None else np.array(mat[r]) for r in rows]
+
+    def put_many(self, texts: Sequence[str], vecs: np.ndarray) -> None:
+        novos = []
+        keys: List[str] = []
+        vistos = set()
+        for t, v in zip(texts, vecs):
+            k = text_key(t)
+            if k in self._index or k in vistos:
+                continue
+            vistos.add(k)
+            keys.append(k)
+            novos.append(v)
+        if not keys:
+            return
+        arr = np.asarray(novos, dtype=np.float32).reshape(len(keys), self.dim)
+        with open(self._vec_path, "ab") as f:
+            f.write(arr.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._keys_path, "a", encoding="ascii") as f:
+            f.writelines(k + "\n" for k in keys)
+        base = len(self._index)
+        for i, k in enumerate(keys):
+            self._index[k] = base + i
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+
+def encode_cached(model, texts: Sequence[str], cache: Optional[EmbeddingCache], batch_size: int = 32) -> np.ndarray:
+    """`model.encode(texts, normalize_embeddings=True)` passando pelo cache: só os ausentes
+    vão ao modelo, e são gravados no cache em seguida."""
+    if cache is None:
+        return np.asarray(model.encode(list(texts), normalize_embeddings=True, batch_size=batch_size), dtype=np.float32)
+    cached = cache.get_many(texts)
+    faltam = [i for i, v in enumerate(cached) if v is None]
+    if faltam:
+        novos = np.asarray(
+            model.encode([texts[i] for i in faltam], normalize_embeddings=True, batch_size=batch_size),
+            dtype=np.float32,
+        )
+        cache.put_many([texts[i] for i in faltam], novos)
+        for i, v in zip(faltam, novos):
+            cached[i] = v
+    return np.vstack(cached) if cached else np.zeros((0, cache.dim), dtype=np.float32)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Ranqueia as consultas mais frequentes do log do /chat (QUERY_LOG_PATH) e grava as N primeiras
+em HOT_QUERIES_PATH, que cada worker da API pré-calcula na subida (app/hot_queries.py).
+
+Uso:
+  python -m scripts.hot_queries --top 200 --min-count 3 --since-days 30
+  python -m scripts.hot_queries --log logs/*.log --out data/hot_queries.json --dry-run
+"""
+from __future__ import annotations
+import argparse, glob, json, os, pathlib, sys, time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app.hot_queries import HOT_QUERIES_PATH, QUERY_LOG_PATH, normalize_query
+
+
+def read_log(paths: Iterable[str], since: Optional[float] = None) -> Tuple[Counter, Dict[str, Counter]]:
+    """Conta as consultas dos logs por forma normalizada (chave do cache) e, para cada chave, as
+    variantes do texto original como foram digitadas."""
+    cont: Counter = Counter()
+    textos: Dict[str, Counter] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for ln in f:
+                ts, sep, q = ln.rstrip("\n").partition("\t")
+                if not sep:
+                    continue
+                try:
+                    if since is not None and int(ts) < since:
+                        continue
+                except ValueError:
+                    continue
+                texto = " ".join(q.split())
+                chave = normalize_query(texto)
+                if chave:
+                    cont[chave] += 1
+                    textos.setdefault(chave, Counter())[texto] += 1
+    return cont, textos
+
+
+def representative(variantes: Counter) -> str:
+    """Texto original mais frequente da chave (empate: ordem alfabética)."""
+    return min(variantes.items(), key=lambda x: (-x[1], x[0]))[0]
+
+
+def rank(cont: Counter, textos: Dict[str, Counter], top: int, min_count: int) -> List[Dict[str, object]]:
+    """`query` é o texto que o worker pré-calcula (mesmo pipeline do /chat); `key`, a chave do cache."""
+    # empate: ordem alfabética, para o arquivo ser estável entre execuções
+    itens = sorted(((q, n) for q, n in cont.items() if n >= min_count), key=lambda x: (-x[1], x[0]))
+    return [{"query": representative(textos[q]), "key": q, "count": n} for q, n in itens[:top]]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--log", nargs="+", default=[QUERY_LOG_PATH], help="Arquivos de log (aceita glob)")
+    ap.add_argument("--out", default=HOT_QUERIES_PATH)
+    ap.add_argument("--top", type=int, default=200, help="Quantas consultas manter")
+    ap.add_argument("--min-count", type=int, default=2, help="Frequência mínima")
+    ap.add_argument("--since-days", type=float, default=0, help="Só as últimas N dias (0 = todo o log)")
+    ap.add_argument("--dry-run", action="store_true", help="Só imprime o ranking")
+    args = ap.parse_args()
+
+    paths = sorted({p for padrao in args.log for p in (glob.glob(padrao) or [padrao]) if os.path.exists(p)})
+    if not paths:
+        raise SystemExit(f"Nenhum log encontrado em {args.log}")
+    since = time.time() - args.since_days * 86400 if args.since_days else None
+    cont, textos = read_log(paths, since)
+    queries = rank(cont, textos, args.top, args.min_count)
+    total = sum(cont.values())
+    cobertas = sum(q["count"] for q in queries)
+
+    print(f"{total} consultas ({len(cont)} distintas) em {len(paths)} arquivo(s); "
+          f"top {len(queries)} cobrem {cobertas / total:.1%}" if total else "Log vazio")
+    for q in queries[:20]:
+        print(f"{q['count']:>7d}  {q['query']}")
+    if args.dry_run:
+        return
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    tmp = f"{args.out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": paths,
+            "since_days": args.since_days or None,
+            "total": total,
+            "distinct": len(cont),
+            "coverage": round(cobertas / total, 4) if total else 0.0,
+            "queries": queries,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, args.out)  # workers subindo nunca leem um arquivo pela metade
+    print(f"[OK] {len(queries)} consultas em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
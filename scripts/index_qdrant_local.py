@@ -3,19 +3,70 @@
 Indexa JSONL no Qdrant usando embeddings locais (gratuito).
 Uso:
   python -m scripts.index_qdrant_local --jsonl data/processed/lei_11101_2005.jsonl --collection leis --recreate
+Sincronização incremental (só embeda/envia registros novos ou alterados e apaga os que sumiram
+do JSONL, restrito às leis presentes nele):
+  python -m scripts.index_qdrant_local --jsonl data/processed/lei_11101_2005.jsonl --collection leis --sync
+
+Os ids dos pontos são UUIDv5 derivados do `id` do registro, então são estáveis entre execuções
+e reindexar a mesma lei sobrescreve os mesmos pontos. O payload guarda `content_hash` e
+`embed_model` para a comparação do --sync.
+
+O JSONL é lido em streaming e indexado em pipeline: o encode do próximo lote roda enquanto os
+anteriores são enviados ao Qdrant por conexões concorrentes (janela limitada, --max-inflight).
+Com --encode-procs N o encode usa N processos. Ao final imprime docs/s de cada etapa:
+  python -m scripts.index_qdrant_local --jsonl ... --encode-procs 4 --batch-size 256 --upload-workers 4
+
+Reindexação sem indisponibilidade (--blue-green): --collection vira um alias; a nova versão é
+construída ao lado da ativa, validada (contagem + consulta de fumaça) e o alias é trocado
+atomicamente. Leis ausentes do JSONL são copiadas da versão ativa. Rollback/listagem:
+scripts/collection_versions.py.
+  python -m scripts.index_qdrant_local --jsonl ... --collection leis --blue-green
+
+Layout da collection: índices keyword em lei/artigo (sempre), HNSW (--hnsw-m/--hnsw-ef-construct),
+quantização int8 (--quantization int8) e vetores em disco (--on-disk). Comparativo de recall e
+latência entre layouts: scripts/bench_collection_layout.py.
+
+Embeddings passam pelo cache em disco (scripts/embed_cache.py, chave = modelo + hash do texto):
+reconstruir o índice de um corpus inalterado não roda o modelo. --no-cache desativa.
 """
 from __future__ import annotations
-import os, argparse, json, time
-from typing import List, Dict
+import os, argparse, json, pathlib, sys, threading, time, uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import (
+    Distance, VectorParams, VectorParamsDiff, PointStruct, PointIdsList, HnswConfigDiff, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, Disabled,
+)
 from sentence_transformers import SentenceTransformer
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scripts.ingest_common import content_hash
+from scripts.embed_cache import EMBED_CACHE_DIR, EmbeddingCache, cached_dim, encode_cached
+from scripts.collection_versions import (
+    KEEP_VERSIONS, ValidationError, alias_target, bump_revision, copy_points, new_version_name, prune_versions,
+    switch_alias, validate_collection,
+)
+
 # Escolha UM modelo:
 # - "intfloat/multilingual-e5-base" (768 dims, muito bom em PT-BR)
 # - "paraphrase-multilingual-MiniLM-L12-v2" (384 dims, leve)
 MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
 
+# Layout da collection (padrões do Qdrant; sobrescreva por env ou CLI)
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # none | int8
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "0") == "1"       # vetores originais em disco (mmap)
+# Campos do payload filtrados em RetrieverLocal.search_with_filter
+PAYLOAD_INDEXES = ["lei", "artigo"]
+QUANTIZATIONS = ("none", "int8")
+
+# Namespace fixo dos UUIDv5 dos pontos (não alterar: mudaria todos os ids)
+POINT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "direito-ao-ponto/leis")
+
 def batched(it, n=64):
     buf = []
     for x in it:
@@ -26,47 +77,367 @@ def batched(it, n=64):
     if buf:
         yield buf
 
+def point_id(record_id: str) -> str:
+    """Id determinístico do ponto no Qdrant a partir do id do registro."""
+    return str(uuid.uuid5(POINT_NAMESPACE, record_id))
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Lê o JSONL em streaming (um registro por vez)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            if not r.get("id"):
+                raise SystemExit(f"Registro sem 'id' no JSONL: {r.get('lei')} art. {r.get('artigo')}")
+            # JSONL antigo (sem content_hash): calcula na hora
+            if not r.get("content_hash"):
+                r["content_hash"] = content_hash(r.get("texto", ""))
+            yield r
+
+def collection_layout(
+    hnsw_m: int = QDRANT_HNSW_M,
+    hnsw_ef_construct: int = QDRANT_HNSW_EF_CONSTRUCT,
+    quantization: str = QDRANT_QUANTIZATION,
+    on_disk: bool = QDRANT_ON_DISK,
+) -> Dict[str, Any]:
+    """Configuração de índice/armazenamento da collection.
+
+    int8: quantização escalar (4x menos memória nos vetores usados na busca, mantidos em RAM);
+    a precisão é recuperada com rescore nos vetores originais (ver retrieval_local.search_params).
+    on_disk: vetores originais em disco via mmap; combinado com int8 é o layout para pouca RAM.
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"quantization inválida: {quantization!r} (use {', '.join(QUANTIZATIONS)})")
+    quant = None
+    if quantization == "int8":
+        quant = ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    return {
+        "hnsw_config": HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        "quantization_config": quant,
+        "on_disk": on_disk,
+    }
+
+def ensure_collection(
+    client: QdrantClient,
+    name: str,
+    dim: int,
+    recreate: bool = False,
+    layout: Optional[Dict[str, Any]] = None,
+    update_layout: bool = False,
+    payload_indexes: Iterable[str] = PAYLOAD_INDEXES,
+) -> None:
+    """Cria a collection se não existir (ou recria com --recreate). Nunca apaga sem pedido.
+    Numa collection existente, o layout só é aplicado com `update_layout`; os índices de
+    payload (keyword) são garantidos sempre."""
+    layout = layout or collection_layout()
+    exists = client.collection_exists(name)
+    if exists and recreate:
+        client.delete_collection(name)
+        exists = False
+    if exists:
+        size = client.get_collection(name).config.params.vectors.size
+        if size != dim:
+            raise SystemExit(f"Collection '{name}' tem vetores de {size} dims e o modelo gera {dim}; use --recreate.")
+        if update_layout:
+            client.update_collection(
+                collection_name=name,
+                vectors_config={"": VectorParamsDiff(on_disk=layout["on_disk"])},
+                hnsw_config=layout["hnsw_config"],
+                quantization_config=layout["quantization_config"] or Disabled.DISABLED,
+            )
+    else:
+        client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=layout["on_disk"]),
+            hnsw_config=layout["hnsw_config"],
+            quantization_config=layout["quantization_config"],
+        )
+    existentes = client.get_collection(name).payload_schema or {}
+    for campo in payload_indexes:
+        if campo not in existentes:
+            client.create_payload_index(collection_name=name, field_name=campo, field_schema=PayloadSchemaType.KEYWORD)
+
+def existing_points(client: QdrantClient, collection: str) -> Dict[str, Tuple[str, str, str]]:
+    """id do ponto -> (content_hash, embed_model, lei) de todos os pontos já indexados."""
+    out: Dict[str, Tuple[str, str, str]] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=1000,
+            offset=offset,
+            with_payload=["lei", "content_hash", "embed_model"],
+            with_vectors=False,
+        )
+        for p in points:
+            payload = p.payload or {}
+            out[str(p.id)] = (payload.get("content_hash", ""), payload.get("embed_model", ""), payload.get("lei", ""))
+        if offset is None:
+            return out
+
+class SyncFilter:
+    """Filtro em streaming do --sync: deixa passar só registros novos ou alterados (hash ou modelo)
+    e, ao final, aponta os pontos que sumiram do JSONL, restritos às leis vistas nele."""
+
+    def __init__(self, existing: Dict[str, Tuple[str, str, str]], model_name: str):
+        self.existing = existing
+        self.model_name = model_name
+        self.seen: Set[str] = set()
+        self.leis: Set[str] = set()
+        self.unchanged = 0
+
+    def filter(self, recs: Iterable[Dict]) -> Iterator[Dict]:
+        for r in recs:
+            pid = point_id(r["id"])
+            self.seen.add(pid)
+            self.leis.add(r.get("lei", ""))
+            old = self.existing.get(pid)
+            if old is not None and old[:2] == (r["content_hash"], self.model_name):
+                self.unchanged += 1
+                continue
+            yield r
+
+    def stale(self) -> List[str]:
+        return [pid for pid, (_, _, lei) in self.existing.items() if lei in self.leis and pid not in self.seen]
+
+class MultiProcessEncoder:
+    """Pool multiprocesso do SentenceTransformer (um processo por núcleo pedido) com a mesma
+    interface `encode` do modelo, para usar em encode_cached."""
+
+    def __init__(self, model: SentenceTransformer, procs: int):
+        self.model = model
+        self.pool = model.start_multi_process_pool(target_devices=["cpu"] * procs)
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, batch_size: int = 32):
+        return self.model.encode_multi_process(texts, self.pool, batch_size=batch_size,
+                                               normalize_embeddings=normalize_embeddings)
+
+    def close(self) -> None:
+        self.model.stop_multi_process_pool(self.pool)
+
+class LazyEncoder:
+    """Carrega o SentenceTransformer (e, com `procs` > 1, o pool multiprocesso) só no primeiro
+    `encode`: numa reindexação com tudo no cache de embeddings o modelo nem é carregado."""
+
+    def __init__(self, model_name: str, procs: int = 1):
+        self.model_name = model_name
+        self.procs = procs
+        self.model: Optional[SentenceTransformer] = None
+        self._encoder = None
+
+    def _load_model(self) -> SentenceTransformer:
+        if self.model is None:
+            print(f"[INDEX] carregando o modelo {self.model_name}")
+            self.model = SentenceTransformer(self.model_name)  # CPU ok
+        return self.model
+
+    def dimension(self) -> int:
+        return self._load_model().get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, batch_size: int = 32):
+        if self._encoder is None:
+            model = self._load_model()
+            self._encoder = MultiProcessEncoder(model, self.procs) if self.procs > 1 else model
+        return self._encoder.encode(texts, normalize_embeddings=normalize_embeddings, batch_size=batch_size)
+
+    def close(self) -> None:
+        """Encerra o pool multiprocesso; encodes depois disso (ex.: consulta de validação) usam o
+        modelo no próprio processo."""
+        if isinstance(self._encoder, MultiProcessEncoder):
+            self._encoder.close()
+            self._encoder = self.model
+
+class _Stage:
+    """Contador de documentos e tempo ocupado de uma etapa do pipeline."""
+
+    def __init__(self) -> None:
+        self.docs = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, docs: int, seconds: float) -> None:
+        with self._lock:
+            self.docs += docs
+            self.busy += seconds
+
+    def rate(self) -> Optional[float]:
+        return round(self.docs / self.busy, 1) if self.busy > 0 else None
+
+def index_pipeline(
+    client: QdrantClient,
+    encoder,
+    collection: str,
+    recs: Iterable[Dict],
+    batch_size: int = 64,
+    cache: Optional[EmbeddingCache] = None,
+    upload_workers: int = 4,
+    max_inflight: int = 8,
+    progress_every: int = 10,
+) -> Dict[str, Dict]:
+    """Leitura -> encode -> upsert em pipeline: enquanto o lote N é enviado ao Qdrant (threads,
+    no máximo `max_inflight` lotes em voo), o lote N+1 já está sendo codificado.
+    Retorna docs e docs/s (pelo tempo ocupado) de cada etapa."""
+    read, enc, up = _Stage(), _Stage(), _Stage()
+    t_inicio = time.perf_counter()
+
+    def upload(points: List[PointStruct]) -> None:
+        t0 = time.perf_counter()
+        client.upsert(collection_name=collection, points=points, wait=True)
+        up.add(len(points), time.perf_counter() - t0)
+
+    def timed_batches() -> Iterator[List[Dict]]:
+        it = iter(batched(recs, n=batch_size))
+        while True:
+            t0 = time.perf_counter()
+            batch = next(it, None)
+            if batch is None:
+                return
+            read.add(len(batch), time.perf_counter() - t0)
+            yield batch
+
+    inflight: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max(1, upload_workers), thread_name_prefix="qdrant-upsert") as pool:
+        for n, batch in enumerate(timed_batches(), start=1):
+            t0 = time.perf_counter()
+            vecs = encode_cached(encoder, [r["texto"] for r in batch], cache).tolist()
+            enc.add(len(batch), time.perf_counter() - t0)
+            points = [
+                PointStruct(id=point_id(r["id"]), vector=v, payload=dict(r, embed_model=MODEL_NAME))  # payload = seu JSON
+                for r, v in zip(batch, vecs)
+            ]
+            while len(inflight) >= max(1, max_inflight):
+                inflight.popleft().result()
+            inflight.append(pool.submit(upload, points))
+            if progress_every and n % progress_every == 0:
+                print(f"[INDEX] lidos {read.docs} | encode {enc.docs} ({enc.rate()} docs/s) | "
+                      f"upsert {up.docs} ({up.rate()} docs/s por conexão) | {len(inflight)} lotes em voo")
+        while inflight:
+            inflight.popleft().result()
+
+    total = time.perf_counter() - t_inicio
+    return {
+        "read": {"docs": read.docs, "busy_s": round(read.busy, 3), "docs_por_s": read.rate()},
+        "encode": {"docs": enc.docs, "busy_s": round(enc.busy, 3), "docs_por_s": enc.rate()},
+        "upsert": {"docs": up.docs, "busy_s": round(up.busy, 3), "docs_por_s_conexao": up.rate()},
+        "total": {"docs": up.docs, "segundos": round(total, 3),
+                  "docs_por_s": round(up.docs / total, 1) if total > 0 else None},
+    }
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--jsonl", required=True)
     ap.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION","leis"))
     ap.add_argument("--host", default=os.getenv("QDRANT_HOST","localhost"))
     ap.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT","6333")))
-    ap.add_argument("--recreate", action="store_true")
+    ap.add_argument("--recreate", action="store_true", help="Apaga e recria a collection antes de indexar")
+    ap.add_argument("--sync", action="store_true",
+                    help="Só embeda/envia registros novos ou alterados e apaga os que sumiram do JSONL (mesmas leis)")
+    ap.add_argument("--batch-size", type=int, default=64, help="Registros por lote (encode + upsert)")
+    ap.add_argument("--hnsw-m", type=int, default=QDRANT_HNSW_M, help="Arestas por nó do grafo HNSW")
+    ap.add_argument("--hnsw-ef-construct", type=int, default=QDRANT_HNSW_EF_CONSTRUCT, help="Vizinhos avaliados na construção do HNSW")
+    ap.add_argument("--quantization", choices=QUANTIZATIONS, default=QDRANT_QUANTIZATION,
+                    help="int8 = quantização escalar em RAM (buscas com rescore nos vetores originais)")
+    ap.add_argument("--on-disk", action="store_true", default=QDRANT_ON_DISK, help="Vetores originais em disco (mmap)")
+    ap.add_argument("--update-layout", action="store_true",
+                    help="Aplica HNSW/quantização/on-disk também a uma collection existente")
+    ap.add_argument("--encode-procs", type=int, default=1,
+                    help="Processos de encode (pool multiprocesso do SentenceTransformer); 1 = no próprio processo")
+    ap.add_argument("--upload-workers", type=int, default=4, help="Conexões concorrentes de upsert")
+    ap.add_argument("--max-inflight", type=int, default=8, help="Máximo de lotes enviados e ainda não confirmados")
+    ap.add_argument("--cache-dir", default=EMBED_CACHE_DIR, help="Diretório do cache de embeddings")
+    ap.add_argument("--no-cache", action="store_true", help="Não lê nem grava o cache de embeddings")
+    ap.add_argument("--stats-json", default="", help="Onde gravar as estatísticas por etapa (opcional)")
+    ap.add_argument("--blue-green", action="store_true",
+                    help="Indexa numa nova versão (<collection>_v<data>), valida e troca o alias --collection atomicamente")
+    ap.add_argument("--no-carry-over", action="store_true",
+                    help="Com --blue-green, não copia da versão ativa as leis ausentes do JSONL")
+    ap.add_argument("--smoke-query", default="recuperação judicial", help="Consulta de validação da nova versão")
+    ap.add_argument("--keep-versions", type=int, default=KEEP_VERSIONS, help="Versões antigas mantidas para rollback")
+    ap.add_argument("--replace-collection", action="store_true",
+                    help="Com --blue-green, apaga uma collection concreta com o nome do alias (migração única)")
     args = ap.parse_args()
-
-    # Carrega registros
-    recs: List[Dict] = []
-    with open(args.jsonl, "r", encoding="utf-8") as f:
-        for line in f:
-            recs.append(json.loads(line))
+    t0 = time.perf_counter()
+    if args.blue_green and (args.sync or args.recreate or args.update_layout):
+        raise SystemExit("--blue-green sempre constrói uma versão nova; não combine com --sync/--recreate/--update-layout")
 
     # Embeddings locais
-    model = SentenceTransformer(MODEL_NAME)  # CPU ok
-    dim = model.get_sentence_embedding_dimension()
+    # (o modelo só carrega no primeiro texto fora do cache; a dimensão vem do meta.json do cache)
+    encoder = LazyEncoder(MODEL_NAME, args.encode_procs)
+    dim = (None if args.no_cache else cached_dim(MODEL_NAME, root=args.cache_dir)) or encoder.dimension()
+    cache = None if args.no_cache else EmbeddingCache(MODEL_NAME, dim, root=args.cache_dir)
 
     # Qdrant
     client = QdrantClient(host=args.host, port=args.port)
-    if args.recreate:
-        try: client.delete_collection(args.collection)
-        except Exception: pass
-    client.recreate_collection(
-        collection_name=args.collection,
-        vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
-    )
-
-    pid = 1
-    for batch in batched(recs, n=64):
-        texts = [r["texto"] for r in batch]
-        vecs = model.encode(texts, normalize_embeddings=True).tolist()
-        points = [
-            PointStruct(id=pid+i, vector=v, payload=batch[i])  # payload = seu JSON
-            for i, v in enumerate(vecs)
-        ]
-        client.upsert(collection_name=args.collection, points=points, wait=True)
-        pid += len(batch)
-        print(f"Upsert: {pid-1}/{len(recs)}"); time.sleep(0.1)
-    print(f"OK: {len(recs)} pontos na collection '{args.collection}' (modelo={MODEL_NAME}, dim={dim})")
+    layout = collection_layout(args.hnsw_m, args.hnsw_ef_construct, args.quantization, args.on_disk)
+    ativa = alias_target(client, args.collection)
+    target = args.collection
+    if args.blue_green:
+        if ativa is None and client.collection_exists(args.collection) and not args.replace_collection:
+            raise SystemExit(f"Já existe a collection concreta '{args.collection}'; na primeira execução com "
+                             f"--blue-green use --replace-collection (suas leis são copiadas para a nova versão)")
+        target = new_version_name(args.collection)
+        ensure_collection(client, target, dim, layout=layout)
+    else:
+        if ativa is not None and args.recreate:
+            raise SystemExit(f"'{args.collection}' é um alias (-> {ativa}); para reconstruir sem derrubar a busca use --blue-green")
+        ensure_collection(client, args.collection, dim, recreate=args.recreate, layout=layout, update_layout=args.update_layout)
+
+    recs: Iterable[Dict] = iter_jsonl(args.jsonl)
+    leis: Set[str] = set()
+    if args.blue_green:
+        recs = (leis.add(r.get("lei", "")) or r for r in recs)
+    sync = None
+    if args.sync and not args.recreate:
+        sync = SyncFilter(existing_points(client, args.collection), MODEL_NAME)
+        recs = sync.filter(recs)
+
+    try:
+        stats = index_pipeline(client, encoder, target, recs, batch_size=args.batch_size, cache=cache,
+                               upload_workers=args.upload_workers, max_inflight=args.max_inflight)
+    finally:
+        encoder.close()
+
+    if args.blue_green:
+        carried = 0
+        # origem: versão ativa ou, na migração, a collection concreta com o nome do alias
+        origem = ativa or (args.collection if client.collection_exists(args.collection) else None)
+        if origem and not args.no_carry_over:
+            carried = copy_points(client, origem, target, exclude_leis=sorted(leis))
+            print(f"Blue/green: {carried} pontos de outras leis copiados de {origem}")
+        smoke = encode_cached(encoder, [args.smoke_query], cache)[0].tolist()
+        try:
+            validate_collection(client, target, stats["upsert"]["docs"] + carried, smoke_vector=smoke)
+        except ValidationError as e:
+            raise SystemExit(f"Validação falhou, alias '{args.collection}' mantido em {ativa}: {e} "
+                             f"(a versão {target} foi mantida para inspeção)")
+        bump_revision(client, target)  # antes da troca: a API já vê a versão nova com marca
+        switch_alias(client, args.collection, target, replace_collection=args.replace_collection)
+        apagadas = prune_versions(client, args.collection, keep=args.keep_versions)
+        print(f"Blue/green: alias '{args.collection}' -> {target} (antes: {ativa or '-'}); "
+              f"versões antigas apagadas: {', '.join(apagadas) or '-'}")
+
+    stale = sync.stale() if sync else []
+    for ids in batched(stale, n=1000):
+        client.delete(collection_name=args.collection, points_selector=PointIdsList(points=ids), wait=True)
+    unchanged = sync.unchanged if sync else 0
+    if not args.blue_green and (stats["upsert"]["docs"] or stale):
+        # marca de revisão da collection escrita: a API descarta os resultados pré-calculados
+        bump_revision(client, alias_target(client, args.collection) or args.collection)
+    if sync:
+        print(f"Sync: {stats['upsert']['docs']} novos/alterados, {len(stale)} removidos, {unchanged} inalterados")
+
+    for etapa in ("read", "encode", "upsert"):
+        print(f"  {etapa:7s} {stats[etapa]}")
+    print(f"OK: {stats['upsert']['docs']} pontos enviados, {len(stale)} removidos, {unchanged} inalterados na collection "
+          f"'{target}' (modelo={MODEL_NAME}, dim={dim}) em {time.perf_counter() - t0:.1f}s "
+          f"({stats['total']['docs_por_s']} docs/s)")
+    if cache is not None:
+        print(f"Cache de embeddings: {cache.stats()} em {cache.dir}")
+    if args.stats_json:
+        stats.update(removidos=len(stale), inalterados=unchanged, cache=cache.stats() if cache else None)
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""Sidecar de inferência: um processo dono dos modelos de embeddings e rerank, servindo os
+workers da API por um Unix socket (protocolo em inference_client.py).
+
+Requisições de todos os workers entram numa fila por modelo; uma thread por modelo junta o que
+chegou em até --max-wait-ms (ou --max-batch itens) e roda um único forward. A RAM dos modelos
+fica constante ao aumentar os workers do uvicorn, e a CPU não é disputada por N cópias do torch.
+
+Uso:
+  python -m scripts.inference_server --socket /tmp/direito-inferencia.sock --max-batch 64 --max-wait-ms 5
+  INFERENCE_SOCKET=/tmp/direito-inferencia.sock uvicorn app.main:app --workers 4
+"""
+from __future__ import annotations
+import argparse, os, pathlib, queue, socketserver, sys, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from inference_client import recv_msg, send_msg
+from retrieval_local import DEFAULT_MODEL
+from scripts.rerank_local import MODEL_RERANK
+
+DEFAULT_SOCKET = os.getenv("INFERENCE_SOCKET") or "/tmp/direito-inferencia.sock"
+
+
+class Batcher:
+    """Fila + thread que agrupa itens de várias requisições num único forward do modelo."""
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], np.ndarray], max_batch: int, max_wait_ms: float):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.q: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self.busy_s = 0.0
+        threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, items: List[Any]) -> Future:
+        fut: Future = Future()
+        self.q.put((items, fut))
+        return fut
+
+    def _loop(self) -> None:
+        while True:
+            lote = [self.q.get()]
+            n = len(lote[0][0])
+            limite = time.monotonic() + self.max_wait
+            while n < self.max_batch:
+                resta = limite - time.monotonic()
+                if resta <= 0:
+                    break
+                try:
+                    item = self.q.get(timeout=resta)
+                except queue.Empty:
+                    break
+                lote.append(item)
+                n += len(item[0])
+            flat = [x for items, _ in lote for x in items]
+            t0 = time.perf_counter()
+            try:
+                out = self.fn(flat) if flat else np.zeros((0,), dtype=np.float32)
+            except Exception as e:
+                for _, fut in lote:
+                    fut.set_exception(e)
+                continue
+            self.busy_s += time.perf_counter() - t0
+            self.batches += 1
+            self.items += len(flat)
+            self.requests += len(lote)
+            i = 0
+            for items, fut in lote:
+                fut.set_result(out[i:i + len(items)])
+                i += len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "items": self.items,
+            "items_per_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "busy_s": round(self.busy_s, 3),
+            "queued": self.q.qsize(),
+        }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        srv: "InferenceServer" = self.server  # type: ignore[assignment]
+        while True:
+            try:
+                req, _ = recv_msg(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                header, payload = srv.dispatch(req)
+            except Exception as e:
+                header, payload = {"ok": False, "error": f"{type(e).__name__}: {e}"}, b""
+            try:
+                send_msg(self.request, header, payload)
+            except OSError:
+                return
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, embed_model, rerank_model, embed_name: str, rerank_name: str,
+                 max_batch: int, max_wait_ms: float, encode_batch: int):
+        self.embed_model = embed_model
+        self.info = {
+            "ok": True,
+            "pid": os.getpid(),
+            "embed_model": embed_name,
+            "embed_dim": embed_model.get_sentence_embedding_dimension(),
+            "rerank_model": rerank_name,
+        }
+        # normalização é por requisição: uma fila para cada variante
+        self.embed = {
+            norm: Batcher(f"embed{'-norm' if norm else ''}",
+                          lambda xs, norm=norm: np.asarray(
+                              embed_model.encode(xs, normalize_embeddings=norm, batch_size=encode_batch), dtype=np.float32),
+                          max_batch, max_wait_ms)
+            for norm in (True, False)
+        }
+        self.rerank = Batcher("rerank", lambda ps: np.asarray(rerank_model.predict(ps, batch_size=encode_batch),
+                                                              dtype=np.float32), max_batch, max_wait_ms)
+        super().__init__(path, _Handler)
+
+    def dispatch(self, req: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = req.get("op")
+        if op == "embed":
+            vecs = self.embed[bool(req.get("normalize", True))].submit(list(req["texts"])).result()
+            return {"ok": True, "shape": list(vecs.shape)}, vecs.tobytes()
+        if op == "rerank":
+            scores = self.rerank.submit([tuple(p) for p in req["pairs"]]).result()
+            return {"ok": True, "shape": list(scores.shape)}, scores.tobytes()
+        if op == "ping":
+            return {**self.info, "stats": self.stats()}, b""
+        return {"ok": False, "error": f"operação desconhecida: {op!r}"}, b""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"embed": self.embed[True].stats(), "embed_raw": self.embed[False].stats(), "rerank": self.rerank.stats()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--socket", default=DEFAULT_SOCKET)
+    ap.add_argument("--max-batch", type=int, default=64, help="Itens (textos/pares) por forward")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="Espera máxima para completar um lote")
+    ap.add_argument("--encode-batch", type=int, default=32, help="batch_size interno do modelo")
+    ap.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = padrão do torch)")
+    ap.add_argument("--stats-every", type=float, default=60, help="Imprime estatísticas a cada N s (0 = nunca)")
+    args = ap.parse_args()
+
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    t0 = time.perf_counter()
+    embed_model = SentenceTransformer(DEFAULT_MODEL)
+    rerank_model = CrossEncoder(MODEL_RERANK)
+    # primeira inferência fora do caminho das requisições
+    embed_model.encode(["aquecimento"], normalize_embeddings=True)
+    rerank_model.predict([("aquecimento", "aquecimento")])
+    print(f"[INFERENCIA] modelos prontos em {time.perf_counter() - t0:.1f}s ({DEFAULT_MODEL}, {MODEL_RERANK})")
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)  # socket de uma execução anterior
+    server = InferenceServer(args.socket, embed_model, rerank_model, DEFAULT_MODEL, MODEL_RERANK,
+                             args.max_batch, args.max_wait_ms, args.encode_batch)
+    os.chmod(args.socket, 0o660)
+    print(f"[INFERENCIA] ouvindo em {args.socket} (max_batch={args.max_batch}, max_wait={args.max_wait_ms}ms)")
+
+    if args.stats_every > 0:
+        def _stats():
+            while True:
+                time.sleep(args.stats_every)
+                print(f"[INFERENCIA] {server.stats()}")
+        threading.Thread(target=_stats, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,16 @@ Opções:
   --lei-nome       Nome descritivo (ex.: "Lei de Recuperação Judicial e Falências")
   --url / --input  Fonte dos dados (um deles obrigatório)
   --output         Caminho de saída .jsonl (default baseado em lei)
-  --max-chars      Tamanho máximo aproximado de cada chunk
+  --max-tokens     Limite de tokens por chunk no tokenizer do modelo de embeddings (default 512,
+                   EMBED_MAX_TOKENS; o contexto e os tokens especiais entram na conta). 0 = por caracteres
+  --overlap-tokens Tokens repetidos entre chunks vizinhos do mesmo artigo/unidade (default 64)
+  --max-chars      Tamanho máximo aproximado de cada chunk quando --max-tokens 0
+  --no-stream      Usa o caminho antigo (texto inteiro em memória) em vez do streaming
+  --granularity    artigo (default) | paragrafo | inciso: chunks por unidade estrutural, cada um
+                   prefixado com o contexto dos ancestrais (caput, § ...)
+  --incremental    Compara com o JSONL anterior (--previous, default: o próprio --output) e grava
+                   <output>.delta.json com os ids adicionados/alterados/removidos; registros sem
+                   mudança mantêm a data_extracao anterior
 
 Formato JSONL gerado por linha:
   {
@@ -24,18 +33,29 @@ Formato JSONL gerado por linha:
     "url_oficial": "...",
     "data_extracao": "YYYY-MM-DD",
     "chunk_seq": 1,
-    "subsections": {"paragrafos": [...], "incisos": [...]}  # conforme detectado
+    "subsections": {"paragrafos": [...], "incisos": [...]},  # conforme detectado
+    "content_hash": "<sha256 do texto normalizado>",
+    "n_tokens": 231  # tokens do texto no tokenizer do modelo (sem os especiais)
   }
+  Com --granularity paragrafo|inciso, o id ganha a unidade ("...-art-6-par-1-inc-ii-ch-1") e o
+  registro traz "unidade": {"tipo", "rotulo", "caminho", "inicio", "fim"} (offsets no texto
+  do artigo) e "contexto" (já incluído no início de "texto").
+  Artigos repetidos na fonte (ex.: redação anterior mantida pelo Planalto) recebem
+  sufixo de ocorrência no id: "...-art-6-v2-ch-1".
 """
 from __future__ import annotations
 import argparse, json, os, datetime, pathlib, sys
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
 import requests
 
 # Garantir import relativo para executar via "python -m scripts.ingest"
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
-from scripts.ingest_common import html_to_text, normalize_text, split_by_artigos, chunk_text
+from scripts.ingest_common import (
+    html_to_text, normalize_text, split_by_artigos, chunk_text, content_hash,
+    iter_html_lines, iter_text_lines, iter_artigos, iter_unidades,
+    chunk_tokens, get_token_counter, EMBED_MAX_TOKENS, CHUNK_OVERLAP_TOKENS,
+)
 
 
 def fetch_url(url: str, timeout: int = 30) -> str:
@@ -53,6 +73,19 @@ def read_input(path: str) -> str:
     return normalize_text(raw)
 
 
+def iter_input_artigos(path: str) -> Iterator[Dict[str, Any]]:
+    """Versão em streaming de read_input + split_by_artigos: lê o arquivo em blocos e emite
+    cada artigo assim que ele termina."""
+    with open(path, "rb") as fb:
+        head = fb.read(4096)
+    if path.lower().endswith(".html") or b"<html" in head.lower():
+        with open(path, "rb") as fb:
+            yield from iter_artigos(iter_html_lines(fb, encoding="utf-8"))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter_artigos(iter_text_lines(f))
+
+
 def slugify(text: str) -> str:
     # Converte "11.101/2005" -> "lei_11101_2005"
     only = "".join(ch if ch.isalnum() else "_" for ch in text)
@@ -63,71 +96,246 @@ def slugify(text: str) -> str:
     return f"lei_{only.lower()}"
 
 
-def build_id(lei_slug: str, artigo: str, seq: int) -> str:
-    return f"{lei_slug}-art-{artigo}-ch-{seq}"
+GRANULARIDADES = ("artigo", "paragrafo", "inciso")
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--lei", required=True, help="Identificador da lei (ex.: 11.101/2005)")
-    ap.add_argument("--lei-nome", default="", help="Nome descritivo da lei")
-    ap.add_argument("--url", help="URL oficial para baixar HTML")
-    ap.add_argument("--input", help="Arquivo .html ou .txt local")
-    ap.add_argument("--output", help="Arquivo .jsonl de saída")
-    ap.add_argument("--max-chars", type=int, default=5000, help="Tamanho máximo aproximado por chunk")
-    ap.add_argument("--raw-html-out", default="", help="Se usar --url, onde salvar o HTML cru (opcional)")
-    ap.add_argument("--source-url", default="", help="URL oficial (override se quiser diferente do --url)")
-    args = ap.parse_args()
-
-    if not args.url and not args.input:
-        raise SystemExit("Forneça --url ou --input")
+def build_id(lei_slug: str, artigo: str, seq: int, ocorrencia: int = 1, unidade: str = "") -> str:
+    art = artigo if ocorrencia == 1 else f"{artigo}-v{ocorrencia}"
+    if unidade:
+        art = f"{art}-{unidade}"
+    return f"{lei_slug}-art-{art}-ch-{seq}"
 
-    lei_slug = slugify(args.lei)
-    output = args.output or f"data/processed/{lei_slug}.jsonl"
-    os.makedirs(os.path.dirname(output), exist_ok=True)
 
-    if args.url:
-        html = fetch_url(args.url)
-        if args.raw_html_out:
-            os.makedirs(os.path.dirname(args.raw_html_out), exist_ok=True)
-            with open(args.raw_html_out, "w", encoding="utf-8") as fhtml:
-                fhtml.write(html)
-        text = html_to_text(html)
-        source_url = args.source_url or args.url
-    else:
-        text = read_input(args.input)
-        source_url = args.source_url
+def iter_records(
+    artigos: Iterable[Dict[str, Any]],
+    lei: str,
+    lei_slug: str,
+    lei_nome: str = "",
+    source_url: str = "",
+    max_chars: int = 5000,
+    granularity: str = "artigo",
+    max_tokens: int = EMBED_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[Dict[str, Any]]:
+    """Converte artigos (lista ou gerador) em registros JSONL, chunk a chunk.
 
-    artigos = split_by_artigos(text)
+    Com `max_tokens` > 0 os chunks respeitam o limite do modelo de embeddings (contexto incluído);
+    com 0, o corte é por `max_chars`.
+    """
+    if granularity not in GRANULARIDADES:
+        raise ValueError(f"granularity inválida: {granularity!r} (use {', '.join(GRANULARIDADES)})")
+    counter = get_token_counter()
     data_extracao = datetime.date.today().isoformat()
-    count = 0
-
-    with open(output, "w", encoding="utf-8") as out:
-        for art in artigos:
-            artigo = art["artigo"].strip()
-            bloco = art["texto"].strip()
-            if not bloco:
-                continue
-            chunks = chunk_text(bloco, max_chars=args.max_chars)
-            for seq, ch in enumerate(chunks, start=1):
+    ocorrencias: Dict[str, int] = {}
+    for art in artigos:
+        artigo = art["artigo"].strip()
+        bloco = art["texto"].strip()
+        if not bloco:
+            continue
+        ocorrencias[artigo] = ocorrencias.get(artigo, 0) + 1
+        if granularity == "artigo":
+            unidades = [{"slug": "", "texto": bloco, "contexto": ""}]
+        else:
+            unidades = list(iter_unidades(art, granularity))
+        slugs: Dict[str, int] = {}
+        for un in unidades:
+            slug = un["slug"]
+            if slug:
+                # dispositivos repetidos (redação anterior mantida na fonte) recebem sufixo de ocorrência
+                slugs[slug] = slugs.get(slug, 0) + 1
+                if slugs[slug] > 1:
+                    slug = f"{slug}-v{slugs[slug]}"
+            ctx_tokens = counter.count(un["contexto"]) + 1 if un["contexto"] else 0
+            if max_tokens > 0:
+                pecas = chunk_tokens(un["texto"], max(max_tokens - ctx_tokens, max_tokens // 2),
+                                     overlap_tokens, counter)
+            else:
+                pecas = [(ch, counter.count(ch)) for ch in chunk_text(un["texto"], max_chars=max_chars)]
+            for seq, (ch, n_tokens) in enumerate(pecas, start=1):
+                if un["contexto"]:
+                    ch = f"{un['contexto']}\n{ch}"
                 rec: Dict[str, Any] = {
-                    "id": build_id(lei_slug, artigo, seq),
-                    "lei": args.lei,
-                    "lei_nome": args.lei_nome or None,
+                    "id": build_id(lei_slug, artigo, seq, ocorrencias[artigo], slug),
+                    "lei": lei,
+                    "lei_nome": lei_nome or None,
                     "artigo": artigo,
                     "texto": ch,
                     "url_oficial": source_url,
                     "data_extracao": data_extracao,
                     "chunk_seq": seq,
                     "subsections": art.get("subsections", {}),
+                    "content_hash": content_hash(ch),
+                    "n_tokens": n_tokens + ctx_tokens,
                 }
+                if slug:
+                    rec["unidade"] = {k: un[k] for k in ("tipo", "rotulo", "caminho", "inicio", "fim")}
+                    rec["contexto"] = un["contexto"]
                 # remove chave lei_nome se vazio
                 if not rec["lei_nome"]:
                     del rec["lei_nome"]
-                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                count += 1
+                yield rec
+
+
+def load_previous(path: str) -> Dict[str, Tuple[str, str]]:
+    """Lê um JSONL anterior: id -> (content_hash, data_extracao).
+    Registros antigos sem content_hash têm o hash calculado a partir do texto."""
+    prev: Dict[str, Tuple[str, str]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            prev[r["id"]] = (r.get("content_hash") or content_hash(r.get("texto", "")), r.get("data_extracao", ""))
+    return prev
+
+
+def write_records(
+    output: str,
+    artigos: Iterable[Dict[str, Any]],
+    previous: Optional[Dict[str, Tuple[str, str]]] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """Grava os registros em `output` à medida que cada artigo fica pronto.
+
+    Retorna {"chunks": N}; com `previous` (ver load_previous) inclui também "delta" com os ids
+    adicionados/alterados/removidos, e registros inalterados mantêm a data_extracao anterior.
+    """
+    count = 0
+    added, changed, seen = [], [], set()
+    with open(output, "w", encoding="utf-8") as out:
+        for rec in iter_records(artigos, **kwargs):
+            if previous is not None:
+                seen.add(rec["id"])
+                old = previous.get(rec["id"])
+                if old is None:
+                    added.append(rec["id"])
+                elif old[0] != rec["content_hash"]:
+                    changed.append(rec["id"])
+                elif old[1]:
+                    rec["data_extracao"] = old[1]
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            count += 1
+    res: Dict[str, Any] = {"chunks": count}
+    if previous is not None:
+        removed = [rid for rid in previous if rid not in seen]
+        res["delta"] = {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": count - len(added) - len(changed),
+        }
+    return res
+
+
+def ingest_source(
+    lei: str,
+    lei_nome: str = "",
+    url: str | None = None,
+    input: str | None = None,
+    output: str | None = None,
+    max_chars: int = 5000,
+    raw_html_out: str = "",
+    source_url: str = "",
+    stream: bool = True,
+    timeout: int = 30,
+    granularity: str = "artigo",
+    max_tokens: int = EMBED_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    incremental: bool = False,
+    previous: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Ingere uma lei (URL ou arquivo) e grava o JSONL. Retorna {"output": ..., "chunks": N}.
+
+    O JSONL é escrito num arquivo temporário e renomeado ao final, então uma falha no meio
+    não deixa saída parcial no lugar da anterior.
+
+    Com `incremental`, compara com `previous` (default: o `output` existente) e grava
+    `<output sem .jsonl>.delta.json`; o retorno inclui "delta" (contagens) e "delta_path".
+    """
+    if not url and not input:
+        raise ValueError("Forneça url ou input")
+
+    lei_slug = slugify(lei)
+    output = output or f"data/processed/{lei_slug}.jsonl"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    if url:
+        html = fetch_url(url, timeout=timeout)
+        if raw_html_out:
+            os.makedirs(os.path.dirname(raw_html_out), exist_ok=True)
+            with open(raw_html_out, "w", encoding="utf-8") as fhtml:
+                fhtml.write(html)
+        artigos = iter_artigos(iter_html_lines(html)) if stream else split_by_artigos(html_to_text(html))
+        source_url = source_url or url
+    else:
+        artigos = iter_input_artigos(input) if stream else split_by_artigos(read_input(input))
+
+    prev_path = previous or output
+    prev = None
+    if incremental:
+        prev = load_previous(prev_path) if os.path.exists(prev_path) else {}
+
+    tmp = f"{output}.tmp"
+    try:
+        res = write_records(tmp, artigos, previous=prev, lei=lei, lei_slug=lei_slug, lei_nome=lei_nome,
+                            source_url=source_url, max_chars=max_chars, granularity=granularity,
+                            max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    out: Dict[str, Any] = {"output": output, "chunks": res["chunks"]}
+    if incremental:
+        delta = dict(res["delta"], lei=lei, output=output, previous=prev_path,
+                     data_extracao=datetime.date.today().isoformat())
+        delta_path = delta_path_for(output)
+        with open(delta_path, "w", encoding="utf-8") as fd:
+            json.dump(delta, fd, ensure_ascii=False, indent=2)
+        out["delta_path"] = delta_path
+        out["delta"] = {k: (len(v) if isinstance(v, list) else v)
+                        for k, v in res["delta"].items()}
+    return out
+
+
+def delta_path_for(output: str) -> str:
+    base = output[:-len(".jsonl")] if output.endswith(".jsonl") else output
+    return f"{base}.delta.json"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lei", required=True, help="Identificador da lei (ex.: 11.101/2005)")
+    ap.add_argument("--lei-nome", default="", help="Nome descritivo da lei")
+    ap.add_argument("--url", help="URL oficial para baixar HTML")
+    ap.add_argument("--input", help="Arquivo .html ou .txt local")
+    ap.add_argument("--output", help="Arquivo .jsonl de saída")
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS,
+                    help="Limite de tokens por chunk (tokenizer do modelo de embeddings); 0 = cortar por --max-chars")
+    ap.add_argument("--overlap-tokens", type=int, default=CHUNK_OVERLAP_TOKENS, help="Sobreposição entre chunks (tokens)")
+    ap.add_argument("--max-chars", type=int, default=5000, help="Tamanho máximo aproximado por chunk (com --max-tokens 0)")
+    ap.add_argument("--raw-html-out", default="", help="Se usar --url, onde salvar o HTML cru (opcional)")
+    ap.add_argument("--source-url", default="", help="URL oficial (override se quiser diferente do --url)")
+    ap.add_argument("--no-stream", action="store_true", help="Carrega o texto inteiro em memória (caminho antigo)")
+    ap.add_argument("--granularity", choices=GRANULARIDADES, default="artigo",
+                    help="Unidade de chunk: artigo inteiro, parágrafo ou inciso (com contexto dos ancestrais)")
+    ap.add_argument("--incremental", action="store_true", help="Gera delta (added/changed/removed) contra o JSONL anterior")
+    ap.add_argument("--previous", default=None, help="JSONL anterior para --incremental (default: o próprio --output)")
+    args = ap.parse_args()
+
+    if not args.url and not args.input:
+        raise SystemExit("Forneça --url ou --input")
 
-    print(f"OK: {count} chunks escritos em {output}")
+    res = ingest_source(
+        lei=args.lei, lei_nome=args.lei_nome, url=args.url, input=args.input, output=args.output,
+        max_chars=args.max_chars, raw_html_out=args.raw_html_out, source_url=args.source_url,
+        stream=not args.no_stream, granularity=args.granularity,
+        max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens,
+        incremental=args.incremental, previous=args.previous,
+    )
+    print(f"OK: {res['chunks']} chunks escritos em {res['output']}")
+    if args.incremental:
+        print(f"Delta: {res['delta']} em {res['delta_path']}")
 
 
 if __name__ == "__main__":
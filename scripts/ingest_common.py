@@ -2,20 +2,49 @@
 Utilitários para ingestão de textos legais a partir de HTML/TXT.
 - limpeza de HTML do Planalto (e genérico)
 - split por artigos (Art. N)
-- chunking por tamanho aproximado
+- estrutura Art./§/inciso/alínea com offsets, numa única passada
+- chunking por tamanho aproximado ou por unidade estrutural (parágrafo/inciso)
+- chunking por tokens do modelo de embeddings (limite real de 512 tokens do e5), com sobreposição
+- caminho em streaming (linhas -> artigos) com memória constante
 """
 from __future__ import annotations
+import hashlib
+import os
 import re
-from typing import List, Dict, Optional
+import unicodedata
+from typing import List, Dict, Optional, Iterable, Iterator, IO, Tuple, Union
 from bs4 import BeautifulSoup
+from lxml import etree
 
-# Art. N (captura número do artigo)
-RE_ART = re.compile(r'(?:^|\n)\s*Art\.\s*(\d+[ºo]?)\s*[-–—:]?\s*', flags=re.IGNORECASE)
+# Art. N / Art. N-A (captura número do artigo com sufixo de letra, se houver).
+# Sensível a caixa: "art." minúsculo no início de linha é remissão ("art. 79 da Lei ..."), não
+# um novo artigo. O número pode vir em linha separada ("Art.\n\n51-A."), como no HTML do Planalto.
+_ART_NUM = r'(\d+[ºo]?(?:-[A-Z]{1,2}\b)?)'
+RE_ART = re.compile(r'(?:^|\n)[ \t]*(?:Art|ART)\.\s*' + _ART_NUM + r'\s*[-–—:.]?\s*')
+# "Art." sozinho na linha (número na próxima linha não vazia) e o número no início da linha
+RE_ART_SOLO = re.compile(r'^\s*(?:Art|ART)\.\s*$')
+RE_ART_NUM = re.compile(r'^\s*' + _ART_NUM + r'\s*[-–—:.]?\s*')
 # § 1º, § 2º ...
 RE_PAR = re.compile(r'(?:^|\n)\s*§+\s*(\d+º?)\s*[-–—:]?\s*')
 # Incisos romanos (I, II, III...)
 RE_INCISO = re.compile(r'(?:^|\n)\s*([IVXLCDM]+)\s*[-–—)]\s+', flags=re.IGNORECASE)
 
+# Tokenizador único de dispositivos (início de linha): artigo, parágrafo, inciso e alínea.
+# Substitui as passadas separadas de RE_ART/RE_PAR/RE_INCISO por uma só.
+RE_ESTRUTURA = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:Art|ART)\.\s*(?P<art>\d+[ºo]?(?:-[A-Z]{1,2}\b)?)[ \t]*[-–—:.]?'
+    r'|§+\s*(?P<par>\d+º?(?:-[A-Z]{1,2}\b)?)[ \t]*[-–—:.]?'
+    r'|(?P<unico>Parágrafo\s+único)[ \t]*[-–—:.]?'
+    r'|(?P<inc>[IVXLCDM]+(?:-[A-Z]\b)?)[ \t]*[-–—)](?=\s)'
+    r'|(?P<ali>[a-z])\)(?=\s)'
+    r')[ \t]*',
+    flags=re.MULTILINE,
+)
+NIVEIS = {"artigo": 0, "paragrafo": 1, "inciso": 2, "alinea": 3}
+# Tamanho máximo do trecho de cada ancestral usado como contexto das unidades finas
+CONTEXTO_MAX_CHARS = 200
+
 def _normalize_spaces(txt: str) -> str:
     txt = txt.replace('\xa0', ' ')
     txt = txt.replace('\r', '\n')
@@ -26,6 +55,22 @@ def _normalize_spaces(txt: str) -> str:
 def normalize_text(txt: str) -> str:
     return _normalize_spaces(txt)
 
+def content_hash(texto: str) -> str:
+    """Hash (sha256) do texto normalizado: NFKC e espaços/quebras colapsados.
+    Mudanças só de formatação não alteram o hash."""
+    norm = " ".join(unicodedata.normalize("NFKC", texto or "").split())
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+# Linhas descartadas no topo/rodapé (vigência, navegação etc.)
+SKIP_LINE_MARKERS = [
+    "presidência da república",
+    "secretaria-geral",
+    "atualizado em",
+    "voltar ao topo",
+    "sumário",
+    "menu"
+]
+
 def html_to_text(html: str) -> str:
     """
     Limpeza agressiva para páginas do Planalto (e genéricas):
@@ -66,70 +111,462 @@ def html_to_text(html: str) -> str:
     cleaned: List[str] = []
     for ln in lines:
         low = ln.lower()
-        if any(x in low for x in [
-            "presidência da república",
-            "secretaria-geral",
-            "atualizado em",
-            "voltar ao topo",
-            "sumário",
-            "menu"
-        ]):
+        if any(x in low for x in SKIP_LINE_MARKERS):
             continue
         cleaned.append(ln)
     return _normalize_spaces("\n".join(cleaned))
 
+# ---------- Streaming ----------
+
+# Tags cujo conteúdo é ignorado e seletores (id/classe) equivalentes aos de html_to_text
+SKIP_TAGS = {"script", "style", "header", "footer", "nav", "iframe"}
+SKIP_IDS = {"barra-brasil", "topo", "menu", "rodape", "content-mobile"}
+SKIP_CLASSES = {"navbar", "breadcrumb", "rodape", "footer", "banner", "voltar", "voltarTopo"}
+# Tags HTML sem fechamento: não abrem nível de aninhamento
+VOID_TAGS = {"br", "img", "hr", "meta", "link", "input", "col", "area", "base", "wbr", "source"}
+
+READ_CHUNK = 64 * 1024
+
+
+class _HtmlLineTarget:
+    """Alvo do parser lxml (eventos start/end/data): acumula o texto de cada nó e
+    pula subárvores de navegação, sem construir árvore em memória."""
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.skip_until: Optional[int] = None  # profundidade do elemento ignorado aberto
+        self.buf: List[str] = []
+        self.pieces: List[str] = []
+
+    def _flush(self) -> None:
+        if self.buf:
+            self.pieces.append("".join(self.buf))
+            self.buf = []
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        tag = str(tag).lower()
+        if tag in VOID_TAGS:
+            return
+        self.depth += 1
+        if self.skip_until is None:
+            classes = set((attrib.get("class") or "").split())
+            if tag in SKIP_TAGS or attrib.get("id") in SKIP_IDS or classes & SKIP_CLASSES:
+                self.skip_until = self.depth
+
+    def end(self, tag) -> None:
+        self._flush()
+        if str(tag).lower() in VOID_TAGS:
+            return
+        if self.skip_until == self.depth:
+            self.skip_until = None
+        self.depth -= 1
+
+    def data(self, text: str) -> None:
+        if self.skip_until is None:
+            self.buf.append(text)
+
+    def close(self) -> None:
+        self._flush()
+
+    def drain(self) -> List[str]:
+        out, self.pieces = self.pieces, []
+        return out
+
+
+def _clean_lines(pieces: Iterable[str], strip: bool = True) -> Iterator[str]:
+    """Normaliza espaços linha a linha (como _normalize_spaces) e colapsa linhas vazias repetidas.
+    Com `strip`, remove também as linhas de navegação (SKIP_LINE_MARKERS), como em html_to_text."""
+    blank = True  # descarta linhas vazias iniciais
+    for piece in pieces:
+        for ln in piece.replace("\xa0", " ").replace("\r", "\n").split("\n"):
+            ln = re.sub(r"[ \t]+", " ", ln)
+            if strip:
+                ln = ln.strip()
+                if any(x in ln.lower() for x in SKIP_LINE_MARKERS):
+                    continue
+            if not ln.strip():
+                if not blank:
+                    blank = True
+                    yield ""
+                continue
+            blank = False
+            yield ln
+
+
+def iter_html_lines(source: Union[str, bytes, IO], encoding: Optional[str] = "utf-8") -> Iterator[str]:
+    """Gera as linhas limpas de um HTML em streaming.
+
+    `source` pode ser o HTML (str/bytes) ou um arquivo aberto; é lido em blocos e alimentado
+    no parser lxml, então a memória não cresce com o tamanho do documento.
+    """
+    target = _HtmlLineTarget()
+    parser = etree.HTMLParser(target=target, encoding=encoding if not isinstance(source, str) else None)
+
+    def blocks() -> Iterator[Union[str, bytes]]:
+        if isinstance(source, (str, bytes)):
+            for i in range(0, len(source), READ_CHUNK):
+                yield source[i:i + READ_CHUNK]
+        else:
+            while True:
+                block = source.read(READ_CHUNK)
+                if not block:
+                    break
+                yield block
+
+    def pieces() -> Iterator[str]:
+        for block in blocks():
+            parser.feed(block)
+            yield from target.drain()
+        parser.close()
+        yield from target.drain()
+
+    yield from _clean_lines(pieces())
+
+
+def iter_text_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Versão em streaming de normalize_text para arquivos texto (linha a linha)."""
+    yield from _clean_lines(lines, strip=False)
+
+
+def _tokens(txt: str) -> Iterator[Tuple[str, str, int, int]]:
+    """(tipo, rótulo, início do marcador, início do texto) de cada dispositivo, em ordem."""
+    for m in RE_ESTRUTURA.finditer(txt):
+        if m.group("art"):
+            yield "artigo", m.group("art"), m.start(), m.end()
+        elif m.group("par") or m.group("unico"):
+            yield "paragrafo", m.group("par") or "único", m.start(), m.end()
+        elif m.group("inc"):
+            yield "inciso", m.group("inc"), m.start(), m.end()
+        else:
+            yield "alinea", m.group("ali"), m.start(), m.end()
+
+
+def _build_tree(tokens: Iterable[Tuple[str, str, int, int]], fim: int, base: int = 0) -> List[Dict]:
+    """Monta a hierarquia (§ > inciso > alínea) a partir dos tokens de um artigo.
+    Offsets são relativos a `base`; cada nó vai de `inicio` (marcador) até `fim` (próximo
+    dispositivo de mesmo nível ou superior)."""
+    roots: List[Dict] = []
+    stack: List[Dict] = []
+    for tipo, rotulo, ini, ini_txt in tokens:
+        nivel = NIVEIS[tipo]
+        while stack and NIVEIS[stack[-1]["tipo"]] >= nivel:
+            stack.pop()["fim"] = ini - base
+        node = {"tipo": tipo, "rotulo": rotulo, "inicio": ini - base, "inicio_texto": ini_txt - base,
+                "fim": fim, "filhos": []}
+        (stack[-1]["filhos"] if stack else roots).append(node)
+        stack.append(node)
+    return roots
+
+
+def _walk(nodes: List[Dict]) -> Iterator[Dict]:
+    for n in nodes:
+        yield n
+        yield from _walk(n["filhos"])
+
+
+def _make_artigo(num: str, bloco: str, estrutura: List[Dict], inicio: Optional[int] = None) -> Dict:
+    art = {
+        "artigo": num.replace('º', '').replace('o', ''),
+        "texto": bloco,
+        "subsections": {
+            "paragrafos": [n["rotulo"] for n in _walk(estrutura) if n["tipo"] == "paragrafo"],
+            "incisos": [n["rotulo"] for n in _walk(estrutura) if n["tipo"] == "inciso"],
+        },
+        "estrutura": estrutura,
+    }
+    if inicio is not None:
+        art["inicio"], art["fim"] = inicio, inicio + len(bloco)
+    return art
+
+
+def parse_artigo(num: str, raw: str, inicio: Optional[int] = None) -> Dict:
+    """Artigo a partir do texto após o marcador 'Art. N' (estrutura com offsets relativos ao texto)."""
+    bloco = raw.strip()
+    lead = len(raw) - len(raw.lstrip())
+    tokens = (t for t in _tokens(bloco) if t[0] != "artigo")
+    return _make_artigo(num, bloco, _build_tree(tokens, len(bloco)), None if inicio is None else inicio + lead)
+
+
+def iter_artigos(lines: Iterable[str]) -> Iterator[Dict]:
+    """Versão incremental de split_by_artigos: detecta 'Art. N' no início de cada linha e
+    emite cada artigo assim que o próximo começa (mesmo formato de saída; offsets relativos
+    ao texto formado pelas linhas unidas com '\\n')."""
+    num: Optional[str] = None
+    buf: List[str] = []
+    pos = 0
+    inicio = 0
+    pendente: List[str] = []  # "Art." sozinho + linhas vazias seguintes, à espera do número
+
+    def conteudo(linhas: List[str]) -> None:
+        if num is not None:
+            buf.extend(linhas)
+
+    for ln in lines:
+        m = None
+        if pendente:
+            if not ln.strip():
+                pendente.append(ln)
+                pos += len(ln) + 1
+                continue
+            m = RE_ART_NUM.match(ln)
+            if not m:
+                conteudo(pendente)
+            pendente = []
+        if m is None:
+            if RE_ART_SOLO.match(ln):
+                pendente = [ln]
+                pos += len(ln) + 1
+                continue
+            m = RE_ART.match(ln)
+        if m:
+            if num is not None:
+                yield parse_artigo(num, "\n".join(buf), inicio)
+            num = m.group(1)
+            buf = [ln[m.end():]]
+            inicio = pos + m.end()
+        else:
+            conteudo([ln])
+        pos += len(ln) + 1
+    conteudo(pendente)
+    if num is not None:
+        yield parse_artigo(num, "\n".join(buf), inicio)
+
+
 def split_by_artigos(txt: str) -> List[Dict]:
     """
-    Retorna: [{"artigo": "53", "texto": "...", "subsections": {"paragrafos":[...], "incisos":[...]}}]
+    Retorna: [{"artigo": "53", "texto": "...", "subsections": {"paragrafos":[...], "incisos":[...]},
+               "estrutura": [{"tipo", "rotulo", "inicio", "inicio_texto", "fim", "filhos"}, ...],
+               "inicio": ..., "fim": ...}]
+    Uma única passada do tokenizador sobre o texto inteiro; `inicio`/`fim` do artigo são
+    offsets em `txt` e os da estrutura são relativos ao `texto` do artigo.
     """
+    tokens = list(_tokens(txt))
+    arts = [i for i, t in enumerate(tokens) if t[0] == "artigo"]
     parts: List[Dict] = []
-    matches = list(RE_ART.finditer(txt))
-    for i, m in enumerate(matches):
-        start = m.end()
-        end = matches[i+1].start() if i + 1 < len(matches) else len(txt)
-        artigo_num = m.group(1).replace('º', '').replace('o', '')
-        bloco = txt[start:end].strip()
-        paragrafos = [p.group(1) for p in RE_PAR.finditer(bloco)]
-        incisos = [i.group(1) for i in RE_INCISO.finditer(bloco)]
-        parts.append({
-            "artigo": artigo_num,
-            "texto": bloco,
-            "subsections": {"paragrafos": paragrafos, "incisos": incisos}
-        })
+    for j, i in enumerate(arts):
+        nxt = arts[j + 1] if j + 1 < len(arts) else len(tokens)
+        _, num, _, start = tokens[i]
+        end = tokens[nxt][2] if nxt < len(tokens) else len(txt)
+        raw = txt[start:end]
+        bloco = raw.strip()
+        base = start + len(raw) - len(raw.lstrip())
+        estrutura = _build_tree(tokens[i + 1:nxt], len(bloco), base)
+        parts.append(_make_artigo(num, bloco, estrutura, base))
     return parts
 
+
+def node_text(texto: str, node: Dict, completo: bool = True) -> str:
+    """Texto de um nó da estrutura; com completo=False, só o trecho antes do primeiro filho."""
+    fim = node["fim"] if completo or not node["filhos"] else node["filhos"][0]["inicio"]
+    return texto[node["inicio"]:fim].strip()
+
+
+def _rotulo_legivel(node: Dict) -> str:
+    if node["tipo"] == "paragrafo":
+        return "Parágrafo único" if node["rotulo"] == "único" else f"§ {node['rotulo']}"
+    if node["tipo"] == "alinea":
+        return f"{node['rotulo']})"
+    return node["rotulo"]
+
+
+def _slug_unidade(caminho: List[Dict]) -> str:
+    pref = {"paragrafo": "par", "inciso": "inc", "alinea": "ali"}
+    return "-".join(
+        f"{pref[n['tipo']]}-{n['rotulo'].replace('º', '').replace('ú', 'u').lower()}" for n in caminho
+    )
+
+
+def iter_unidades(art: Dict, nivel: str = "paragrafo") -> Iterator[Dict]:
+    """Unidades estruturais de um artigo (de split_by_artigos/iter_artigos) para chunks finos.
+
+    nivel="paragrafo": caput + cada § (ou inciso do caput) com tudo que está abaixo dele.
+    nivel="inciso": caput, o trecho próprio de cada § e cada inciso (com suas alíneas).
+    Cada unidade leva `contexto`: o início do caput e dos ancestrais, para não perder o sentido
+    quando embedada isoladamente.
+    Saída: {"tipo", "rotulo", "slug", "caminho", "texto", "contexto", "inicio", "fim"}.
+    """
+    texto, estrutura = art["texto"], art.get("estrutura") or []
+    corte = estrutura[0]["inicio"] if estrutura else len(texto)
+    caput = texto[:corte].strip()
+    cab_artigo = f"Art. {art['artigo']}"
+
+    def trecho(t: str) -> str:
+        return t if len(t) <= CONTEXTO_MAX_CHARS else t[:CONTEXTO_MAX_CHARS].rstrip() + "..."
+
+    if caput:
+        yield {"tipo": "caput", "rotulo": "caput", "slug": "caput", "caminho": [cab_artigo],
+               "texto": caput, "contexto": "", "inicio": 0, "fim": corte}
+
+    def visitar(node: Dict, ancestrais: List[Dict]) -> Iterator[Dict]:
+        caminho = ancestrais + [node]
+        ctx = [f"{cab_artigo}: {trecho(caput)}" if caput else cab_artigo]
+        ctx += [f"{_rotulo_legivel(a)}: {trecho(node_text(texto, a, completo=False))}" for a in ancestrais]
+        desce = nivel == "inciso" and node["tipo"] == "paragrafo" and node["filhos"]
+        unidade = {
+            "tipo": node["tipo"],
+            "rotulo": node["rotulo"],
+            "slug": _slug_unidade(caminho),
+            "caminho": [cab_artigo] + [_rotulo_legivel(n) for n in caminho],
+            "texto": node_text(texto, node, completo=not desce),
+            "contexto": "\n".join(ctx),
+            "inicio": node["inicio"],
+            "fim": node["filhos"][0]["inicio"] if desce else node["fim"],
+        }
+        if unidade["texto"]:
+            yield unidade
+        if desce:
+            for filho in node["filhos"]:
+                yield from visitar(filho, caminho)
+
+    for node in estrutura:
+        yield from visitar(node, [])
+
+
 def chunk_text(text: str, max_chars: int = 5000) -> List[str]:
     """
     Corta preservando parágrafos; se precisar, cai para frases.
+    Acumula partes em lista (tamanho corrente somado), sem concatenar strings a cada passo.
     """
     if len(text) <= max_chars:
         return [text]
     chunks: List[str] = []
-    paragraphs = text.split("\n\n")
-    buf = ""
-    for p in paragraphs:
-        candidate = (buf + "\n\n" + p).strip() if buf else p.strip()
-        if len(candidate) <= max_chars:
-            buf = candidate
-        else:
+
+    def acumular(partes: Iterable[str], sep: str, saida: List[str]) -> List[str]:
+        buf: List[str] = []
+        tam = 0
+        for p in partes:
+            p = p.strip()
+            if not p:
+                continue
+            novo = tam + (len(sep) if buf else 0) + len(p)
+            if novo <= max_chars:
+                buf.append(p)
+                tam = novo
+                continue
             if buf:
-                chunks.append(buf.strip())
-            if len(p) > max_chars:
-                sentences = re.split(r'(?<=[\.\!\?])\s+', p)
-                sbuf = ""
-                for s in sentences:
-                    cand = (sbuf + " " + s).strip() if sbuf else s
-                    if len(cand) <= max_chars:
-                        sbuf = cand
-                    else:
-                        if sbuf:
-                            chunks.append(sbuf.strip())
-                        sbuf = s
-                if sbuf:
-                    chunks.append(sbuf.strip())
-                buf = ""
-            else:
-                buf = p.strip()
-    if buf:
-        chunks.append(buf.strip())
+                saida.append(sep.join(buf))
+            buf, tam = [p], len(p)
+        return buf
+
+    resto = acumular(text.split("\n\n"), "\n\n", chunks)
+    # parágrafos maiores que o limite sozinhos: quebra por frases
+    final: List[str] = []
+    for ch in chunks + (["\n\n".join(resto)] if resto else []):
+        if len(ch) <= max_chars:
+            final.append(ch)
+        else:
+            sobra = acumular(re.split(r'(?<=[\.\!\?])\s+', ch), " ", final)
+            if sobra:
+                final.append(" ".join(sobra))
+    return final
+
+
+# ---------- Chunking por tokens ----------
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
+# Limite de sequência do modelo de embeddings (e5-base trunca em 512 tokens)
+EMBED_MAX_TOKENS = int(os.getenv("EMBED_MAX_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+
+# Estimativa quando o tokenizer do modelo não está disponível: ~4 caracteres por subpalavra
+RE_TOKEN_ESTIMADO = re.compile(r'\w{1,4}|[^\w\s]')
+
+
+class TokenCounter:
+    """Tokenização com offsets pelo tokenizer (fast) do modelo de embeddings.
+
+    Sem `transformers` (ou sem o modelo no cache/rede), usa uma estimativa por regex e avisa
+    uma vez; os limites passam a ser aproximados.
+    """
+
+    def __init__(self, model_name: str = EMBED_MODEL):
+        self.model_name = model_name
+        self.exato = False
+        self.especiais = 2  # <s> ... </s>
+        self._tok = None
+        try:
+            from transformers import AutoTokenizer
+            self._tok = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            self.especiais = self._tok.num_special_tokens_to_add()
+            self.exato = True
+        except Exception as e:
+            print(f"[AVISO] Tokenizer de {model_name} indisponível ({type(e).__name__}); usando estimativa de tokens.")
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        """(início, fim) em caracteres de cada token de `text`, sem tokens especiais."""
+        if self._tok is None:
+            return [m.span() for m in RE_TOKEN_ESTIMADO.finditer(text)]
+        enc = self._tok(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return [tuple(o) for o in enc["offset_mapping"]]
+
+    def count(self, text: str) -> int:
+        return len(self.offsets(text)) if text else 0
+
+
+_COUNTERS: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(model_name: str = EMBED_MODEL) -> TokenCounter:
+    if model_name not in _COUNTERS:
+        _COUNTERS[model_name] = TokenCounter(model_name)
+    return _COUNTERS[model_name]
+
+
+def chunk_tokens(
+    text: str,
+    max_tokens: int = EMBED_MAX_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+    counter: Optional[TokenCounter] = None,
+) -> List[Tuple[str, int]]:
+    """Corta `text` em janelas de até `max_tokens` tokens (já descontados os especiais do modelo),
+    com `overlap` tokens repetidos entre janelas vizinhas. Retorna [(trecho, n_tokens)].
+
+    Uma tokenização do texto inteiro e uma passada sobre os offsets: para cada token guarda-se o
+    último início de parágrafo, frase e palavra até ali, e cada corte é escolhido em O(1),
+    preferindo fim de parágrafo, depois de frase, depois de palavra (na segunda metade da janela).
+    """
+    counter = counter or get_token_counter()
+    budget = max(1, max_tokens - counter.especiais)
+    offs = counter.offsets(text)
+    n = len(offs)
+    if n <= budget:
+        return [(text.strip(), n)] if text.strip() else []
+
+    # ult_par[i] / ult_frase[i] / ult_palavra[i]: maior j <= i em que um parágrafo/frase/palavra começa no token j
+    ult_par, ult_frase, ult_palavra = [0] * (n + 1), [0] * (n + 1), [0] * (n + 1)
+    for i in range(1, n + 1):
+        ult_par[i], ult_frase[i], ult_palavra[i] = ult_par[i - 1], ult_frase[i - 1], ult_palavra[i - 1]
+        if i == n:
+            ult_par[i] = ult_frase[i] = ult_palavra[i] = n
+            break
+        gap = text[offs[i - 1][1]:offs[i][0]]
+        if not gap:
+            continue
+        ult_palavra[i] = i
+        if "\n\n" in gap:
+            ult_par[i] = ult_frase[i] = i
+        elif "\n" in gap or text[offs[i - 1][1] - 1] in ".!?;:":
+            ult_frase[i] = i
+
+    chunks: List[Tuple[str, int]] = []
+    s = 0
+    while s < n:
+        limite = min(s + budget, n)
+        corte = limite
+        if limite < n:
+            minimo = s + budget // 2
+            for ult in (ult_par, ult_frase, ult_palavra):
+                if ult[limite] > minimo:
+                    corte = ult[limite]
+                    break
+        trecho = text[offs[s][0]:offs[corte - 1][1]].strip()
+        if trecho:
+            chunks.append((trecho, corte - s))
+        if corte >= n:
+            break
+        # próxima janela recua `overlap` tokens, alinhada ao início de palavra
+        prox = corte - min(overlap, budget // 2)
+        prox = ult_palavra[prox] if ult_palavra[prox] > s else prox
+        s = max(prox, s + 1)
     return chunks
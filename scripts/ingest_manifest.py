@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""Ingestão de várias leis a partir de um manifesto, em paralelo (pool de processos).
+
+Cada lei é processada por `scripts.ingest.ingest_source` num processo próprio e gera seu
+próprio JSONL; uma fonte lenta ou com erro não impede as demais. Ao final imprime um resumo
+com throughput e erros (código de saída 1 se alguma falhar).
+
+Uso:
+  python -m scripts.ingest_manifest --manifest data/leis.json --workers 4
+  python -m scripts.ingest_manifest --manifest data/leis.yaml --output-dir data/processed
+
+Manifesto (JSON, ou YAML se PyYAML estiver instalado): lista de objetos, ou {"leis": [...]}
+  [
+    {"lei": "11.101/2005", "lei_nome": "Lei de Recuperação Judicial e Falências",
+     "input": "data/raw/lei_11101_2005.html", "source_url": "https://www.planalto.gov.br/..."},
+    {"lei": "8.078/1990", "url": "https://www.planalto.gov.br/ccivil_03/leis/l8078compilado.htm"},
+    ...
+  ]
+Campos por lei: lei (obrigatório), url ou input (um deles), lei_nome, output, source_url,
+raw_html_out, max_chars, max_tokens, overlap_tokens.
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scripts.ingest import ingest_source, slugify
+from scripts.ingest_common import EMBED_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+ENTRY_KEYS = {"lei", "lei_nome", "url", "input", "output", "source_url", "raw_html_out", "max_chars",
+              "max_tokens", "overlap_tokens"}
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("Manifesto YAML requer PyYAML (pip install pyyaml); ou use JSON.")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("leis", [])
+    if not isinstance(data, list):
+        raise SystemExit("Manifesto deve ser uma lista de leis (ou {\"leis\": [...]})")
+    for i, entry in enumerate(data):
+        if not entry.get("lei") or not (entry.get("url") or entry.get("input")):
+            raise SystemExit(f"Entrada {i} do manifesto precisa de 'lei' e 'url' ou 'input': {entry}")
+        extra = set(entry) - ENTRY_KEYS
+        if extra:
+            raise SystemExit(f"Entrada {i} ({entry['lei']}) com campos desconhecidos: {sorted(extra)}")
+    return data
+
+
+def _ingest_entry(
+    entry: Dict[str, Any], output_dir: str, max_chars: int, stream: bool, timeout: int, incremental: bool = False,
+    max_tokens: int = EMBED_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Dict[str, Any]:
+    """Executa no processo filho; nunca levanta exceção (erro vai no resultado)."""
+    t0 = time.perf_counter()
+    res: Dict[str, Any] = {"lei": entry["lei"], "source": entry.get("url") or entry.get("input")}
+    try:
+        out = ingest_source(
+            lei=entry["lei"],
+            lei_nome=entry.get("lei_nome", ""),
+            url=entry.get("url"),
+            input=entry.get("input"),
+            output=entry.get("output") or os.path.join(output_dir, f"{slugify(entry['lei'])}.jsonl"),
+            max_chars=int(entry.get("max_chars", max_chars)),
+            max_tokens=int(entry.get("max_tokens", max_tokens)),
+            overlap_tokens=int(entry.get("overlap_tokens", overlap_tokens)),
+            raw_html_out=entry.get("raw_html_out", ""),
+            source_url=entry.get("source_url", ""),
+            stream=stream,
+            timeout=timeout,
+            incremental=incremental,
+        )
+        res.update(out)
+        res["bytes"] = os.path.getsize(out["output"])
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+    res["seconds"] = round(time.perf_counter() - t0, 3)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--manifest", required=True, help="Arquivo .json/.yaml com a lista de leis")
+    ap.add_argument("--output-dir", default="data/processed", help="Diretório dos JSONL (se a entrada não definir output)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos em paralelo")
+    ap.add_argument("--max-chars", type=int, default=5000, help="Default de tamanho por chunk (com --max-tokens 0)")
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="Default de tokens por chunk; 0 = por caracteres")
+    ap.add_argument("--overlap-tokens", type=int, default=CHUNK_OVERLAP_TOKENS, help="Default de sobreposição (tokens)")
+    ap.add_argument("--timeout", type=int, default=30, help="Timeout (s) do download de cada URL")
+    ap.add_argument("--no-stream", action="store_true", help="Carrega o texto inteiro em memória (caminho antigo)")
+    ap.add_argument("--incremental", action="store_true", help="Gera <lei>.delta.json contra o JSONL anterior de cada lei")
+    ap.add_argument("--summary-json", default="", help="Onde gravar o resumo em JSON (opcional)")
+    args = ap.parse_args()
+
+    entries = load_manifest(args.manifest)
+    t0 = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(entries)))) as pool:
+        futures = [
+            pool.submit(_ingest_entry, e, args.output_dir, args.max_chars, not args.no_stream, args.timeout, args.incremental,
+                        args.max_tokens, args.overlap_tokens)
+            for e in entries
+        ]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            if "error" in r:
+                print(f"ERRO {r['lei']}: {r['error']} ({r['seconds']}s)")
+            else:
+                delta = f" delta={r['delta']}" if "delta" in r else ""
+                print(f"OK   {r['lei']}: {r['chunks']} chunks em {r['output']} ({r['seconds']}s){delta}")
+    elapsed = time.perf_counter() - t0
+
+    ok = [r for r in results if "error" not in r]
+    erros = [r for r in results if "error" in r]
+    chunks = sum(r["chunks"] for r in ok)
+    mb = sum(r["bytes"] for r in ok) / 1e6
+    summary = {
+        "leis": len(results),
+        "ok": len(ok),
+        "erros": len(erros),
+        "chunks": chunks,
+        "segundos": round(elapsed, 3),
+        "chunks_por_s": round(chunks / elapsed, 1) if elapsed > 0 else None,
+        "mb_por_s": round(mb / elapsed, 2) if elapsed > 0 else None,
+        "resultados": sorted(results, key=lambda r: r["lei"]),
+    }
+    print(f"\nResumo: {len(ok)}/{len(results)} leis OK, {chunks} chunks em {elapsed:.2f}s "
+          f"({summary['chunks_por_s']} chunks/s, {summary['mb_por_s']} MB/s de JSONL)")
+    for r in erros:
+        print(f"  - {r['lei']} ({r['source']}): {r['error']}")
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if erros:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""Teste de carga offline da API (/chat e /documents/peticao-inicial-cobranca).
+
+Sobe os dublês locais de Qdrant, Ollama e serviço de histórico (scripts.loadtest_stubs, com
+latência e falhas injetáveis), inicia a API com uvicorn apontada para eles e dispara requisições
+com concorrência fixa por um tempo (ou número de requisições). Os modelos de embeddings e rerank
+são os reais (a CPU da inferência é o que se quer dimensionar). Relata throughput, latência
+p50/p90/p95/p99 e erros por cenário, além das chamadas recebidas por cada dublê.
+
+Uso:
+  python -m scripts.loadtest --concurrency 8 --duration 60 --workers 2
+  python -m scripts.loadtest --mix chat=4,peticao=1 --turns 3 --ollama-latency-ms 1500 --json carga.json
+  python -m scripts.loadtest --qdrant-fail-rate 0.05 --history-latency-ms 50 --max-error-rate 0.1
+  python -m scripts.loadtest --app-url http://localhost:8000   # API já rodando (apontada para os dublês)
+  python -m scripts.loadtest --workers 4 --sidecar             # modelos num único sidecar de inferência
+Com --min-rps/--max-error-rate o processo sai com código 1 se o limite não for atingido (uso em CI).
+"""
+from __future__ import annotations
+import argparse, asyncio, json, os, pathlib, random, statistics, subprocess, sys, time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import httpx
+
+from scripts.loadtest_stubs import Stubs, add_stub_args, stub_configs
+
+DEFAULT_QUESTIONS = "data/eval/retrieval_lei_11101_2005.v1.json"
+CENARIOS = ("chat", "peticao")
+
+PETICAO_DATA = {
+    "foro": "Foro Central da Comarca de São Paulo",
+    "autor": {"nome": "Empresa Credora Ltda.", "cnpj": "00.000.000/0001-00", "endereco": "Rua A, 100"},
+    "reu": {"nome": "Devedor S.A.", "cnpj": "11.111.111/0001-11", "endereco": "Av. B, 200"},
+    "valor_causa": 15000.0,
+}
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))] if xs else 0.0
+
+
+def _parse_mix(mix: str) -> Dict[str, float]:
+    pesos: Dict[str, float] = {}
+    for parte in mix.split(","):
+        if not parte.strip():
+            continue
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in CENARIOS:
+            raise SystemExit(f"Cenário desconhecido em --mix: {nome} (use {', '.join(CENARIOS)})")
+        pesos[nome] = float(peso or 1)
+    if not pesos or sum(pesos.values()) <= 0:
+        raise SystemExit("--mix sem cenários com peso positivo")
+    return pesos
+
+
+class Resultados:
+    def __init__(self):
+        self.lat: Dict[str, List[float]] = {c: [] for c in CENARIOS}
+        self.erros: Dict[str, Counter] = {c: Counter() for c in CENARIOS}
+
+    def add(self, cenario: str, ms: float, erro: Optional[str]) -> None:
+        if erro:
+            self.erros[cenario][erro] += 1
+        else:
+            self.lat[cenario].append(ms)
+
+    def resumo(self, duracao: float) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for c in CENARIOS:
+            ok, erros = self.lat[c], sum(self.erros[c].values())
+            total = len(ok) + erros
+            if not total:
+                continue
+            out[c] = {
+                "requisicoes": total,
+                "ok": len(ok),
+                "erros": dict(self.erros[c]),
+                "taxa_erro": round(erros / total, 4),
+                "rps": round(len(ok) / duracao, 2),
+                "latencia_ms": {
+                    "media": round(statistics.mean(ok), 1) if ok else 0.0,
+                    **{f"p{int(p * 100)}": round(_pct(ok, p), 1) for p in (0.50, 0.90, 0.95, 0.99)},
+                    "max": round(max(ok), 1) if ok else 0.0,
+                },
+            }
+        return out
+
+
+async def _chat(client: httpx.AsyncClient, pergunta: str, cid: Optional[str], use_llm: bool) -> Optional[str]:
+    r = await client.post("/chat", json={"message": pergunta, "conversation_id": cid, "use_llm": use_llm})
+    r.raise_for_status()
+    return r.json().get("conversation_id")
+
+
+async def _peticao(client: httpx.AsyncClient, pergunta: str, use_ai: bool) -> None:
+    body = {"data": PETICAO_DATA, "consulta_caso": pergunta, "use_ai": use_ai, "download": True, "persist": False}
+    r = await client.post("/documents/peticao-inicial-cobranca", json=body)
+    r.raise_for_status()
+
+
+async def _usuario(uid: int, client: httpx.AsyncClient, args, pesos: Dict[str, float], perguntas: List[str],
+                   res: Optional[Resultados], fim: float, restantes: List[int]) -> None:
+    """Um usuário virtual: sorteia o cenário, conduz conversas de `--turns` turnos no /chat."""
+    rnd = random.Random(args.seed + uid)
+    cid, turno = None, 0
+    nomes, ws = list(pesos), list(pesos.values())
+    while time.perf_counter() < fim:
+        if restantes[0] <= 0:
+            return
+        restantes[0] -= 1
+        cenario = rnd.choices(nomes, ws)[0]
+        pergunta = rnd.choice(perguntas)
+        t0 = time.perf_counter()
+        erro = None
+        try:
+            if cenario == "chat":
+                novo = await _chat(client, pergunta, cid, not args.no_llm)
+                turno += 1
+                cid, turno = (novo, turno) if turno < args.turns else (None, 0)
+            else:
+                await _peticao(client, pergunta, not args.no_llm)
+        except httpx.HTTPStatusError as e:
+            erro = f"HTTP {e.response.status_code}"
+            cid, turno = None, 0
+        except httpx.HTTPError as e:
+            erro = type(e).__name__
+            cid, turno = None, 0
+        if res is not None:
+            res.add(cenario, (time.perf_counter() - t0) * 1000, erro)
+
+
+async def _rodar(args, pesos, perguntas, url: str, n_usuarios: int, duracao: float, total: int,
+                 res: Optional[Resultados]) -> float:
+    limits = httpx.Limits(max_connections=n_usuarios, max_keepalive_connections=n_usuarios)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        restantes = [total if total > 0 else 1 << 62]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            _usuario(i, client, args, pesos, perguntas, res, t0 + duracao, restantes) for i in range(n_usuarios)
+        ))
+        return time.perf_counter() - t0
+
+
+def _subir_api(args, env_stubs: Dict[str, str]) -> subprocess.Popen:
+    env = dict(os.environ, **env_stubs)
+    env.setdefault("QUERY_LOG_ENABLED", "false")  # perguntas sintéticas não entram no ranking de consultas frequentes
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.app_port),
+           "--workers", str(args.workers), "--log-level", "warning"]
+    print(f"[API] {' '.join(cmd[2:])}")
+    return subprocess.Popen(cmd, env=env, cwd=str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+def _subir_sidecar(socket_path: str) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "scripts.inference_server", "--socket", socket_path, "--stats-every", "0"]
+    print(f"[SIDECAR] {' '.join(cmd[2:])}")
+    return subprocess.Popen(cmd, cwd=str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+def _rss_mb(pid: int) -> float:
+    """RSS (MB) do processo e de todos os descendentes, via /proc (Linux); 0 se indisponível."""
+    total_kb, pilha = 0, [pid]
+    while pilha:
+        p = pilha.pop()
+        try:
+            with open(f"/proc/{p}/status", encoding="utf-8") as f:
+                total_kb += next((int(ln.split()[1]) for ln in f if ln.startswith("VmRSS:")), 0)
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children", encoding="utf-8") as f:
+                    pilha.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def _esperar_api(url: str, proc: Optional[subprocess.Popen], timeout: float) -> float:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"API terminou durante a inicialização (código {proc.returncode})")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=2).status_code == 200:  # modelos já aquecidos
+                return time.perf_counter() - t0
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"API não respondeu em {timeout}s")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=8, help="Usuários virtuais simultâneos")
+    ap.add_argument("--duration", type=float, default=30, help="Duração da medição (s)")
+    ap.add_argument("--requests", type=int, default=0, help="Para após N requisições (0 = só --duration)")
+    ap.add_argument("--warmup", type=int, default=4, help="Requisições de aquecimento (fora da medição)")
+    ap.add_argument("--mix", default="chat=4,peticao=1", help="Peso de cada cenário (chat, peticao)")
+    ap.add_argument("--turns", type=int, default=3, help="Turnos por conversa no /chat")
+    ap.add_argument("--no-llm", action="store_true", help="Sem Ollama: /chat sem use_llm e petição sem use_ai")
+    ap.add_argument("--questions", default=DEFAULT_QUESTIONS, help="Perguntas usadas nas requisições")
+    ap.add_argument("--timeout", type=float, default=120, help="Timeout por requisição (s)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--app-url", default="", help="Usa uma API já em execução em vez de subir uma")
+    ap.add_argument("--app-port", type=int, default=18000)
+    ap.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    ap.add_argument("--sidecar", action="store_true",
+                    help="Sobe scripts.inference_server e aponta os workers para ele (INFERENCE_SOCKET)")
+    ap.add_argument("--startup-timeout", type=float, default=300)
+    ap.add_argument("--min-rps", type=float, default=0, help="Falha (código 1) se o throughput total ficar abaixo")
+    ap.add_argument("--max-error-rate", type=float, default=1.0, help="Falha (código 1) se a taxa de erro passar disso")
+    ap.add_argument("--json", default="", help="Onde gravar o relatório em JSON (opcional)")
+    add_stub_args(ap)
+    args = ap.parse_args()
+
+    pesos = _parse_mix(args.mix)
+    with open(args.questions, "r", encoding="utf-8") as f:
+        perguntas = [q["pergunta"] for q in json.load(f)["perguntas"]]
+
+    stubs = Stubs(stub_configs(args), jsonl=args.jsonl, port_base=args.port_base).start()
+    proc = sidecar = None
+    memoria: Dict[str, float] = {}
+    try:
+        url = args.app_url.rstrip("/")
+        if not url:
+            env_api = stubs.env()
+            if args.sidecar:
+                env_api["INFERENCE_SOCKET"] = f"/tmp/direito-inferencia-{os.getpid()}.sock"
+                sidecar = _subir_sidecar(env_api["INFERENCE_SOCKET"])
+            proc = _subir_api(args, env_api)
+            url = f"http://127.0.0.1:{args.app_port}"
+        pronto = _esperar_api(url, proc, args.startup_timeout)
+        print(f"[API] pronta (/readyz) em {pronto:.1f}s ({url})")
+
+        if args.warmup:
+            # carrega os modelos em cada worker antes de medir
+            asyncio.run(_rodar(args, pesos, perguntas, url, min(args.warmup, args.workers * 2), args.startup_timeout,
+                               args.warmup, None))
+        stubs_antes = stubs.stats()
+
+        res = Resultados()
+        duracao = asyncio.run(_rodar(args, pesos, perguntas, url, args.concurrency, args.duration, args.requests, res))
+        if proc is not None:
+            memoria["api"] = _rss_mb(proc.pid)
+        if sidecar is not None:
+            memoria["sidecar"] = _rss_mb(sidecar.pid)
+    finally:
+        for p in (proc, sidecar):
+            if p is not None:
+                p.terminate()
+                p.wait(timeout=30)
+        stubs.stop()
+
+    cenarios = res.resumo(duracao)
+    ok = sum(c["ok"] for c in cenarios.values())
+    total = sum(c["requisicoes"] for c in cenarios.values())
+    relatorio: Dict[str, Any] = {
+        "concurrency": args.concurrency,
+        "workers": None if args.app_url else args.workers,
+        "sidecar": args.sidecar,
+        "rss_mb": memoria,
+        "duracao_s": round(duracao, 2),
+        "requisicoes": total,
+        "rps": round(ok / duracao, 2),
+        "taxa_erro": round((total - ok) / total, 4) if total else 0.0,
+        "cenarios": cenarios,
+        "dubles": {
+            nome: {"config": vars(stubs.servers[nome].cfg),
+                   **{k: v - stubs_antes[nome][k] for k, v in s.items()}}
+            for nome, s in stubs.stats().items()
+        },
+    }
+
+    print(f"\n{total} requisições em {duracao:.1f}s, concorrência {args.concurrency}: "
+          f"{relatorio['rps']:.2f} req/s, erro {relatorio['taxa_erro']:.1%}")
+    print(f"{'cenário':10s} {'req':>6s} {'erro':>7s} {'req/s':>7s} {'p50':>8s} {'p90':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for nome, c in cenarios.items():
+        lat = c["latencia_ms"]
+        print(f"{nome:10s} {c['requisicoes']:>6d} {c['taxa_erro']:>7.1%} {c['rps']:>7.2f} "
+              f"{lat['p50']:>8.1f} {lat['p90']:>8.1f} {lat['p95']:>8.1f} {lat['p99']:>8.1f} {lat['max']:>8.1f}")
+        if c["erros"]:
+            print(f"{'':10s} erros: {c['erros']}")
+    if memoria:
+        print("RSS (MB, com subprocessos): " + "  ".join(f"{k}={v}" for k, v in memoria.items()))
+    for nome, d in relatorio["dubles"].items():
+        print(f"  dublê {nome:8s} {d['requests']:>6d} chamadas, {d['failures']} falhas injetadas")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    falhas = []
+    if relatorio["rps"] < args.min_rps:
+        falhas.append(f"throughput {relatorio['rps']} < {args.min_rps} req/s")
+    if relatorio["taxa_erro"] > args.max_error_rate:
+        falhas.append(f"taxa de erro {relatorio['taxa_erro']} > {args.max_error_rate}")
+    if falhas:
+        print(f"[ERRO CARGA] {'; '.join(falhas)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
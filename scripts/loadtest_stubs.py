@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""Dublês locais (HTTP) das dependências externas da API, para teste de carga offline.
+
+Sobe três servidores leves (stdlib, uma thread por conexão), cada um com latência e taxa de
+falha configuráveis:
+  - qdrant:  POST /collections/{nome}/points/search  -> hits sorteados de um JSONL processado
+  - ollama:  POST /api/generate                      -> texto fixo (ou JSON com fatos/pedidos/provas
+                                                       quando format=json)
+  - history: /api/conversations[/create|/{cid}|/{cid}/messages] -> histórico em memória
+Falhas injetadas respondem HTTP 503. Usado por scripts.loadtest; também pode rodar sozinho para
+apontar uma API já em execução (QDRANT_HOST/QDRANT_PORT, OLLAMA_HOST, HISTORY_API_URL).
+
+Uso:
+  python -m scripts.loadtest_stubs --jsonl data/processed/lei_11101_2005.jsonl --ollama-latency-ms 800
+  python -m scripts.loadtest_stubs --qdrant-fail-rate 0.05 --history-latency-ms 20 --port-base 17000
+"""
+from __future__ import annotations
+import argparse, json, math, random, re, threading, time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_JSONL = "data/processed/lei_11101_2005.jsonl"
+RE_SEARCH = re.compile(r"^/collections/([^/]+)/points/search$")
+RE_COLLECTION = re.compile(r"^/collections/([^/]+)$")
+RE_CONV = re.compile(r"^/api/conversations/([^/]+)(/messages)?$")
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0   # latência média por requisição
+    jitter_ms: float = 0.0    # variação uniforme (±) em torno da média
+    fail_rate: float = 0.0    # fração de requisições que respondem 503
+
+    def delay(self, rnd: random.Random) -> float:
+        return max(0.0, self.latency_ms + rnd.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+class _Stub(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, addr, handler, name: str, cfg: StubConfig, seed: int):
+        super().__init__(addr, handler)
+        self.name = name
+        self.cfg = cfg
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "failures": self.failures}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como os clients reais
+
+    def log_message(self, fmt, *args):  # silencioso sob carga
+        pass
+
+    def _body(self) -> Any:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        try:
+            return json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _send(self, status: int, obj: Any) -> None:
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method: str) -> None:
+        srv: _Stub = self.server  # type: ignore[assignment]
+        body = self._body() if method == "POST" else None
+        with srv.lock:
+            srv.requests += 1
+            delay = srv.cfg.delay(srv.rnd)
+            falha = srv.rnd.random() < srv.cfg.fail_rate
+            if falha:
+                srv.failures += 1
+        time.sleep(delay)
+        if falha:
+            self._send(503, {"status": {"error": f"falha injetada ({srv.name})"}})
+            return
+        status, obj = self.route(method, self.path.split("?")[0], body)
+        self._send(status, obj)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def route(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        return 404, {"detail": "not found"}
+
+
+class _QdrantHandler(_Handler):
+    def route(self, method, path, body):
+        if method == "POST" and RE_SEARCH.match(path):
+            srv: _Stub = self.server  # type: ignore[assignment]
+            limit = int((body or {}).get("limit") or 10)
+            with srv.lock:
+                idx = srv.rnd.sample(range(len(srv.payloads)), min(limit, len(srv.payloads)))
+            hits = [
+                {"id": i, "version": 0, "score": round(0.9 - 0.01 * pos, 4), "payload": srv.payloads[i]}
+                for pos, i in enumerate(idx)
+            ]
+            if (body or {}).get("with_vector"):  # vetor determinístico por ponto, na dimensão da consulta
+                dim = len(body.get("vector") or []) or 8
+                for h in hits:
+                    r = random.Random(h["id"])
+                    v = [r.gauss(0, 1) for _ in range(dim)]
+                    n = math.sqrt(sum(x * x for x in v)) or 1.0
+                    h["vector"] = [x / n for x in v]
+            return 200, {"result": hits, "status": "ok", "time": 0.0}
+        if method == "GET" and path == "/collections":
+            return 200, {"result": {"collections": []}, "status": "ok", "time": 0.0}
+        if method == "GET" and path == "/aliases":  # versão da collection (consultas frequentes)
+            return 200, {"result": {"aliases": []}, "status": "ok", "time": 0.0}
+        if method == "GET" and RE_COLLECTION.match(path):  # sondagem do /readyz
+            return 200, {"result": {"status": "green", "points_count": len(self.server.payloads)}, "status": "ok", "time": 0.0}
+        return 404, {"status": {"error": "not found"}}
+
+
+SECOES_FAKE = {
+    "fatos": "Fatos gerados pelo dublê do Ollama para teste de carga.",
+    "pedidos": ["Pedido gerado pelo dublê 1", "Pedido gerado pelo dublê 2"],
+    "provas": ["Prova documental (dublê)"],
+}
+
+
+class _OllamaHandler(_Handler):
+    def route(self, method, path, body):
+        if method == "POST" and path == "/api/generate":
+            if (body or {}).get("format") == "json":
+                resposta = json.dumps(SECOES_FAKE, ensure_ascii=False)
+            else:
+                resposta = "Resposta gerada pelo dublê do Ollama (Lei 11.101/2005, art. 1)."
+            return 200, {"model": (body or {}).get("model"), "response": resposta, "done": True}
+        if method == "GET" and path == "/api/tags":
+            return 200, {"models": []}
+        return 404, {"error": "not found"}
+
+
+class _HistoryHandler(_Handler):
+    def route(self, method, path, body):
+        srv: _Stub = self.server  # type: ignore[assignment]
+        conversas: Dict[str, List[Dict[str, str]]] = srv.conversas
+        if path == "/api/conversations/create" and method == "POST":
+            cid = (body or {}).get("cid") or f"c{srv.requests}"
+            with srv.lock:
+                conversas.setdefault(cid, [])
+            return 201, {"cid": cid, "user_id": 1}
+        if path == "/api/conversations" and method == "GET":
+            with srv.lock:
+                cids = list(conversas)
+            agora = time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            return 200, [{"id": i, "user_id": 1, "cid": c, "created_at": agora, "updated_at": agora}
+                         for i, c in enumerate(cids, start=1)]
+        m = RE_CONV.match(path)
+        if m:
+            cid = m.group(1)
+            if method == "POST" and m.group(2):
+                with srv.lock:
+                    conversas.setdefault(cid, []).append(
+                        {"role": body.get("role", "user"), "content": body.get("content", "")})
+                return 201, {"ok": True}
+            if method == "GET":
+                with srv.lock:
+                    msgs = list(conversas.get(cid, []))
+                return 200, msgs
+        return 404, {"error": "not found"}
+
+
+HANDLERS = {"qdrant": _QdrantHandler, "ollama": _OllamaHandler, "history": _HistoryHandler}
+
+
+def _load_payloads(jsonl: str) -> List[Dict[str, Any]]:
+    payloads = []
+    with open(jsonl, "r", encoding="utf-8") as f:
+        for ln in f:
+            if ln.strip():
+                rec = json.loads(ln)
+                payloads.append({k: rec.get(k) for k in ("id", "texto", "lei", "artigo", "url_oficial", "chunk_seq")})
+    if not payloads:
+        raise SystemExit(f"JSONL sem registros: {jsonl}")
+    return payloads
+
+
+class Stubs:
+    """Os três dublês rodando em threads; `env()` dá as variáveis para apontar a API para eles."""
+
+    def __init__(self, configs: Dict[str, StubConfig], jsonl: str = DEFAULT_JSONL, host: str = "127.0.0.1",
+                 port_base: int = 0, seed: int = 42):
+        self.host = host
+        self.servers: Dict[str, _Stub] = {}
+        for i, (nome, handler) in enumerate(HANDLERS.items()):
+            porta = port_base + i if port_base else 0
+            srv = _Stub((host, porta), handler, nome, configs.get(nome) or StubConfig(), seed + i)
+            if nome == "qdrant":
+                srv.payloads = _load_payloads(jsonl)
+            if nome == "history":
+                srv.conversas = {}
+            self.servers[nome] = srv
+        self._threads: List[threading.Thread] = []
+
+    def port(self, nome: str) -> int:
+        return self.servers[nome].server_address[1]
+
+    def env(self) -> Dict[str, str]:
+        return {
+            "QDRANT_HOST": self.host,
+            "QDRANT_PORT": str(self.port("qdrant")),
+            "OLLAMA_HOST": f"http://{self.host}:{self.port('ollama')}",
+            "HISTORY_API_URL": f"http://{self.host}:{self.port('history')}/api",
+        }
+
+    def start(self) -> "Stubs":
+        for srv in self.servers.values():
+            t = threading.Thread(target=srv.serve_forever, name=f"stub-{srv.name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        for srv in self.servers.values():
+            srv.shutdown()
+            srv.server_close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {nome: srv.stats() for nome, srv in self.servers.items()}
+
+
+def add_stub_args(ap: argparse.ArgumentParser) -> None:
+    """Opções de latência/falha de cada dublê (compartilhadas com scripts.loadtest)."""
+    ap.add_argument("--jsonl", default=DEFAULT_JSONL, help="Corpus de onde o dublê do Qdrant sorteia os hits")
+    ap.add_argument("--port-base", type=int, default=0, help="Portas fixas: qdrant=N, ollama=N+1, history=N+2 (0 = livres)")
+    for nome, lat in (("qdrant", 5.0), ("ollama", 500.0), ("history", 5.0)):
+        ap.add_argument(f"--{nome}-latency-ms", type=float, default=lat)
+        ap.add_argument(f"--{nome}-jitter-ms", type=float, default=lat / 5)
+        ap.add_argument(f"--{nome}-fail-rate", type=float, default=0.0)
+
+
+def stub_configs(args: argparse.Namespace) -> Dict[str, StubConfig]:
+    return {
+        nome: StubConfig(
+            latency_ms=getattr(args, f"{nome}_latency_ms"),
+            jitter_ms=getattr(args, f"{nome}_jitter_ms"),
+            fail_rate=getattr(args, f"{nome}_fail_rate"),
+        )
+        for nome in HANDLERS
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    add_stub_args(ap)
+    ap.add_argument("--host", default="127.0.0.1")
+    args = ap.parse_args()
+
+    stubs = Stubs(stub_configs(args), jsonl=args.jsonl, host=args.host, port_base=args.port_base).start()
+    print("[STUBS] no ar; aponte a API com:")
+    for k, v in stubs.env().items():
+        print(f"  {k}={v}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[STUBS] {json.dumps(stubs.stats())}")
+    except KeyboardInterrupt:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Mede o tempo de subida da API: do início do processo até /healthz (porta aberta) e até /readyz
+(modelos carregados e aquecidos), com o tempo de cada etapa do aquecimento e, opcionalmente, a
+latência da primeira requisição /chat depois de pronta.
+
+Por padrão sobe `uvicorn app.main:app` apontado para os dublês de scripts.loadtest_stubs (não
+precisa de Qdrant/Ollama/histórico). Com --cmd mede qualquer comando, ex. um container:
+  python -m scripts.measure_startup --runs 3 --first-chat
+  python -m scripts.measure_startup --cmd "docker run --rm -p 18000:8000 direito-ao-ponto" --url http://localhost:18000
+  python -m scripts.measure_startup --import-time        # módulos mais caros no `import app.main`
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, re, shlex, statistics, subprocess, sys, time
+from typing import Any, Dict, List, Optional
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import httpx
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+RE_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_time(top: int = 15) -> List[Dict[str, Any]]:
+    """`python -X importtime -c "import app.main"`: módulos de primeiro nível ordenados pelo tempo acumulado."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=str(ROOT),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import app.main falhou:\n{proc.stderr[-2000:]}")
+    mods = []
+    for ln in proc.stderr.splitlines():
+        m = RE_IMPORTTIME.match(ln)
+        if m and len(m.group(3)) <= 3:  # só imports diretos (nível 1 e 2 da árvore)
+            mods.append({"modulo": m.group(4), "acumulado_ms": int(m.group(2)) / 1000})
+    mods.sort(key=lambda d: -d["acumulado_ms"])
+    return mods[:top]
+
+
+def _esperar(url: str, proc: subprocess.Popen, timeout: float, t0: float) -> Optional[float]:
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            raise SystemExit(f"Processo terminou durante a subida (código {proc.returncode})")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return time.perf_counter() - t0
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def medir(cmd: List[str], url: str, env: Dict[str, str], timeout: float, first_chat: bool) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=str(ROOT), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        vivo = _esperar(f"{url}/healthz", proc, timeout, t0)
+        pronto = _esperar(f"{url}/readyz", proc, timeout, t0) if vivo is not None else None
+        r: Dict[str, Any] = {"healthz_s": vivo, "readyz_s": pronto}
+        if pronto is not None:
+            rep = httpx.get(f"{url}/readyz", timeout=5).json()
+            r["warmup"] = {k: v.get("seconds") for k, v in rep.get("warmup", {}).items()}
+            if first_chat:
+                t1 = time.perf_counter()
+                resp = httpx.post(f"{url}/chat", json={"message": "o que é recuperação judicial?"}, timeout=120)
+                r["first_chat_ms"] = round((time.perf_counter() - t1) * 1000, 1)
+                r["first_chat_status"] = resp.status_code
+        return r
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--port", type=int, default=18000)
+    ap.add_argument("--cmd", default="", help="Comando a medir (default: uvicorn app.main:app na --port)")
+    ap.add_argument("--url", default="", help="Base da API (default: http://127.0.0.1:<port>)")
+    ap.add_argument("--no-stubs", action="store_true", help="Não sobe os dublês (usa o ambiente atual)")
+    ap.add_argument("--first-chat", action="store_true", help="Mede também o primeiro /chat após pronto")
+    ap.add_argument("--timeout", type=float, default=600)
+    ap.add_argument("--import-time", action="store_true", help="Só mostra o custo de import de app.main")
+    ap.add_argument("--json", default="", help="Onde gravar o resultado em JSON (opcional)")
+    args = ap.parse_args()
+
+    if args.import_time:
+        for m in import_time():
+            print(f"{m['acumulado_ms']:>10.1f} ms  {m['modulo']}")
+        return
+
+    cmd = shlex.split(args.cmd) if args.cmd else [
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port)]
+    url = (args.url or f"http://127.0.0.1:{args.port}").rstrip("/")
+    env = dict(os.environ)
+    stubs = None
+    if not args.no_stubs:
+        from scripts.loadtest_stubs import StubConfig, Stubs
+        stubs = Stubs({nome: StubConfig() for nome in ("qdrant", "ollama", "history")}).start()
+        env.update(stubs.env())
+
+    runs = []
+    try:
+        for i in range(args.runs):
+            r = medir(cmd, url, env, args.timeout, args.first_chat)
+            runs.append(r)
+            print(f"[RUN {i + 1}] healthz={r['healthz_s'] or float('nan'):.2f}s readyz={r['readyz_s'] or float('nan'):.2f}s "
+                  f"warmup={r.get('warmup')}" + (f" primeiro /chat={r['first_chat_ms']}ms" if "first_chat_ms" in r else ""))
+    finally:
+        if stubs is not None:
+            stubs.stop()
+
+    def mediana(chave: str) -> Optional[float]:
+        xs = [r[chave] for r in runs if r.get(chave) is not None]
+        return round(statistics.median(xs), 3) if xs else None
+
+    resumo = {"cmd": cmd, "runs": runs, "mediana": {k: mediana(k) for k in ("healthz_s", "readyz_s", "first_chat_ms")}}
+    print(f"Mediana ({len(runs)} execuções): " + "  ".join(f"{k}={v}" for k, v in resumo["mediana"].items() if v is not None))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
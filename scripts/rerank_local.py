@@ -6,19 +6,37 @@ Entrada: query (str) + passagens (list[dict] com chave 'texto')
 Saída: mesmas passagens, ordenadas por 'rerank_score' desc.
 """
 from __future__ import annotations
-from typing import List, Dict
-from sentence_transformers import CrossEncoder
+import threading
+from typing import TYPE_CHECKING, List, Dict, Sequence
+
+from inference_client import INFERENCE_SOCKET
+from inference_executor import run_inference
+from observability import MODEL_LOADS, span
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
 
 # modelo recomendado (bom em PT-BR, rápido em CPU)
 MODEL_RERANK = "BAAI/bge-reranker-v2-m3"
 
-# carregamento lazy (evita custo se não for usar em todos os requests)
+# carregamento lazy (evita custo se não for usar em todos os requests); com INFERENCE_SOCKET o
+# cross-encoder fica no sidecar de inferência e aqui só há um proxy com o mesmo `predict`
 _ce_model: CrossEncoder | None = None
+_ce_lock = threading.Lock()
 
 def _get_model() -> CrossEncoder:
     global _ce_model
     if _ce_model is None:
-        _ce_model = CrossEncoder(MODEL_RERANK)
+        with _ce_lock:
+            if _ce_model is None:
+                if INFERENCE_SOCKET:
+                    from inference_client import RemoteCrossEncoder
+                    _ce_model = RemoteCrossEncoder(MODEL_RERANK)
+                    return _ce_model
+                from sentence_transformers import CrossEncoder
+                with span("model_load"):
+                    _ce_model = CrossEncoder(MODEL_RERANK)
+                MODEL_LOADS.inc(model=MODEL_RERANK)
     return _ce_model
 
 def rerank(query: str, passages: List[Dict], top_n: int | None = None) -> List[Dict]:
@@ -30,10 +48,32 @@ def rerank(query: str, passages: List[Dict], top_n: int | None = None) -> List[D
         return []
     model = _get_model()
     pairs = [(query, p.get("texto", "") or p.get("text", "")) for p in passages]
-    scores = model.predict(pairs).tolist()
+    scores = run_inference("rerank", model.predict, pairs).tolist()
     ranked = sorted(
         (dict(p, rerank_score=float(s)) for p, s in zip(passages, scores)),
         key=lambda d: d["rerank_score"],
         reverse=True
     )
     return ranked[:top_n] if top_n else ranked
+
+
+def rerank_many(queries: Sequence[str], passages_list: Sequence[List[Dict]], top_n: int | None = None,
+                batch_size: int = 64) -> List[List[Dict]]:
+    """Rerank de várias consultas numa única chamada ao cross-encoder (todos os pares juntos,
+    em lotes de `batch_size`). Retorna, para cada consulta, o mesmo que `rerank`."""
+    pairs = [(q, p.get("texto", "") or p.get("text", "")) for q, ps in zip(queries, passages_list) for p in ps]
+    if not pairs:
+        return [[] for _ in passages_list]
+    model = _get_model()
+    scores = run_inference("rerank", model.predict, pairs, batch_size=batch_size).tolist()
+    out: List[List[Dict]] = []
+    i = 0
+    for ps in passages_list:
+        ranked = sorted(
+            (dict(p, rerank_score=float(s)) for p, s in zip(ps, scores[i:i + len(ps)])),
+            key=lambda d: d["rerank_score"],
+            reverse=True
+        )
+        i += len(ps)
+        out.append(ranked[:top_n] if top_n else ranked)
+    return out
@@ -9,13 +9,21 @@ Escolher modelo de embeddings:
   EMBED_MODEL=intfloat/multilingual-e5-base python -m scripts.search_qdrant_local --query "..."
 Escolher modelo de rerank:
   python -m scripts.search_qdrant_local --query "..." --rerank --rerank-model BAAI/bge-reranker-v2-m3
+Lote de consultas (avaliação offline / aquecimento de cache), resultados em JSONL:
+  python -m scripts.search_qdrant_local --queries-file consultas.jsonl --k 12 --n 5 --rerank --out resultados.jsonl
+  O arquivo pode ser JSONL ({"id": ..., "query": ...}; aceita "pergunta") ou TSV (id<TAB>consulta,
+  ou só a consulta por linha). Encode em lotes, um search_batch no Qdrant e um rerank por lote;
+  --cache grava/usa os embeddings das consultas no cache em disco (EMBED_CACHE_DIR).
 """
 from __future__ import annotations
-import os, argparse
-from typing import List, Dict
+import os, argparse, json, sys, time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 from qdrant_client import QdrantClient
+from qdrant_client.http.models import SearchRequest
 from sentence_transformers import SentenceTransformer
-from scripts.rerank_local import rerank as rerank_passages
+from scripts.embed_cache import EMBED_CACHE_DIR, EmbeddingCache, encode_cached
+from scripts.rerank_local import rerank as rerank_passages, rerank_many
+from retrieval_local import search_params
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
 
@@ -29,9 +37,85 @@ def format_hit(idx: int, payload: Dict, score_vec: float, score_rerank: float |
   header = "  ".join(parts)
   return f"{header}\n    {texto}...\n"
 
+def to_passage(h) -> Dict[str, Any]:
+  p = h.payload or {}
+  return {
+    "texto": p.get("texto", ""),
+    "lei": p.get("lei"),
+    "artigo": p.get("artigo"),
+    "score_vec": h.score,
+    "chunk_seq": p.get("chunk_seq"),
+  }
+
+def read_queries(path: str) -> Iterator[Tuple[str, str]]:
+  """(id, consulta) de cada linha: JSON ({"id", "query"|"pergunta"}), TSV (id<TAB>consulta) ou texto puro."""
+  with open(path, "r", encoding="utf-8") as f:
+    for n, ln in enumerate(f, start=1):
+      ln = ln.rstrip("\n")
+      if not ln.strip():
+        continue
+      if ln.lstrip().startswith("{"):
+        obj = json.loads(ln)
+        q = obj.get("query") or obj.get("pergunta")
+        if not q:
+          raise SystemExit(f"{path}:{n}: linha sem 'query'")
+        yield str(obj.get("id", n)), q
+      elif "\t" in ln:
+        qid, q = ln.split("\t", 1)
+        yield qid.strip(), q.strip()
+      else:
+        yield str(n), ln.strip()
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+  lote: List = []
+  for it in items:
+    lote.append(it)
+    if len(lote) >= size:
+      yield lote
+      lote = []
+  if lote:
+    yield lote
+
+def search_many(args, model, client: QdrantClient, out) -> int:
+  """Modo lote: por lote de consultas, um encode, um search_batch e um rerank; grava JSONL em streaming."""
+  cache = EmbeddingCache(EMBED_MODEL, model.get_sentence_embedding_dimension()) if args.cache else None
+  params = search_params()
+  total = 0
+  t0 = time.perf_counter()
+  for lote in _batches(read_queries(args.queries_file), args.batch_size):
+    ids = [qid for qid, _ in lote]
+    textos = [q for _, q in lote]
+    vecs = encode_cached(model, textos, cache, batch_size=args.embed_batch_size)
+    respostas = client.search_batch(
+      collection_name=args.collection,
+      requests=[SearchRequest(vector=v.tolist(), limit=args.k, params=params, with_payload=True) for v in vecs],
+    )
+    passagens = [[to_passage(h) for h in hits] for hits in respostas]
+    if args.rerank:
+      passagens = rerank_many(textos, passagens, top_n=args.n, batch_size=args.rerank_batch_size)
+    for qid, q, ps in zip(ids, textos, passagens):
+      results = []
+      for p in ps:
+        r = {"lei": p["lei"], "artigo": p["artigo"], "chunk_seq": p["chunk_seq"], "score_vec": p["score_vec"]}
+        if "rerank_score" in p:
+          r["rerank_score"] = p["rerank_score"]
+        if args.with_text:
+          r["texto"] = p["texto"]
+        results.append(r)
+      out.write(json.dumps({"id": qid, "query": q, "results": results}, ensure_ascii=False) + "\n")
+    out.flush()
+    total += len(lote)
+    dt = time.perf_counter() - t0
+    print(f"[LOTE] {total} consultas em {dt:.1f}s ({total / dt:.1f} consultas/s)", file=sys.stderr)
+  if cache is not None:
+    print(f"[CACHE] {cache.stats()}", file=sys.stderr)
+  return total
+
 def main():
   ap = argparse.ArgumentParser()
-  ap.add_argument("--query", required=True, help="Texto da consulta")
+  grp = ap.add_mutually_exclusive_group(required=True)
+  grp.add_argument("--query", help="Texto da consulta")
+  grp.add_argument("--queries-file", help="Lote de consultas (JSONL ou TSV); resultados em JSONL")
   ap.add_argument("--k", type=int, default=8, help="Quantidade inicial de vetores (recall)")
   ap.add_argument("--n", type=int, default=5, help="Top-N final (se usar --rerank)")
   ap.add_argument("--rerank", action="store_true", help="Ativa reranqueamento local (cross-encoder)")
@@ -40,16 +124,32 @@ def main():
   ap.add_argument("--host", default=os.getenv("QDRANT_HOST","localhost"))
   ap.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT","6333")))
   ap.add_argument("--show-all", action="store_true", help="Mostra todos os K resultados mesmo com rerank")
+  ap.add_argument("--out", default="-", help="Lote: arquivo JSONL de saída (- = stdout)")
+  ap.add_argument("--batch-size", type=int, default=64, help="Lote: consultas por search_batch")
+  ap.add_argument("--embed-batch-size", type=int, default=32, help="Lote: batch do encoder")
+  ap.add_argument("--rerank-batch-size", type=int, default=64, help="Lote: pares por batch do cross-encoder")
+  ap.add_argument("--with-text", action="store_true", help="Lote: inclui o texto de cada resultado")
+  ap.add_argument("--cache", action="store_true", help=f"Lote: usa o cache de embeddings em disco ({EMBED_CACHE_DIR})")
   args = ap.parse_args()
 
   if args.n > args.k and args.rerank:
     raise SystemExit("--n não pode ser maior que --k (use K maior para recall)")
 
   model = SentenceTransformer(EMBED_MODEL)
+
+  if args.queries_file:
+    client = QdrantClient(host=args.host, port=args.port)
+    if args.out == "-":
+      search_many(args, model, client, sys.stdout)
+    else:
+      with open(args.out, "w", encoding="utf-8") as out:
+        search_many(args, model, client, out)
+    return
+
   qvec = model.encode([args.query], normalize_embeddings=True)[0].tolist()
 
   client = QdrantClient(host=args.host, port=args.port)
-  hits = client.search(collection_name=args.collection, query_vector=qvec, limit=args.k)
+  hits = client.search(collection_name=args.collection, query_vector=qvec, limit=args.k, search_params=search_params())
 
   if not hits:
     print("Nenhum resultado.")
@@ -62,16 +162,7 @@ def main():
     return
 
   # Preparar passagens para rerank
-  passages = [
-    {
-      "texto": (h.payload or {}).get("texto", ""),
-      "lei": (h.payload or {}).get("lei"),
-      "artigo": (h.payload or {}).get("artigo"),
-      "score_vec": h.score,
-      "chunk_seq": (h.payload or {}).get("chunk_seq"),
-    }
-    for h in hits
-  ]
+  passages = [to_passage(h) for h in hits]
 
   ranked = rerank_passages(args.query, passages, top_n=args.n)
 
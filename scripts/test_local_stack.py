@@ -14,6 +14,9 @@ import argparse, os, shutil, subprocess, sys, pathlib
 import json
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from scripts.ingest_common import EMBED_MAX_TOKENS
 
 
 def run(cmd: list[str]):
@@ -33,7 +36,8 @@ def main():
     ap.add_argument("--collection", default="leis_test")
     ap.add_argument("--query", default="recuperação judicial")
     ap.add_argument("--workdir", default=".tmp_test_local")
-    ap.add_argument("--max-chars", type=int, default=2000)
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="Chunk por tokens (0 = por caracteres)")
+    ap.add_argument("--max-chars", type=int, default=2000, help="Tamanho do chunk com --max-tokens 0")
     ap.add_argument("--k", type=int, default=6)
     ap.add_argument("--n", type=int, default=3)
     ap.add_argument("--rerank", action="store_true")
@@ -52,6 +56,7 @@ def main():
         "--lei", args.lei,
         "--input", args.input,
         "--output", str(jsonl),
+        "--max-tokens", str(args.max_tokens),
         "--max-chars", str(args.max_chars),
     ])
     print(out_ingest)
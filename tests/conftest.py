@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# mesmo esquema dos scripts: módulos da raiz (retrieval_local, observability, ...) importáveis
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.conversation.manager import ChatMessage
+
+
+class _Historico:
+    """Serviço de histórico em memória: só o que /chat e GET /conversation/{cid} usam."""
+
+    def __init__(self):
+        self.conversas = {}
+
+    def create(self):
+        cid = f"c{len(self.conversas) + 1}"
+        self.conversas[cid] = []
+        return cid
+
+    def append(self, cid, msg):
+        self.conversas.setdefault(cid, []).append(ChatMessage(role=msg.role, content=msg.content))
+
+    def truncate(self, cid, max_msgs):
+        pass
+
+    def get_messages(self, cid):
+        return list(self.conversas.get(cid, []))
+
+    def get(self, cid):  # outra visão da conversa (ordem diferente): não pode ser usada nos cursores
+        return list(reversed(self.conversas.get(cid, [])))
+
+
+def test_cursor_do_delta_pagina_a_mesma_lista(monkeypatch):
+    monkeypatch.setattr(main, "conversation_manager", _Historico())
+    monkeypatch.setattr(main.query_log, "enabled", False)
+    monkeypatch.setattr(main.hot_queries, "get", lambda q, k: [])  # sem recuperação
+    client = TestClient(main.app)
+
+    cid = client.post("/chat", json={"message": "primeira", "max_history": 1}).json()["conversation_id"]
+    client.post("/chat", json={"conversation_id": cid, "message": "segunda", "max_history": 1})
+    r = client.post("/chat", json={"conversation_id": cid, "message": "terceira", "max_history": 1,
+                                   "messages_mode": "delta"}).json()
+    assert [m["content"] for m in r["messages"]][0] == "terceira"
+
+    anteriores = client.get(f"/conversation/{cid}", params={"limit": 10, "cursor": r["next_cursor"]}).json()
+    assert [m["content"] for m in anteriores][::2] == ["primeira", "segunda"]
+    assert len(anteriores) == 4
+
+
+def test_chat_messages_mode_invalido_falha_na_subida():
+    env = dict(os.environ, CHAT_MESSAGES_MODE="parcial")
+    proc = subprocess.run([sys.executable, "-c", "import app.conversation.manager"], env=env,
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert proc.returncode != 0 and "CHAT_MESSAGES_MODE inválido" in proc.stderr
@@ -0,0 +1,24 @@
+import pytest
+
+from app.conversation.manager import InvalidCursorError, paginate
+
+
+def test_paginate_do_fim_para_o_comeco():
+    itens = list(range(7))
+    pagina, cursor = paginate(itens, 3)
+    assert pagina == [4, 5, 6] and cursor == "4"
+    pagina, cursor = paginate(itens, 3, cursor)
+    assert pagina == [1, 2, 3] and cursor == "1"
+    pagina, cursor = paginate(itens, 3, cursor)
+    assert pagina == [0] and cursor is None
+
+
+def test_paginate_sem_limite_devolve_tudo():
+    assert paginate([1, 2], None) == ([1, 2], None)
+    assert paginate([], 5) == ([], None)
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-1", "8"])
+def test_paginate_cursor_invalido(cursor):
+    with pytest.raises(InvalidCursorError):
+        paginate(list(range(7)), 3, cursor)
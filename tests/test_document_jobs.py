@@ -0,0 +1,68 @@
+import io
+import os
+import time
+import zipfile
+
+from app.documents.jobs import DocumentJobQueue, job_key
+
+
+def _item(reu):
+    return {
+        "data": {"foro": "São Paulo/SP", "autor": {"nome": "Credora Ltda"}, "reu": {"nome": reu},
+                 "valor_causa": 1000.0, "fatos": "Fatos.", "pedidos": ["Pagamento"], "provas": ["Nota fiscal"]},
+        "consulta_caso": "cobrança de nota fiscal",
+    }
+
+
+def _espera(fila, job_id, timeout=60.0):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        st = fila.get(job_id)
+        if st.status in ("done", "failed"):
+            return st
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} não terminou")
+
+
+def test_job_key_canonico():
+    assert job_key({"a": 1, "b": [1, 2]}) == job_key({"b": [1, 2], "a": 1})
+    assert job_key({"a": 1}) != job_key({"a": 2})
+
+
+def test_lote_roda_como_job_e_deduplica():
+    fila = DocumentJobQueue(workers=1, max_pending=5)
+    payload = {"kind": "lote", "items": [_item("Devedora A"), _item("Devedora B")], "use_ai": False}
+    st, dedup = fila.submit(payload)
+    assert not dedup and st.kind == "lote"
+
+    final = _espera(fila, st.job_id)
+    assert final.status == "done", final.error
+    assert final.stats["records"] == 2 and final.stats["groups"] == 1
+    assert "render" in final.stages
+    de_novo, dedup = fila.submit(dict(payload))
+    assert dedup and de_novo.job_id == st.job_id
+
+    assert final.content_available
+    with zipfile.ZipFile(io.BytesIO(fila.take_content(st.job_id))) as zf:
+        assert len(zf.namelist()) == 2
+
+
+def test_resultado_fica_em_disco_e_sai_no_download_ou_na_retencao():
+    fila = DocumentJobQueue(workers=1, max_pending=5, keep=1)
+    a, _ = fila.submit({"kind": "lote", "items": [_item("Devedora A")], "use_ai": False})
+    assert _espera(fila, a.job_id).status == "done"
+    caminho = fila._jobs[a.job_id].content_path
+    assert os.path.exists(caminho)
+
+    assert fila.take_content(a.job_id)[:2] == b"PK"
+    assert not os.path.exists(caminho) and fila.take_content(a.job_id) is None
+    assert not fila.get(a.job_id).content_available
+    de_novo, dedup = fila.submit({"kind": "lote", "items": [_item("Devedora A")], "use_ai": False})
+    assert not dedup  # resultado já baixado: roda de novo
+
+    assert _espera(fila, de_novo.job_id).status == "done"
+    caminho = fila._jobs[de_novo.job_id].content_path
+    c, _ = fila.submit({"kind": "lote", "items": [_item("Devedora C")], "use_ai": False})
+    _espera(fila, c.job_id)
+    fila.submit({"kind": "lote", "items": [_item("Devedora D")], "use_ai": False})  # retenção roda no submit
+    assert fila.get(de_novo.job_id) is None and not os.path.exists(caminho)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from scripts.embed_cache import EmbeddingCache, cached_dim, encode_cached
+
+
+class _Contador:
+    def __init__(self):
+        self.textos = []
+
+    def encode(self, texts, normalize_embeddings=True, batch_size=32):
+        self.textos.extend(texts)
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_encode_cached_so_manda_ausentes_ao_modelo(tmp_path):
+    assert cached_dim("m", root=str(tmp_path)) is None
+    cache = EmbeddingCache("m", 2, root=str(tmp_path))
+    modelo = _Contador()
+    encode_cached(modelo, ["aa", "b"], cache)
+    vecs = encode_cached(modelo, ["b", "ccc", "aa"], cache)
+    assert modelo.textos == ["aa", "b", "ccc"]
+    assert vecs.tolist() == [[1.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+
+
+def test_cache_persiste_e_expoe_dimensao(tmp_path):
+    cache = EmbeddingCache("org/modelo", 2, root=str(tmp_path))
+    cache.put_many(["x"], np.array([[0.5, 0.5]], dtype=np.float32))
+    assert cached_dim("org/modelo", root=str(tmp_path)) == 2
+    reaberto = EmbeddingCache("org/modelo", 2, root=str(tmp_path))
+    assert reaberto.get_many(["x", "y"])[0].tolist() == [0.5, 0.5]
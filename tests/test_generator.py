@@ -0,0 +1,18 @@
+from app.documents import generator
+
+
+def test_complete_peticao_ai_registra_total(monkeypatch):
+    def falso(consulta_caso, secoes, timings=None, **kw):
+        timings["retrieval_s"] = 0.0
+        return {nome: f"{nome} gerado" for nome in secoes}
+
+    monkeypatch.setattr(generator, "generate_case_sections", falso)
+    timings = {}
+    data = generator.complete_peticao_ai({"fatos": "já preenchido"}, "consulta", timings=timings)
+    assert data["fatos"] == "já preenchido" and data["pedidos"] == "pedidos gerado"
+    assert "total_s" in timings and timings["total_s"] >= 0
+
+
+def test_secoes_faltantes():
+    assert generator.secoes_faltantes({"fatos": "x", "pedidos": []}) == ["pedidos", "provas"]
+    assert generator.secoes_faltantes({"fatos": "x"}, force=True) == list(generator.SECOES_IA)
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+from app.hot_queries import HotQueryCache, collection_version, normalize_query
+from scripts.collection_versions import bump_revision
+from scripts.hot_queries import rank, read_log
+
+
+class _FakeQdrant:
+    """Só o que collection_version/bump_revision usam: get_aliases e update_collection_aliases.
+    Leitura de pontos falha, para garantir que a versão não depende deles."""
+
+    def __init__(self, aliases=None):
+        self.aliases = dict(aliases or {})  # alias -> collection
+        self.chamadas = 0
+
+    def get_aliases(self):
+        self.chamadas += 1
+        return SimpleNamespace(aliases=[SimpleNamespace(alias_name=a, collection_name=c) for a, c in self.aliases.items()])
+
+    def update_collection_aliases(self, change_aliases_operations):
+        for op in change_aliases_operations:
+            if getattr(op, "delete_alias", None):
+                del self.aliases[op.delete_alias.alias_name]
+            else:
+                self.aliases[op.create_alias.alias_name] = op.create_alias.collection_name
+
+    def scroll(self, *a, **kw):
+        raise AssertionError("a versão não pode ler pontos")
+
+
+def test_normalize_query():
+    assert normalize_query("  O que é  Recuperação   Judicial?? ") == "o que é recuperação judicial"
+    assert normalize_query("ﬁm.") == "fim"  # NFKC
+    assert normalize_query(None) == ""
+
+
+def test_versao_muda_quando_indexador_grava_revisao():
+    client = _FakeQdrant()
+    assert collection_version(lambda: client, "leis") == "leis:-"
+    bump_revision(client, "leis")  # ex.: --sync que alterou texto no lugar (mesmos ids e contagem)
+    antes = collection_version(lambda: client, "leis")
+    assert antes != "leis:-" and antes == collection_version(lambda: client, "leis")
+    bump_revision(client, "leis")
+    assert collection_version(lambda: client, "leis") != antes
+    assert sum(a.startswith("leis__rev") for a in client.aliases) == 1  # a marca antiga sai na mesma operação
+
+
+def test_versao_segue_alias_e_revisao_do_alvo():
+    client = _FakeQdrant({"leis": "leis_v1"})
+    bump_revision(client, "leis_v1")
+    v1 = collection_version(lambda: client, "leis")
+    assert v1.startswith("leis_v1:") and not v1.endswith(":-")
+    client.aliases["leis"] = "leis_v2"  # blue/green
+    assert collection_version(lambda: client, "leis") == "leis_v2:-"
+    client.chamadas = 0
+    collection_version(lambda: client, "leis")
+    assert client.chamadas == 1
+
+
+def test_check_invalida_e_recalcula_quando_versao_muda(tmp_path):
+    arq = tmp_path / "hot.json"
+    arq.write_text('{"queries": [{"query": "o que é falência", "count": 3}]}', encoding="utf-8")
+    versao = {"v": "leis:a"}
+    chamadas = []
+
+    def compute(consultas, k):
+        chamadas.append(versao["v"])
+        return [[{"texto": versao["v"]}] for _ in consultas]
+
+    cache = HotQueryCache(compute, lambda: versao["v"], path=str(arq), k=12)
+    cache.refresh()
+    assert cache.get("O que é falência?", 12) == [{"texto": "leis:a"}]
+
+    assert cache.check() is False  # mesma versão: nada a fazer
+    versao["v"] = "leis:b"
+    assert cache.check() is True
+    assert cache.version == "leis:b"
+    assert cache.get("o que é falência", 12) == [{"texto": "leis:b"}]
+    assert chamadas == ["leis:a", "leis:b"]
+
+
+def test_recalculo_usa_texto_original_e_chave_normalizada(tmp_path):
+    arq = tmp_path / "hot.json"
+    arq.write_text('{"queries": [{"query": "O que é Falência?", "key": "o que é falência", "count": 3},'
+                   ' {"query": "o que é falência", "count": 1}]}', encoding="utf-8")
+    vistos = []
+
+    def compute(consultas, k):
+        vistos.extend(consultas)
+        return [[{"texto": q}] for q in consultas]
+
+    cache = HotQueryCache(compute, lambda: "v", path=str(arq), k=12)
+    assert cache.refresh() == 1
+    assert vistos == ["O que é Falência?"]  # o pipeline vê o texto original, como no /chat
+    assert cache.get("o que é falência.", 12) == [{"texto": "O que é Falência?"}]
+
+
+def test_ranking_guarda_variante_mais_frequente(tmp_path):
+    log = tmp_path / "q.log"
+    log.write_text("1\tO que é falência?\n2\to que é  falência\n3\tO que é falência?\n4\tprazo da habilitação\n",
+                   encoding="utf-8")
+    cont, textos = read_log([str(log)])
+    assert rank(cont, textos, top=10, min_count=2) == [
+        {"query": "O que é falência?", "key": "o que é falência", "count": 3}]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")  # importado no topo do indexador
+
+from scripts.index_qdrant_local import SyncFilter, point_id  # noqa: E402
+
+
+def test_point_id_deterministico():
+    a = point_id("lei_11_101_2005-art-6-ch-1")
+    assert a == point_id("lei_11_101_2005-art-6-ch-1")
+    assert a != point_id("lei_11_101_2005-art-6-v2-ch-1")
+
+
+def test_sync_filter_novos_alterados_e_removidos():
+    existentes = {
+        point_id("a-ch-1"): ("h1", "m", "L1"),
+        point_id("b-ch-1"): ("h2", "m", "L1"),
+        point_id("c-ch-1"): ("h3", "m", "L1"),   # sumiu do JSONL
+        point_id("x-ch-1"): ("h9", "m", "L2"),   # outra lei: não é tocada
+    }
+    sync = SyncFilter(existentes, "m")
+    recs = [
+        {"id": "a-ch-1", "lei": "L1", "content_hash": "h1"},        # inalterado
+        {"id": "b-ch-1", "lei": "L1", "content_hash": "h2-novo"},   # texto alterado
+        {"id": "d-ch-1", "lei": "L1", "content_hash": "h4"},        # novo
+    ]
+    assert [r["id"] for r in sync.filter(recs)] == ["b-ch-1", "d-ch-1"]
+    assert sync.unchanged == 1
+    assert sync.stale() == [point_id("c-ch-1")]
+
+
+def test_sync_filter_troca_de_modelo_reindexa():
+    sync = SyncFilter({point_id("a-ch-1"): ("h1", "modelo-antigo", "L1")}, "modelo-novo")
+    assert len(list(sync.filter([{"id": "a-ch-1", "lei": "L1", "content_hash": "h1"}]))) == 1
+
+
+def test_lazy_encoder_nao_carrega_modelo_com_tudo_no_cache(tmp_path, monkeypatch):
+    from scripts import index_qdrant_local
+    from scripts.embed_cache import EmbeddingCache, cached_dim, encode_cached
+
+    cache = EmbeddingCache("m", 2, root=str(tmp_path))
+    cache.put_many(["a", "b"], np.eye(2, dtype=np.float32))
+    assert cached_dim("m", root=str(tmp_path)) == 2
+
+    def nao_carrega(*a, **kw):
+        raise AssertionError("modelo carregado com tudo no cache")
+
+    monkeypatch.setattr(index_qdrant_local, "SentenceTransformer", nao_carrega)
+    enc = index_qdrant_local.LazyEncoder("m", procs=4)
+    assert encode_cached(enc, ["b", "a"], cache).tolist() == [[0.0, 1.0], [1.0, 0.0]]
+    assert enc.model is None
+    enc.close()
@@ -0,0 +1,63 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+from inference_client import InferenceClient, recv_msg, send_msg
+
+
+class _Sidecar:
+    """Sidecar mínimo: responde ping após `atraso` s e conta as requisições recebidas."""
+
+    def __init__(self, atraso=0.0):
+        self.path = os.path.join(tempfile.mkdtemp(), "inf.sock")
+        self.atraso = atraso
+        self.recebidas = 0
+        self.srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.srv.bind(self.path)
+        self.srv.listen()
+        threading.Thread(target=self._aceita, daemon=True).start()
+
+    def _aceita(self):
+        while True:
+            try:
+                conn, _ = self.srv.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._atende, args=(conn,), daemon=True).start()
+
+    def _atende(self, conn):
+        with conn:
+            while True:
+                try:
+                    recv_msg(conn)
+                except (ConnectionError, OSError):
+                    return
+                self.recebidas += 1
+                time.sleep(self.atraso)
+                try:
+                    send_msg(conn, {"ok": True, "embed_model": "m"})
+                except OSError:
+                    return
+
+
+def test_timeout_nao_reenvia():
+    sidecar = _Sidecar(atraso=0.5)
+    client = InferenceClient(path=sidecar.path, timeout=0.1, connect_timeout=1)
+    with pytest.raises(TimeoutError):
+        client.info()
+    time.sleep(0.6)
+    assert sidecar.recebidas == 1
+
+
+def test_conexao_antiga_caida_reconecta_e_reenvia():
+    sidecar = _Sidecar()
+    client = InferenceClient(path=sidecar.path, timeout=1, connect_timeout=1)
+    velha, outra_ponta = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    outra_ponta.close()  # como um sidecar que reiniciou depois da última chamada
+    client._local.sock = velha
+    assert client.info()["embed_model"] == "m"
+    assert sidecar.recebidas == 1
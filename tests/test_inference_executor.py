@@ -0,0 +1,20 @@
+import pytest
+
+import inference_executor
+from inference_executor import InferenceExecutor
+
+
+def test_run_executa_no_slot(monkeypatch):
+    monkeypatch.setattr(inference_executor, "INFERENCE_SOCKET", "")
+    ex = InferenceExecutor(slots=2, threads=1)
+    assert ex.run("embed", lambda x: x * 2, 21) == 42
+    assert ex._depth() == {("waiting",): 0, ("running",): 0}
+
+
+def test_submit_falhou_nao_deixa_espera_pendurada(monkeypatch):
+    monkeypatch.setattr(inference_executor, "INFERENCE_SOCKET", "")
+    ex = InferenceExecutor(slots=1, threads=1)
+    ex._get_pool().shutdown()  # como no encerramento do lifespan
+    with pytest.raises(RuntimeError):
+        ex.run("embed", lambda: None)
+    assert ex._depth()[("waiting",)] == 0
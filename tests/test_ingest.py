@@ -0,0 +1,33 @@
+import re
+
+from scripts.ingest_common import chunk_tokens
+
+
+class _PorPalavra:
+    """TokenCounter determinístico: um token por palavra, sem especiais."""
+
+    especiais = 0
+
+    def offsets(self, text):
+        return [m.span() for m in re.finditer(r"\S+", text)]
+
+
+def test_chunk_tokens_texto_curto_vira_um_trecho():
+    assert chunk_tokens("Art. 1º Esta Lei disciplina.", max_tokens=10, overlap=2, counter=_PorPalavra()) == [
+        ("Art. 1º Esta Lei disciplina.", 5)]
+    assert chunk_tokens("   ", max_tokens=10, counter=_PorPalavra()) == []
+
+
+def test_chunk_tokens_respeita_limite_e_sobreposicao():
+    texto = " ".join(f"p{i}" for i in range(25))
+    chunks = chunk_tokens(texto, max_tokens=10, overlap=3, counter=_PorPalavra())
+    assert all(n <= 10 for _, n in chunks)
+    assert chunks[0][0].split()[-3:] == chunks[1][0].split()[:3]
+    assert chunks[-1][0].endswith("p24")
+
+
+def test_chunk_tokens_prefere_corte_em_frase():
+    texto = "um dois tres quatro cinco seis. sete oito nove dez onze doze"
+    (primeiro, _), *_ = chunk_tokens(texto, max_tokens=8, overlap=0, counter=_PorPalavra())
+    assert primeiro == "um dois tres quatro cinco seis."
+
@@ -0,0 +1,96 @@
+import numpy as np
+
+from retrieval_local import _merge_texts, chunk_parent, merge_adjacent_chunks, mmr
+from scripts.ingest import build_id
+
+
+def _cand(record_id, seq, texto, score, vec=(1.0, 0.0), **extra):
+    item = {"id": record_id, "lei": "11.101/2005", "artigo": "6", "chunk_seq": seq, "texto": texto,
+            "score_vec": score, **extra}
+    v = np.asarray(vec, dtype=np.float32)
+    return item, score, v / np.linalg.norm(v)
+
+
+def test_chunk_parent():
+    assert chunk_parent("lei_11_101_2005-art-6-v2-ch-12") == "lei_11_101_2005-art-6-v2"
+    assert chunk_parent("lei_11_101_2005-art-6-par-1-inc-ii-ch-1") == "lei_11_101_2005-art-6-par-1-inc-ii"
+    assert chunk_parent(None) is None
+    assert chunk_parent("sem-sufixo") is None
+
+
+def test_merge_junta_sequencia_e_remove_sobreposicao():
+    a = "Art. 6º A decretação da falência suspende o curso da prescrição"
+    b = "suspende o curso da prescrição e de todas as ações e execuções."
+    out = merge_adjacent_chunks([
+        _cand("lei_11_101_2005-art-6-ch-2", 2, b, 0.7),
+        _cand("lei_11_101_2005-art-6-ch-1", 1, a, 0.9),
+    ])
+    assert len(out) == 1
+    item, score, vec = out[0]
+    assert item["texto"] == "Art. 6º A decretação da falência suspende o curso da prescrição e de todas as ações e execuções."
+    assert item["chunk_seqs"] == [1, 2]
+    assert score == 0.9 and item["score_vec"] == 0.9
+    assert abs(np.linalg.norm(vec) - 1) < 1e-5
+
+
+def test_merge_nao_mistura_versoes_do_artigo():
+    # mesmo (lei, artigo) e chunk_seq consecutivos, mas ocorrências diferentes do art. 6
+    out = merge_adjacent_chunks([
+        _cand("lei_11_101_2005-art-6-ch-1", 1, "redação atual", 0.9),
+        _cand("lei_11_101_2005-art-6-v2-ch-2", 2, "redação anterior", 0.8),
+    ])
+    assert [c[0]["texto"] for c in out] == ["redação atual", "redação anterior"]
+    assert all("chunk_seqs" not in c[0] for c in out)
+
+
+def test_merge_nao_mistura_unidades():
+    out = merge_adjacent_chunks([
+        _cand("lei_11_101_2005-art-6-par-1-ch-1", 1, "§ 1º ...", 0.9),
+        _cand("lei_11_101_2005-art-6-par-2-ch-2", 2, "§ 2º ...", 0.8),
+        _cand("lei_11_101_2005-art-6-par-2-ch-1", 1, "§ 2º início", 0.7),
+    ])
+    assert len(out) == 2
+    textos = {c[0]["id"]: c[0]["texto"] for c in out}
+    assert textos["lei_11_101_2005-art-6-par-1-ch-1"] == "§ 1º ..."
+    assert "chunk_seqs" in next(c[0] for c in out if c[0]["id"].startswith("lei_11_101_2005-art-6-par-2"))
+
+
+def test_merge_sem_id_nao_junta():
+    out = merge_adjacent_chunks([_cand(None, 1, "a", 0.9), _cand(None, 2, "b", 0.8)])
+    assert len(out) == 2
+
+
+def test_merge_nao_repete_contexto():
+    ctx = "Art. 6º A decretação da falência ..."
+    um = "§ 1º Terá prosseguimento no juízo no qual estiver se processando"
+    dois = "no qual estiver se processando a ação que demandar quantia ilíquida."
+    out = merge_adjacent_chunks([
+        _cand("x-art-6-par-1-ch-1", 1, f"{ctx}\n{um}", 0.9, contexto=ctx),
+        _cand("x-art-6-par-1-ch-2", 2, f"{ctx}\n{dois}", 0.8, contexto=ctx),
+    ])
+    assert len(out) == 1
+    texto = out[0][0]["texto"]
+    assert texto.count(ctx) == 1
+    assert texto == f"{ctx}\n§ 1º Terá prosseguimento no juízo no qual estiver se processando a ação que demandar quantia ilíquida."
+
+
+def test_merge_texts_sem_sobreposicao():
+    assert _merge_texts("primeiro trecho qualquer", "segundo trecho") == "primeiro trecho qualquer\nsegundo trecho"
+
+
+def test_mmr_prefere_diversidade():
+    q = np.array([1.0, 0.2, 0.0], dtype=np.float32)
+    vs = [np.array(v, dtype=np.float32) / np.linalg.norm(v) for v in ([1, 0.1, 0], [1, 0.12, 0], [0.6, 0.8, 0])]
+    assert mmr(q, vs, 2, lambda_mult=0.5) == [1, 2]
+    assert mmr(q, vs, 2, lambda_mult=1.0)[:1] == [1]
+    assert mmr(q, [], 3) == []
+
+
+def test_build_id_e_chunk_parent_separam_sequencias():
+    ids = [
+        build_id("lei_11_101_2005", "6", 1),
+        build_id("lei_11_101_2005", "6", 1, ocorrencia=2),
+        build_id("lei_11_101_2005", "6", 1, unidade="par-1"),
+    ]
+    assert len({chunk_parent(i) for i in ids}) == 3
+    assert chunk_parent(build_id("lei_11_101_2005", "6", 2)) == chunk_parent(ids[0])